@@ -19,6 +19,7 @@ fi
 
 PLUGIN_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
 PROMPT_FILE="$PLUGIN_DIR/skills/background-review/references/combined-review-prompt.md"
+SCANNER="$PLUGIN_DIR/hooks/transcript_scan.py"
 
 LOG_DIR="${AUTO_IMPROVE_LOG_DIR:-${CLAUDE_CONFIG_DIR:-$HOME/.claude}/auto-improve}"
 mkdir -p "$LOG_DIR"
@@ -26,7 +27,11 @@ TS=$(date -u +%Y%m%dT%H%M%SZ)
 LOG_FILE="$LOG_DIR/${TS}_${SESSION_ID}.log"
 
 # Threshold: skip very short sessions (less than 4 user turns produces noise).
-USER_TURNS=$(jq -s 'map(select(.type == "user")) | length' "$TRANSCRIPT_PATH" 2>/dev/null || echo 0)
+# The scan state was just caught up by should-review.sh, so this reads only
+# lines appended since.
+STATE_FILE="$LOG_DIR/state/${SESSION_ID}.json"
+USER_TURNS=$(python3 "$SCANNER" scan "$TRANSCRIPT_PATH" --state "$STATE_FILE" 2>/dev/null \
+  | jq -r '.user_turns // 0' 2>/dev/null)
 if [ "${USER_TURNS:-0}" -lt 4 ]; then
   echo "[skip] only ${USER_TURNS} user turns in $TRANSCRIPT_PATH" > "$LOG_FILE"
   exit 0
@@ -34,21 +39,9 @@ fi
 
 # Build a plain-text transcript snippet. Strip tool calls / tool results to
 # keep the review focused on the user-assistant dialogue. Truncate to keep
-# the prompt manageable.
-TRANSCRIPT_TEXT=$(jq -r '
-  select(.type == "user" or .type == "assistant")
-  | .message
-  | select(. != null)
-  | (
-      if (.content | type) == "string" then
-        "[" + (.role // "?") + "]\n" + .content
-      elif (.content | type) == "array" then
-        "[" + (.role // "?") + "]\n" + ([.content[] | select(.type == "text") | .text] | join("\n"))
-      else
-        empty
-      end
-    )
-' "$TRANSCRIPT_PATH" 2>/dev/null | tail -c 200000)
+# the prompt manageable; the scanner reads the transcript backwards and
+# stops once it has enough.
+TRANSCRIPT_TEXT=$(python3 "$SCANNER" dialogue "$TRANSCRIPT_PATH" --max-bytes 200000 2>/dev/null)
 
 if [ -z "$TRANSCRIPT_TEXT" ]; then
   echo "[skip] empty transcript text" > "$LOG_FILE"
@@ -13,7 +13,11 @@
 #      user turns since the last review (default 5).
 #
 # State lives at $STATE_DIR/<session_id>.json with shape:
-#   {"last_reviewed_turn": <int>}
+#   {"last_reviewed_turn": <int>, "scan": {<offset and running counters>}}
+#
+# transcript_scan.py keeps the scan counters up to date by parsing only the
+# lines appended since the previous Stop, so this costs the same on turn 5
+# as on turn 500.
 
 set -u
 
@@ -28,26 +32,18 @@ INTERVAL="${AUTO_IMPROVE_INTERVAL:-5}"
 STATE_DIR="${AUTO_IMPROVE_LOG_DIR:-${CLAUDE_CONFIG_DIR:-$HOME/.claude}/auto-improve}/state"
 mkdir -p "$STATE_DIR"
 STATE_FILE="$STATE_DIR/${SESSION_ID}.json"
+SCANNER="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/transcript_scan.py"
 
-USER_TURNS=$(jq -s 'map(select(.type == "user")) | length' "$TRANSCRIPT_PATH" 2>/dev/null || echo 0)
+# One incremental read: turn count, recent user/assistant text, error markers.
+SCAN=$(python3 "$SCANNER" scan "$TRANSCRIPT_PATH" --state "$STATE_FILE" 2>/dev/null) || exit 1
+eval "$(printf '%s' "$SCAN" | jq -r '@sh "USER_TURNS=\(.user_turns) LAST_REVIEWED=\(.last_reviewed_turn) ASSISTANT_ERROR=\(.assistant_error)"')"
+LAST_USER_TEXT=$(printf '%s' "$SCAN" | jq -r '.user_text')
 
 # (1) Minimum turn floor.
 if [ "${USER_TURNS:-0}" -lt "$MIN_TURNS" ]; then
   exit 1
 fi
 
-# Pull the last user message text for signal detection.
-LAST_USER_TEXT=$(jq -r '
-  select(.type == "user")
-  | .message | select(. != null)
-  | (
-      if (.content | type) == "string" then .content
-      elif (.content | type) == "array" then
-        ([.content[] | select(.type == "text") | .text] | join("\n"))
-      else "" end
-    )
-' "$TRANSCRIPT_PATH" 2>/dev/null | tail -c 8000)
-
 # (2) No-op skip. Trim whitespace and check trivial follow-ups.
 LAST_TRIMMED=$(printf '%s' "$LAST_USER_TEXT" | tr -d '[:space:]' | tr '[:upper:]' '[:lower:]')
 case "$LAST_TRIMMED" in
@@ -72,18 +68,10 @@ if printf '%s' "$LAST_LOWER" | grep -Eq "remember (this|that)|save (this|that)|d
 fi
 
 # Error+correction: did the assistant's last message contain a tool error
-# AND the user's last message contain a corrective marker?
+# AND the user's last message contain a corrective marker? The scanner
+# reports error markers in the recent assistant text.
 if [ "$is_signal" = "0" ]; then
-  LAST_ASSISTANT_TEXT=$(jq -r '
-    select(.type == "assistant")
-    | .message | select(. != null)
-    | (
-        if (.content | type) == "array" then
-          ([.content[] | select(.type == "text") | .text] | join("\n"))
-        else "" end
-      )
-  ' "$TRANSCRIPT_PATH" 2>/dev/null | tail -c 4000 | tr '[:upper:]' '[:lower:]')
-  if printf '%s' "$LAST_ASSISTANT_TEXT" | grep -Eq "error|failed|exception|cannot|could not" && \
+  if [ "$ASSISTANT_ERROR" = "true" ] && \
      printf '%s' "$LAST_LOWER" | grep -Eq "no|wrong|actually|instead|try|the issue|the problem"; then
     is_signal=1
   fi
@@ -91,20 +79,15 @@ fi
 
 if [ "$is_signal" = "1" ]; then
   # Record this turn as the new baseline so the interval restarts here.
-  printf '{"last_reviewed_turn": %s}\n' "$USER_TURNS" > "$STATE_FILE"
+  python3 "$SCANNER" mark "$STATE_FILE" "$USER_TURNS" >/dev/null
   exit 0
 fi
 
 # (4) Interval gating.
-LAST_REVIEWED=0
-if [ -f "$STATE_FILE" ]; then
-  LAST_REVIEWED=$(jq -r '.last_reviewed_turn // 0' "$STATE_FILE" 2>/dev/null || echo 0)
-fi
-
 DELTA=$((USER_TURNS - LAST_REVIEWED))
 if [ "$DELTA" -lt "$INTERVAL" ]; then
   exit 1
 fi
 
-printf '{"last_reviewed_turn": %s}\n' "$USER_TURNS" > "$STATE_FILE"
+python3 "$SCANNER" mark "$STATE_FILE" "$USER_TURNS" >/dev/null
 exit 0
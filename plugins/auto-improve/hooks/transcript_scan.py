@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Incremental transcript scanner for the Stop hook.
+
+Keeps a byte offset and running counters for a session transcript in the
+hook's state file ($STATE_DIR/<session_id>.json), so each Stop event parses
+only the lines appended since the last one. Hook cost stays flat however
+long the session runs.
+
+Usage:
+    transcript_scan.py scan TRANSCRIPT --state FILE
+    transcript_scan.py mark FILE TURN
+    transcript_scan.py dialogue TRANSCRIPT [--max-bytes 200000]
+
+scan catches the counters up and prints them:
+    user_turns          entries of type "user" (tool results included)
+    last_reviewed_turn  the turn of the last review, from the state file
+    user_text           tail of the text of every user entry, one per line
+    assistant_text      tail of the text blocks of every assistant entry
+    assistant_error     whether assistant_text has an error marker
+These match what should-review.sh used to compute with jq over the whole
+file. Only newline-terminated lines are consumed, so a line still being
+written is picked up next time. A replaced or truncated transcript is
+rescanned from the start.
+
+mark sets last_reviewed_turn, keeping the scan counters.
+
+dialogue prints the last --max-bytes bytes of the "[role]\\ntext"
+dialogue that run-review.sh feeds the reviewer, reading the transcript
+backwards so only the tail is parsed.
+
+The state file is updated under an flock and replaced atomically, so a
+review worker and the next Stop hook never clobber each other.
+
+Output: JSON (scan, mark) or plain text (dialogue)
+"""
+
+import fcntl
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+SCAN_VERSION = 1
+
+# The tail -c windows the hooks applied to their jq output
+USER_TAIL = 8000
+ASSISTANT_TAIL = 4000
+DIALOGUE_BYTES = 200000
+
+READ_BLOCK = 1 << 20
+
+ERROR_MARKERS = re.compile(r"error|failed|exception|cannot|could not")
+
+
+def tail_bytes(text: str, n: int) -> str:
+    """The last n UTF-8 bytes of text, like tail -c (a split character is dropped)."""
+    data = text.encode()
+    if len(data) <= n:
+        return text
+    return data[-n:].decode(errors="ignore")
+
+
+def message_text(entry: dict, strings: bool = True):
+    """The text of an entry's message, or None when it has none.
+
+    String content is returned as is (when `strings`); array content is the
+    newline-joined text blocks.
+    """
+    message = entry.get("message")
+    if not isinstance(message, dict):
+        return None
+    content = message.get("content")
+    if isinstance(content, str):
+        return content if strings else ""
+    if isinstance(content, list):
+        texts = []
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == "text":
+                text = block.get("text")
+                # jq's join reads a missing text as ""
+                if text is None or isinstance(text, str):
+                    texts.append(text or "")
+        return "\n".join(texts)
+    return ""
+
+
+def new_scan() -> dict:
+    return {
+        "version": SCAN_VERSION,
+        "inode": None,
+        "offset": 0,
+        "user_turns": 0,
+        "user_text": "",
+        "assistant_text": "",
+    }
+
+
+def fold_line(scan: dict, line: bytes):
+    """Fold one transcript line into the running counters."""
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return
+    if not isinstance(entry, dict):
+        return
+
+    if entry.get("type") == "user":
+        scan["user_turns"] += 1
+        text = message_text(entry)
+        if text is not None:
+            scan["user_text"] = tail_bytes(scan["user_text"] + text + "\n", USER_TAIL)
+    elif entry.get("type") == "assistant":
+        text = message_text(entry, strings=False)
+        if text is not None:
+            scan["assistant_text"] = tail_bytes(scan["assistant_text"] + text + "\n", ASSISTANT_TAIL)
+
+
+def catch_up(scan: dict, transcript: str) -> dict:
+    """Parse lines appended since scan["offset"]; rescan if the file was replaced."""
+    st = os.stat(transcript)
+    if scan.get("version") != SCAN_VERSION or scan["inode"] != st.st_ino or scan["offset"] > st.st_size:
+        scan = new_scan()
+        scan["inode"] = st.st_ino
+
+    if scan["offset"] == st.st_size:
+        return scan
+
+    with open(transcript, "rb") as f:
+        f.seek(scan["offset"])
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            scan["offset"] += len(line)
+            fold_line(scan, line)
+    return scan
+
+
+@contextmanager
+def locked_state(path: str):
+    """Yield the state dict under an exclusive lock; written back on exit."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            if not isinstance(state, dict):
+                state = {}
+        except (OSError, ValueError):
+            state = {}
+
+        yield state
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+
+def scan_transcript(transcript: str, state_path: str) -> dict:
+    with locked_state(state_path) as state:
+        scan = catch_up(state.get("scan") or new_scan(), transcript)
+        state["scan"] = scan
+        last_reviewed = state.get("last_reviewed_turn", 0)
+
+    return {
+        "user_turns": scan["user_turns"],
+        "last_reviewed_turn": last_reviewed if isinstance(last_reviewed, int) else 0,
+        "user_text": scan["user_text"],
+        "assistant_text": scan["assistant_text"],
+        "assistant_error": bool(ERROR_MARKERS.search(scan["assistant_text"].lower())),
+    }
+
+
+def mark_reviewed(state_path: str, turn: int) -> dict:
+    with locked_state(state_path) as state:
+        state["last_reviewed_turn"] = turn
+    return {"last_reviewed_turn": turn}
+
+
+def reversed_lines(f):
+    """Yield the lines of a binary file from last to first, without newlines."""
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    tail = b""
+    while pos > 0:
+        size = min(READ_BLOCK, pos)
+        pos -= size
+        f.seek(pos)
+        lines = (f.read(size) + tail).split(b"\n")
+        tail = lines.pop(0)
+        yield from reversed(lines)
+    yield tail
+
+
+def dialogue(transcript: str, max_bytes: int = DIALOGUE_BYTES) -> str:
+    """The last max_bytes of the [role]\\ntext rendering of user/assistant turns."""
+    parts = []
+    total = 0
+    with open(transcript, "rb") as f:
+        for line in reversed_lines(f):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict) or entry.get("type") not in ("user", "assistant"):
+                continue
+            message = entry.get("message")
+            if not isinstance(message, dict) or not isinstance(message.get("content"), (str, list)):
+                continue
+            role = message.get("role")
+            part = f"[{'?' if role is None else role}]\n{message_text(entry)}\n"
+            parts.append(part)
+            total += len(part.encode())
+            if total >= max_bytes:
+                break
+
+    return tail_bytes("".join(reversed(parts)), max_bytes)
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    args = sys.argv[2:]
+    positional = []
+    state_path = None
+    max_bytes = DIALOGUE_BYTES
+
+    i = 0
+    while i < len(args):
+        if args[i] == "--state" and i + 1 < len(args):
+            state_path = args[i + 1]
+            i += 2
+        elif args[i] == "--max-bytes" and i + 1 < len(args):
+            max_bytes = int(args[i + 1])
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    try:
+        if command == "scan" and positional and state_path:
+            print(json.dumps(scan_transcript(positional[0], state_path)))
+        elif command == "mark" and len(positional) == 2:
+            print(json.dumps(mark_reviewed(positional[0], int(positional[1]))))
+        elif command == "dialogue" and positional:
+            sys.stdout.write(dialogue(positional[0], max_bytes))
+        else:
+            print(json.dumps({"error": "Usage: transcript_scan.py scan TRANSCRIPT --state FILE | "
+                                       "mark FILE TURN | dialogue TRANSCRIPT [--max-bytes N]"}))
+            sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
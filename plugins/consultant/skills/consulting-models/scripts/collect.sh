@@ -1,10 +1,24 @@
 #!/usr/bin/env bash
 # Collect and format research results
-# Usage: ./collect.sh <output-dir>
+# Usage: ./collect.sh [--follow] <output-dir>
+# --follow prints each result as its agent finishes, until research.sh is done.
+# It exits with an error if no run starts within CONSULT_TIMEOUT seconds.
 
 set -euo pipefail
 
+FOLLOW=false
+if [[ "${1:-}" == "--follow" ]]; then
+    FOLLOW=true
+    shift
+fi
+
 OUTPUT_DIR="${1:-}"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
+if $FOLLOW; then
+    mkdir -p "$OUTPUT_DIR"
+    exec python3 "${SCRIPT_DIR}/scheduler.py" follow "$OUTPUT_DIR"
+fi
 
 if [[ -z "$OUTPUT_DIR" || ! -d "$OUTPUT_DIR" ]]; then
     echo "Error: Output directory not found: $OUTPUT_DIR" >&2
@@ -2,6 +2,8 @@
 # Parallel research launcher
 # Usage: ./research.sh "<topic>" <intensity> [output-dir]
 # Intensity: quick (5), standard (15), extensive (40)
+# Agents run through scheduler.py: concurrency limits, timeouts, retries and
+# the response cache are set through its CONSULT_* variables.
 
 set -euo pipefail
 
@@ -27,26 +29,4 @@ case "$INTENSITY" in
     *)         AGENTS_PER_MODEL=3 ;;
 esac
 
-mkdir -p "$OUTPUT_DIR"
-
-MODELS=()
-while IFS='|' read -r alias model desc; do
-    [[ "$alias" =~ ^#.*$ || -z "$alias" ]] && continue
-    MODELS+=("$alias")
-done < "${SCRIPT_DIR}/models.conf"
-
-PIDS=()
-for model in "${MODELS[@]}"; do
-    for i in $(seq 1 $AGENTS_PER_MODEL); do
-        OUTPUT_FILE="${OUTPUT_DIR}/${model}-${i}.txt"
-        "${SCRIPT_DIR}/consult.sh" "$model" "$TOPIC" "$OUTPUT_FILE" &
-        PIDS+=($!)
-    done
-done
-
-for pid in "${PIDS[@]}"; do
-    wait "$pid" 2>/dev/null || true
-done
-
-echo "Results written to: $OUTPUT_DIR"
-echo "Total agents: $((${#MODELS[@]} * AGENTS_PER_MODEL))"
+exec python3 "${SCRIPT_DIR}/scheduler.py" research "$TOPIC" "$AGENTS_PER_MODEL" "$OUTPUT_DIR"
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Agent scheduler for consult.sh, research.sh and collect.sh --follow.
+
+Runs agent calls with a cap on concurrent calls overall and per model, a
+timeout per call, and retries with exponential backoff on failure (non-zero
+exit, timeout or empty answer). models.conf is read once per run.
+
+Answers are cached on disk, keyed on the model, the agent's slot and a
+hash of the prompt, so a repeated consultation or research run reuses them
+instead of calling the agent again. The slot keeps research agents that
+share a prompt from collapsing into one answer. Entries older than the TTL
+are ignored and evicted at the start of each run.
+
+research writes each answer to OUTPUT_DIR/<alias>-<n>.txt once it is
+complete, and appends a line per finished agent to OUTPUT_DIR/.progress;
+follow reads that file and prints each answer as it lands. follow gives up
+if no run has started in OUTPUT_DIR within CONSULT_TIMEOUT seconds.
+
+Usage:
+    scheduler.py consult MODEL PROMPT [OUTPUT_FILE]
+    scheduler.py research TOPIC AGENTS_PER_MODEL OUTPUT_DIR
+    scheduler.py follow OUTPUT_DIR
+
+Settings (environment):
+    AGENT_CLI              agent binary (default: agent, then cursor-agent)
+    CONSULT_MAX_PARALLEL   concurrent calls overall (default 8)
+    CONSULT_PER_MODEL      concurrent calls per model (default 3)
+    CONSULT_TIMEOUT        seconds per call (default 600)
+    CONSULT_RETRIES        retries after a failed call (default 2)
+    CONSULT_BACKOFF        first retry delay in seconds, doubled each time (default 2)
+    CONSULT_CACHE_DIR      cache directory (default ~/.cache/consultant)
+    CONSULT_CACHE_TTL      cache lifetime in seconds, 0 disables (default 86400)
+
+Output: the answer (consult), a summary (research) or the collected
+results (follow); progress and errors on stderr
+"""
+
+import hashlib
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+MODELS_CONF = SCRIPT_DIR / "models.conf"
+PROGRESS_FILE = ".progress"
+
+DEFAULTS = {
+    "CONSULT_MAX_PARALLEL": 8,
+    "CONSULT_PER_MODEL": 3,
+    "CONSULT_TIMEOUT": 600,
+    "CONSULT_RETRIES": 2,
+    "CONSULT_BACKOFF": 2,
+    "CONSULT_CACHE_TTL": 86400,
+}
+
+FOLLOW_POLL = 0.2
+
+
+class AgentError(Exception):
+    pass
+
+
+def setting(name: str) -> int:
+    value = os.environ.get(name, "")
+    try:
+        return int(value) if value else DEFAULTS[name]
+    except ValueError:
+        raise AgentError(f"{name} must be an integer, got {value!r}")
+
+
+def load_models() -> list[tuple[str, str]]:
+    """(alias, model id) pairs from models.conf, in file order."""
+    models = []
+    with open(MODELS_CONF) as f:
+        for line in f:
+            alias, _, rest = line.rstrip("\n").partition("|")
+            if not alias or alias.startswith("#"):
+                continue
+            models.append((alias, rest.partition("|")[0]))
+    return models
+
+
+def resolve_model(alias: str, models: list) -> str:
+    """The model id for an alias; unknown aliases are passed through as ids."""
+    return dict(models).get(alias, alias)
+
+
+def resolve_agent_cli() -> str:
+    agent = os.environ.get("AGENT_CLI")
+    if agent:
+        return agent
+    for name in ("agent", "cursor-agent"):
+        if shutil.which(name):
+            return name
+    print("Error: neither 'cursor-agent' nor 'agent' found in PATH (set AGENT_CLI to override)", file=sys.stderr)
+    sys.exit(127)
+
+
+class Cache:
+    """Answers on disk, one file per (model, slot, prompt hash), expiring after ttl seconds."""
+
+    def __init__(self, directory: Path, ttl: int):
+        self.dir = directory
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls) -> "Cache":
+        default = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "consultant"
+        return cls(Path(os.environ.get("CONSULT_CACHE_DIR") or default), setting("CONSULT_CACHE_TTL"))
+
+    def path(self, model: str, slot: int, prompt: str) -> Path:
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        key = hashlib.sha256(f"{model}\0{slot}\0{digest}".encode()).hexdigest()
+        return self.dir / f"{key}.txt"
+
+    def get(self, model: str, slot: int, prompt: str):
+        if self.ttl <= 0:
+            return None
+        path = self.path(model, slot, prompt)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            return path.read_text()
+        except OSError:
+            return None
+
+    def put(self, model: str, slot: int, prompt: str, answer: str):
+        if self.ttl <= 0:
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.path(model, slot, prompt), answer)
+
+    def evict(self):
+        """Remove entries past the TTL."""
+        if self.ttl <= 0 or not self.dir.is_dir():
+            return
+        cutoff = time.time() - self.ttl
+        for path in self.dir.glob("*.txt"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+
+def write_atomic(path: Path, text: str):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def call_agent(agent: str, model: str, prompt: str, timeout: int) -> str:
+    """One agent call; raises AgentError on failure, timeout or an empty answer."""
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        # Own session, so a timeout kills the agent's children too
+        proc = subprocess.Popen([agent, "-p", prompt, "--model", model, "--output-format", "text"],
+                                stdin=subprocess.DEVNULL, stdout=out, stderr=err, start_new_session=True)
+        try:
+            status = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+            raise AgentError(f"timed out after {timeout}s")
+        out.seek(0)
+        answer = out.read().decode(errors="replace")
+        if status != 0:
+            err.seek(0)
+            detail = err.read().decode(errors="replace").strip().splitlines()
+            raise AgentError(f"exit {status}" + (f": {detail[-1]}" if detail else ""))
+    if not answer.strip():
+        raise AgentError("empty answer")
+    return answer
+
+
+class Scheduler:
+    """Runs agent calls under overall and per-model concurrency limits."""
+
+    def __init__(self, agent: str, cache: Cache):
+        self.agent = agent
+        self.cache = cache
+        self.timeout = setting("CONSULT_TIMEOUT")
+        self.retries = setting("CONSULT_RETRIES")
+        self.backoff = setting("CONSULT_BACKOFF")
+        self.per_model = max(1, setting("CONSULT_PER_MODEL"))
+        self.slots = threading.BoundedSemaphore(max(1, setting("CONSULT_MAX_PARALLEL")))
+        self.model_slots = {}
+        self.lock = threading.Lock()
+
+    def model_slot(self, model: str) -> threading.BoundedSemaphore:
+        with self.lock:
+            if model not in self.model_slots:
+                self.model_slots[model] = threading.BoundedSemaphore(self.per_model)
+            return self.model_slots[model]
+
+    def log(self, message: str):
+        """Write a status line to stderr whole, even with other workers writing."""
+        with self.lock:
+            sys.stderr.write(message + "\n")
+            sys.stderr.flush()
+
+    def ask(self, model: str, slot: int, prompt: str) -> tuple[str, str]:
+        """(answer, "ok" | "cached"); raises AgentError once retries are spent."""
+        answer = self.cache.get(model, slot, prompt)
+        if answer is not None:
+            return answer, "cached"
+
+        for attempt in range(self.retries + 1):
+            # A model slot first, so waiting on a busy model holds no overall slot
+            with self.model_slot(model), self.slots:
+                try:
+                    answer = call_agent(self.agent, model, prompt, self.timeout)
+                    break
+                except AgentError as e:
+                    if attempt == self.retries:
+                        raise
+                    error = e
+            delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            self.log(f"[retry] {model} slot {slot}: {error}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+        self.cache.put(model, slot, prompt, answer)
+        return answer, "ok"
+
+
+def consult(args: list):
+    if len(args) < 2 or not args[1]:
+        print('Usage: ./consult.sh <model-alias> "<prompt>" [output-file]', file=sys.stderr)
+        sys.exit(1)
+    alias, prompt = args[0], args[1]
+    output_file = args[2] if len(args) > 2 else ""
+
+    cache = Cache.from_env()
+    cache.evict()
+    scheduler = Scheduler(resolve_agent_cli(), cache)
+    answer, _ = scheduler.ask(resolve_model(alias, load_models()), 1, prompt)
+    if output_file:
+        write_atomic(Path(output_file), answer)
+    else:
+        sys.stdout.write(answer)
+
+
+def research(args: list):
+    if len(args) != 3 or not args[0]:
+        print('Usage: ./research.sh "<topic>" <intensity> [output-dir]', file=sys.stderr)
+        sys.exit(1)
+    topic, per_model, output_dir = args[0], int(args[1]), Path(args[2])
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    models = load_models()
+    cache = Cache.from_env()
+    cache.evict()
+    scheduler = Scheduler(resolve_agent_cli(), cache)
+
+    # Interleaved by model, so the first calls spread across models
+    jobs = [(alias, model, i) for i in range(1, per_model + 1) for alias, model in models]
+    progress = open(output_dir / PROGRESS_FILE, "w")
+    progress.write(f"start {os.getpid()} {len(jobs)}\n")
+    progress.flush()
+    failures = []
+
+    def run(alias: str, model: str, i: int):
+        name = f"{alias}-{i}"
+        started = time.monotonic()
+        try:
+            answer, status = scheduler.ask(model, i, topic)
+            write_atomic(output_dir / f"{name}.txt", answer)
+            line = f"{status} {name}"
+        except (AgentError, OSError) as e:
+            failures.append(name)
+            line = f"failed {name} {e}"
+        with scheduler.lock:
+            progress.write(line.replace("\n", " ") + "\n")
+            progress.flush()
+        scheduler.log(f"[{line.split()[0]}] {name} ({time.monotonic() - started:.1f}s)")
+
+    threads = [threading.Thread(target=run, args=job) for job in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    progress.write(f"end {len(jobs) - len(failures)}\n")
+    progress.close()
+
+    print(f"Results written to: {output_dir}")
+    print(f"Total agents: {len(jobs)}")
+    if failures:
+        print(f"Failed agents: {' '.join(sorted(failures))}")
+
+
+def follow(args: list):
+    """Print each research answer as its agent finishes, until the run ends."""
+    if len(args) != 1:
+        print("Usage: ./collect.sh --follow <output-dir>", file=sys.stderr)
+        sys.exit(1)
+    output_dir = Path(args[0])
+    progress_path = output_dir / PROGRESS_FILE
+
+    print("=== RESEARCH RESULTS ===")
+    print("", flush=True)
+
+    offset = 0
+    pending = b""
+    pid = None
+    timeout = setting("CONSULT_TIMEOUT")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(progress_path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        offset += len(data)
+        *lines, pending = (pending + data).split(b"\n")
+
+        for line in lines:
+            status, _, rest = line.decode().partition(" ")
+            name, _, reason = rest.partition(" ")
+            if status == "start":
+                pid = int(name)
+            elif status == "end":
+                return
+            elif status == "failed":
+                print(f"--- {name} (failed: {reason}) ---")
+                print("", flush=True)
+            else:
+                print(f"--- {name} ---")
+                sys.stdout.write((output_dir / f"{name}.txt").read_text())
+                print("", flush=True)
+
+        if pid is not None and not lines and not process_alive(pid):
+            print(f"Error: research run {pid} exited before finishing", file=sys.stderr)
+            sys.exit(1)
+        if pid is None and time.monotonic() > deadline:
+            print(f"Error: no research run started in {output_dir} within {timeout}s", file=sys.stderr)
+            sys.exit(1)
+        if not lines:
+            time.sleep(FOLLOW_POLL)
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+COMMANDS = {"consult": consult, "research": research, "follow": follow}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(f"Usage: scheduler.py {'|'.join(COMMANDS)} ...", file=sys.stderr)
+        sys.exit(1)
+    try:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+    except AgentError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,8 +25,8 @@ install_service() {
         exit 1
     fi
 
-    if ! command -v jq &>/dev/null; then
-        error "jq is required. Install with: brew install jq"
+    if ! command -v python3 &>/dev/null; then
+        error "python3 is required. Install with: brew install python"
         exit 1
     fi
 
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Incremental sync of installed Claude Code plugins into Cursor.
+
+One pass over every plugin in ~/.claude/plugins/installed_plugins.json:
+skill directories go to ~/.cursor/skills/, command files to
+~/.cursor/commands/ (with a "<!-- cursor-sync: SOURCE -->" first line).
+
+A manifest (~/.cursor/.cursor-sync-manifest.json) records, for each target,
+the size, mtime and SHA-1 of every source file it was built from. A file
+whose size and mtime still match is taken as unchanged without reading it;
+one whose stat changed is hashed, and only a new hash makes it copied.
+Files gone from the source are deleted from the target, target files that
+went missing are put back, and targets whose plugin or skill was removed
+are cleaned up, so an unchanged install costs one stat per source file.
+
+Skill files are placed by reflink where the filesystem supports it, then
+hardlink, then copy (--mode to force one). A hardlinked target shares the
+plugin's file, so edits made in place show up on both sides; the engine
+itself always unlinks a target file before replacing it.
+
+Targets are only touched if they carry the sync markers (a .cursor-sync
+file in a skill directory, the comment line in a command). A name already
+taken by something else gets a marketplace-plugin- or plugin- prefix.
+
+Usage:
+    sync_engine.py [--mode auto|reflink|link|copy] [--rehash]
+
+--rehash ignores recorded stats and hashes every source file.
+
+Output: log lines, one per skill or command changed
+"""
+
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+
+CLAUDE_PLUGINS_DIR = Path.home() / ".claude" / "plugins"
+INSTALLED_PLUGINS_FILE = CLAUDE_PLUGINS_DIR / "installed_plugins.json"
+CURSOR_DIR = Path.home() / ".cursor"
+CURSOR_SKILLS_DIR = CURSOR_DIR / "skills"
+CURSOR_COMMANDS_DIR = CURSOR_DIR / "commands"
+MANIFEST_FILE = CURSOR_DIR / ".cursor-sync-manifest.json"
+MANIFEST_VERSION = 1
+
+SYNC_MARKER = ".cursor-sync"
+COMMAND_MARKER = "<!-- cursor-sync:"
+MODES = ("auto", "reflink", "link", "copy")
+
+# Linux FICLONE ioctl: share the source's blocks (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+
+def log(message: str):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", flush=True)
+
+
+def error(message: str):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ERROR: {message}", file=sys.stderr, flush=True)
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST_FILE) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("targets", {})
+
+
+def save_manifest(targets: dict):
+    tmp = MANIFEST_FILE.with_name(f"{MANIFEST_FILE.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "targets": targets}, f)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def installed_plugins() -> list[tuple[str, str, Path]]:
+    """(plugin name, marketplace, install path) for each installed plugin."""
+    with open(INSTALLED_PLUGINS_FILE) as f:
+        data = json.load(f)
+    plugins = []
+    for key, installs in data.get("plugins", {}).items():
+        if not installs or not isinstance(installs, list) or not isinstance(installs[0], dict):
+            continue
+        install_path = installs[0].get("installPath")
+        if not key or not install_path:
+            continue
+        name, _, marketplace = key.partition("@")
+        plugins.append((name, marketplace or name, Path(install_path)))
+    return plugins
+
+
+class Placer:
+    """Puts a source file at a target path by the cheapest working method."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        # Methods that failed once stay off for the rest of the run
+        self.reflink = mode in ("auto", "reflink")
+        self.link = mode in ("auto", "link")
+
+    def place(self, source: str, target: str):
+        if self.reflink and self._reflink(source, target):
+            return
+        if self.link:
+            try:
+                os.link(source, target)
+                return
+            except OSError:
+                if self.mode == "link":
+                    raise
+                self.link = False
+        shutil.copy2(source, target)
+
+    def _reflink(self, source: str, target: str) -> bool:
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(source, target)
+            return True
+        except OSError as e:
+            if os.path.lexists(target):
+                os.unlink(target)
+            if self.mode == "reflink" and e.errno not in (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY,
+                                                          errno.EINVAL):
+                raise
+            self.reflink = False
+            return False
+
+
+def walk_tree(root: str, prefix: str = "", ordered: bool = True):
+    """(relative path, DirEntry) for everything but directories under root.
+
+    Symlinks to directories are yielded as entries, not descended into.
+    """
+    with os.scandir(root) as it:
+        entries = sorted(it, key=lambda e: e.name) if ordered else list(it)
+    for entry in entries:
+        rel = prefix + entry.name
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk_tree(entry.path, rel + "/", ordered)
+        else:
+            yield rel, entry
+
+
+def scan_source(source: str, recorded: dict, rehash: bool) -> dict:
+    """{relative path: entry} for a source tree, hashing only files whose stat changed.
+
+    Regular files map to {"size", "mtime_ns", "sha1"}, symlinks to {"link"}.
+    """
+    files = {}
+    for rel, entry in walk_tree(source):
+        if entry.is_symlink():
+            files[rel] = {"link": os.readlink(entry.path)}
+            continue
+        st = entry.stat(follow_symlinks=False)
+        old = recorded.get(rel)
+        if (not rehash and old and "sha1" in old
+                and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns):
+            files[rel] = old
+        else:
+            files[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": file_hash(entry.path)}
+    return files
+
+
+def target_matches(entry, wanted: dict) -> bool:
+    """Whether a target DirEntry (or None) is still the kind of file wanted describes.
+
+    Regular files are taken on presence: scandir reports their type without
+    a stat, and their content is vouched for by the manifest.
+    """
+    if entry is None:
+        return False
+    if "link" in wanted:
+        return entry.is_symlink() and os.readlink(entry.path) == wanted["link"]
+    return entry.is_file(follow_symlinks=False)
+
+
+def remove_path(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.unlink(path)
+
+
+def sync_skill(source: Path, target: Path, record: dict | None, placer: Placer, rehash: bool) -> tuple:
+    """Bring target in line with source; returns (new record, files placed, files removed)."""
+    source_dir, target_dir = str(source), str(target)
+    known = record.get("files", {}) if record and record.get("source") == source_dir else {}
+    files = scan_source(source_dir, known, rehash)
+
+    os.makedirs(target_dir, exist_ok=True)
+    existing = dict(walk_tree(target_dir, ordered=False))
+
+    # Delete whatever the source no longer has first, so a file replaced by a
+    # directory (or the reverse) has room; the marker stays
+    removed = 0
+    for rel in existing:
+        if rel != SYNC_MARKER and rel not in files:
+            os.unlink(os.path.join(target_dir, rel))
+            removed += 1
+            parent = os.path.dirname(rel)
+            while parent:
+                try:
+                    os.rmdir(os.path.join(target_dir, parent))
+                except OSError:
+                    break
+                parent = os.path.dirname(parent)
+
+    placed = 0
+    for rel, wanted in files.items():
+        dest = os.path.join(target_dir, rel)
+        old = known.get(rel)
+        unchanged = old is not None and old.get("sha1") == wanted.get("sha1") and old.get("link") == wanted.get("link")
+        if not unchanged and record is None and "sha1" in wanted and rel in existing \
+                and not existing[rel].is_symlink():
+            # No manifest for this target yet: reuse an identical file already there
+            unchanged = file_hash(dest) == wanted["sha1"]
+        if unchanged and target_matches(existing.get(rel), wanted):
+            continue
+
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        remove_path(dest)
+        if "link" in wanted:
+            os.symlink(wanted["link"], dest)
+        else:
+            placer.place(os.path.join(source_dir, rel), dest)
+        placed += 1
+
+    marker = os.path.join(target_dir, SYNC_MARKER)
+    marker_text = f"{source_dir}/\n"
+    try:
+        with open(marker) as f:
+            current = f.read()
+    except OSError:
+        current = None
+    if current != marker_text:
+        with open(marker, "w") as f:
+            f.write(marker_text)
+
+    return {"source": source_dir, "files": files}, placed, removed
+
+
+def command_text(source: Path) -> bytes:
+    return f"{COMMAND_MARKER} {source} -->\n".encode() + source.read_bytes()
+
+
+def is_managed_command(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.readline().startswith(COMMAND_MARKER.encode())
+    except OSError:
+        return False
+
+
+def sync_command(source: Path, target: Path, record: dict | None, rehash: bool) -> tuple:
+    """Rewrite target if source changed; returns (new record, whether it was written)."""
+    known = record.get("files", {}) if record and record.get("source") == str(source) else {}
+    old = known.get("")
+    st = source.stat()
+    if not rehash and old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+        entry = old
+    else:
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": file_hash(source)}
+
+    new_record = {"source": str(source), "files": {"": entry}}
+    text = None
+    if not (old and old.get("sha1") == entry["sha1"]):
+        text = command_text(source)
+        try:
+            if target.read_bytes() == text:
+                return new_record, False
+        except OSError:
+            pass
+    elif target.is_file():
+        return new_record, False
+
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(text if text is not None else command_text(source))
+    os.replace(tmp, target)
+    return new_record, True
+
+
+def main():
+    mode = "auto"
+    rehash = False
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--mode" and i + 1 < len(args):
+            mode = args[i + 1]
+            i += 2
+        elif args[i] == "--rehash":
+            rehash = True
+            i += 1
+        else:
+            i += 1
+    if mode not in MODES:
+        error(f"Invalid --mode: {mode} (use {', '.join(MODES)})")
+        sys.exit(1)
+
+    if not CURSOR_DIR.is_dir():
+        error("Cursor not installed (~/.cursor not found)")
+        sys.exit(1)
+    CURSOR_SKILLS_DIR.mkdir(parents=True, exist_ok=True)
+    CURSOR_COMMANDS_DIR.mkdir(parents=True, exist_ok=True)
+
+    if not INSTALLED_PLUGINS_FILE.is_file():
+        log("No installed plugins found")
+        return
+    try:
+        plugins = installed_plugins()
+    except (OSError, ValueError, AttributeError):
+        error(f"Failed to parse {INSTALLED_PLUGINS_FILE}")
+        sys.exit(1)
+
+    old_targets = load_manifest()
+    targets = {}
+    placer = Placer(mode)
+    totals = {"skills": 0, "commands": 0, "placed": 0, "removed": 0}
+
+    for plugin_name, marketplace, install_path in plugins:
+        skills_dir = install_path / "skills"
+        if skills_dir.is_dir():
+            for skill_dir in sorted(p for p in skills_dir.iterdir() if p.is_dir()):
+                target = CURSOR_SKILLS_DIR / skill_dir.name
+                if str(target) in targets or (target.is_dir() and not (target / SYNC_MARKER).is_file()):
+                    target = CURSOR_SKILLS_DIR / f"{marketplace}-{plugin_name}-{skill_dir.name}"
+                    log(f"Conflict for skill {skill_dir.name}, using prefixed name")
+
+                record, placed, removed = sync_skill(skill_dir, target, old_targets.get(str(target)),
+                                                     placer, rehash)
+                targets[str(target)] = record
+                totals["skills"] += 1
+                totals["placed"] += placed
+                totals["removed"] += removed
+                if placed or removed:
+                    log(f"Synced skill: {target.name} <- {skill_dir}/ ({placed} placed, {removed} removed)")
+
+        commands_dir = install_path / "commands"
+        if commands_dir.is_dir():
+            for cmd_file in sorted(commands_dir.glob("*.md")):
+                if not cmd_file.is_file():
+                    continue
+                target = CURSOR_COMMANDS_DIR / cmd_file.name
+                if str(target) in targets or (target.is_file() and not is_managed_command(target)):
+                    target = CURSOR_COMMANDS_DIR / f"{plugin_name}-{cmd_file.name}"
+                    log(f"Conflict for command {cmd_file.name}, using prefixed name")
+
+                record, written = sync_command(cmd_file, target, old_targets.get(str(target)), rehash)
+                targets[str(target)] = record
+                totals["commands"] += 1
+                if written:
+                    totals["placed"] += 1
+                    log(f"Copied command: {cmd_file.name} <- {cmd_file}")
+
+    # Clean up orphaned skills and commands (only those we created)
+    for path in sorted(CURSOR_SKILLS_DIR.iterdir()):
+        if str(path) not in targets and path.is_dir() and not path.is_symlink() \
+                and (path / SYNC_MARKER).is_file():
+            log(f"Removing orphaned skill: {path.name}")
+            shutil.rmtree(path)
+    for path in sorted(CURSOR_COMMANDS_DIR.glob("*.md")):
+        if str(path) not in targets and path.is_file() and is_managed_command(path):
+            log(f"Removing orphaned command: {path.name}")
+            path.unlink()
+
+    if targets != old_targets:
+        save_manifest(targets)
+
+    log(f"Sync complete ({totals['skills']} skills, {totals['commands']} commands, "
+        f"{totals['placed']} files placed, {totals['removed']} removed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark the history-analysis entry points against a corpus.
+
+Runs each entry point as a subprocess with HOME pointed at the corpus
+(see gen_corpus.py), repeating it --runs times. Reports p50/p95 wall time,
+throughput (MB/s and lines/s at p50) and peak RSS per entry point, and
+compares against a stored baseline.
+
+Usage:
+    bench.py --corpus DIR [--runs 5] [--only name1,name2] [--query auth]
+    bench.py --corpus DIR --save-baseline [--baseline PATH]
+    bench.py --corpus DIR --baseline PATH [--threshold 0.10]
+
+Exits 1 if any entry point's p50 time or peak RSS regressed by more than
+--threshold against the baseline.
+
+Output: JSON with per-entry-point results and regressions
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path.home() / ".claude" / "history-analyser" / "bench-baseline.json"
+
+
+def entry_points(manifest: str, query: str) -> dict:
+    """Commands to time, keyed by name. Shell entry points read $HOME/.claude."""
+    py = sys.executable
+    return {
+        "search_chunk": [py, str(SCRIPTS / "search_chunk.py"), "--query", query, "--manifest", manifest],
+        "search_chunk_index": [py, str(SCRIPTS / "search_chunk.py"), "--query", query, "--index"],
+        "search_chunk_rank": [py, str(SCRIPTS / "search_chunk.py"), "--query", query, "--index", "--rank"],
+        "summarise_chunk": [py, str(SCRIPTS / "summarise_chunk.py"), "--manifest", manifest],
+        "meta_cache": [py, str(SCRIPTS / "meta_cache.py"), "--manifest", manifest],
+        "fast_search": ["bash", str(SCRIPTS / "fast-search.sh"), query, "20"],
+        "fast_summarise": ["bash", str(SCRIPTS / "fast-summarise.sh"), "3650"],
+    }
+
+
+def corpus_stats(corpus: Path) -> tuple:
+    """Total bytes and lines across the corpus's project files."""
+    files = sorted(str(p) for p in (corpus / ".claude" / "projects").glob("*/*.jsonl"))
+    total_bytes = 0
+    total_lines = 0
+    for filepath in files:
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                total_bytes += len(block)
+                total_lines += block.count(b"\n")
+    return files, total_bytes, total_lines
+
+
+def write_manifest(files: list) -> str:
+    """A single-chunk manifest in chunk.sh's format, avoiding argv limits."""
+    fd, path = tempfile.mkstemp(suffix=".json", prefix="bench-manifest-")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"total_files": len(files), "chunk_count": 1, "chunks": [{"files": files}]}, f)
+    return path
+
+
+def run_once(cmd: list, env: dict) -> tuple:
+    """Run a command; return (wall seconds, peak RSS bytes, exit status)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KiB on Linux, bytes on macOS; it covers reaped descendants
+    rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return elapsed, rss, proc.returncode
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def bench(cmd: list, env: dict, runs: int, total_bytes: int, total_lines: int) -> dict:
+    # One untimed warm-up so page cache and any persistent index are built
+    run_once(cmd, env)
+
+    times = []
+    peak_rss = 0
+    failures = 0
+    for _ in range(runs):
+        elapsed, rss, code = run_once(cmd, env)
+        times.append(elapsed)
+        peak_rss = max(peak_rss, rss)
+        failures += code != 0
+
+    p50 = percentile(times, 0.5)
+    return {
+        "p50_s": round(p50, 4),
+        "p95_s": round(percentile(times, 0.95), 4),
+        "mb_per_s": round(total_bytes / (1024 ** 2) / p50, 2) if p50 else None,
+        "lines_per_s": round(total_lines / p50) if p50 else None,
+        "peak_rss_mb": round(peak_rss / (1024 ** 2), 1),
+        "failures": failures,
+    }
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list:
+    found = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for metric in ("p50_s", "peak_rss_mb"):
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                found.append({
+                    "entry_point": name,
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": result[metric],
+                    "change": f"{(result[metric] / base[metric] - 1) * 100:+.1f}%",
+                })
+    return found
+
+
+def main():
+    corpus = None
+    runs = 5
+    only = None
+    query = "auth"
+    baseline_path = DEFAULT_BASELINE
+    save_baseline = False
+    threshold = 0.10
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--corpus" and i + 1 < len(args):
+            corpus = Path(args[i + 1]).resolve()
+            i += 2
+        elif args[i] == "--runs" and i + 1 < len(args):
+            runs = int(args[i + 1])
+            i += 2
+        elif args[i] == "--only" and i + 1 < len(args):
+            only = args[i + 1].split(",")
+            i += 2
+        elif args[i] == "--query" and i + 1 < len(args):
+            query = args[i + 1]
+            i += 2
+        elif args[i] == "--baseline" and i + 1 < len(args):
+            baseline_path = Path(args[i + 1])
+            i += 2
+        elif args[i] == "--save-baseline":
+            save_baseline = True
+            i += 1
+        elif args[i] == "--threshold" and i + 1 < len(args):
+            threshold = float(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    if corpus is None:
+        print(json.dumps({"error": "Missing --corpus"}))
+        sys.exit(1)
+
+    files, total_bytes, total_lines = corpus_stats(corpus)
+    if not files:
+        print(json.dumps({"error": f"No project files under {corpus}/.claude/projects"}))
+        sys.exit(1)
+
+    # Caches (index, sidecars, summary state) live under the corpus's HOME
+    env = {**os.environ, "HOME": str(corpus)}
+    env.pop("HISTORY_INDEX_DB", None)
+    env.pop("HISTORY_SEEK_DIR", None)
+
+    manifest = write_manifest(files)
+    try:
+        results = {}
+        for name, cmd in entry_points(manifest, query).items():
+            if only and name not in only:
+                continue
+            results[name] = bench(cmd, env, runs, total_bytes, total_lines)
+    finally:
+        os.unlink(manifest)
+
+    report = {
+        "corpus": {"path": str(corpus), "files": len(files), "bytes": total_bytes, "lines": total_lines},
+        "runs": runs,
+        "results": results,
+    }
+
+    if save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        report["baseline_saved"] = str(baseline_path)
+    elif baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline.get("corpus", {}).get("bytes") != total_bytes:
+            report["warning"] = "Baseline was recorded against a different corpus size"
+        report["regressions"] = regressions(results, baseline, threshold)
+
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report.get("regressions") else 0)
+
+
+if __name__ == "__main__":
+    main()
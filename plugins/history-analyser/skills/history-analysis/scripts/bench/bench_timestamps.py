@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of entries.parse_timestamp and parse_timestamps.
+
+Times three ways of turning transcript timestamps into Unix ms against the
+same values: the original replace("Z", "+00:00") + fromisoformat path, the
+per-value parse_timestamp the scanners call, and the parse_timestamps batch
+API used by the column builders. Each result is checked against the
+original before it is reported.
+
+Timestamps come from a corpus (see gen_corpus.py) when --corpus is given,
+otherwise --count synthetic ones a few seconds apart.
+
+Usage:
+    bench_timestamps.py [--corpus DIR] [--count 100000] [--runs 5]
+
+Output: JSON with ns per timestamp (best of --runs) and speedups
+"""
+
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from entries import parse_timestamp, parse_timestamps  # noqa: E402
+
+
+def original(ts) -> int:
+    """parse_timestamp as it was before the fast path."""
+    if isinstance(ts, (int, float)):
+        return int(ts)
+    if isinstance(ts, str):
+        try:
+            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+            return int(dt.timestamp() * 1000)
+        except ValueError:
+            return 0
+    return 0
+
+
+def corpus_timestamps(corpus: Path) -> list:
+    values = []
+    for path in sorted((corpus / ".claude" / "projects").glob("*/*.jsonl")):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and "timestamp" in entry:
+                    values.append(entry["timestamp"])
+    return values
+
+
+def synthetic_timestamps(count: int) -> list:
+    rng = random.Random(0)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    values = []
+    for _ in range(count):
+        now += timedelta(milliseconds=rng.randint(1, 8000))
+        values.append(now.strftime("%Y-%m-%dT%H:%M:%S.") + f"{now.microsecond // 1000:03d}Z")
+    return values
+
+
+def best_ns(func, values: list, runs: int) -> float:
+    """Best-of-runs nanoseconds per value."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(values)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / len(values) * 1e9, 1)
+
+
+def main():
+    corpus = None
+    count = 100000
+    runs = 5
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--corpus" and i + 1 < len(args):
+            corpus = Path(args[i + 1])
+            i += 2
+        elif args[i] == "--count" and i + 1 < len(args):
+            count = int(args[i + 1])
+            i += 2
+        elif args[i] == "--runs" and i + 1 < len(args):
+            runs = int(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    values = corpus_timestamps(corpus) if corpus else synthetic_timestamps(count)
+    if not values:
+        print(json.dumps({"error": "No timestamps found"}))
+        sys.exit(1)
+
+    candidates = {
+        "original": lambda v: [original(ts) for ts in v],
+        "parse_timestamp": lambda v: [parse_timestamp(ts) for ts in v],
+        "parse_timestamps": parse_timestamps,
+    }
+    expected = candidates["original"](values)
+    for name, func in candidates.items():
+        if func(values) != expected:
+            print(json.dumps({"error": f"{name} disagrees with the original parser"}))
+            sys.exit(1)
+
+    ns = {name: best_ns(func, values, runs) for name, func in candidates.items()}
+    print(json.dumps({
+        "timestamps": len(values),
+        "ns_per_timestamp": ns,
+        "speedup": {name: round(ns["original"] / value, 2) for name, value in ns.items() if name != "original"},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic ~/.claude tree for benchmarking.
+
+Writes project conversation files following references/data-formats.md:
+user messages, assistant messages with text/tool_use blocks and usage,
+tool_result turns, and file-history-snapshot entries, chained by
+uuid/parentUuid with chronological timestamps. Output is deterministic
+for a given --seed and --size.
+
+Usage:
+    gen_corpus.py --out DIR [--size 100MB] [--seed N] [--projects N] [--days N]
+
+Point the scripts at it with HOME=DIR.
+
+Output: JSON with files, bytes and lines written
+"""
+
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+WORDS = (
+    "auth token login session cache index query parser refactor deploy "
+    "build test fixture migration schema handler router config flake nix "
+    "sqlite postgres pocketbase worker queue retry timeout stream buffer "
+    "error warning trace metric latency throughput memory review commit "
+    "branch merge rebase release docs readme plugin skill hook agent"
+).split()
+
+TOOLS = ["Read", "Edit", "Write", "Bash", "Grep", "Glob", "Task", "WebFetch"]
+MODELS = ["claude-opus-4-1-20250805", "claude-sonnet-4-5-20250929", "claude-haiku-4-5-20251001"]
+BRANCHES = ["main", "feature/auth", "fix/cache", "refactor/parser"]
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choices(WORDS, k=n))
+
+
+def iso(ts: datetime) -> str:
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ts.microsecond // 1000:03d}Z"
+
+
+def session_entries(rng: random.Random, session_id: str, cwd: str, start: datetime):
+    """Yield entries for one session forever; the caller decides when to stop."""
+    ts = start
+    parent = None
+    branch = rng.choice(BRANCHES)
+
+    def base(entry_type: str) -> dict:
+        nonlocal parent
+        entry_uuid = str(uuid.UUID(int=rng.getrandbits(128)))
+        entry = {
+            "type": entry_type,
+            "uuid": entry_uuid,
+            "parentUuid": parent,
+            "timestamp": iso(ts),
+            "sessionId": session_id,
+            "cwd": cwd,
+            "gitBranch": branch,
+        }
+        parent = entry_uuid
+        return entry
+
+    while True:
+        ts += timedelta(seconds=rng.randint(5, 900))
+        entry = base("user")
+        entry["message"] = {"role": "user", "content": sentence(rng, rng.randint(4, 40))}
+        yield entry
+
+        for _ in range(rng.randint(1, 4)):
+            ts += timedelta(milliseconds=rng.randint(300, 20000))
+            tool = rng.choice(TOOLS)
+            entry = base("assistant")
+            entry["message"] = {
+                "role": "assistant",
+                "model": rng.choice(MODELS),
+                "content": [
+                    {"type": "text", "text": sentence(rng, rng.randint(5, 60))},
+                    {"type": "tool_use", "id": f"toolu_{rng.getrandbits(48):012x}", "name": tool,
+                     "input": {"file_path": f"{cwd}/src/{rng.choice(WORDS)}.py",
+                               "description": sentence(rng, 6)}},
+                ],
+                "usage": {
+                    "input_tokens": rng.randint(10, 4000),
+                    "output_tokens": rng.randint(10, 2000),
+                    "cache_read_input_tokens": rng.randint(0, 50000),
+                    "cache_creation_input_tokens": rng.randint(0, 5000),
+                },
+            }
+            yield entry
+
+            ts += timedelta(milliseconds=rng.randint(50, 5000))
+            entry = base("user")
+            entry["message"] = {"role": "user", "content": [{
+                "type": "tool_result",
+                "tool_use_id": "toolu_x",
+                "content": sentence(rng, rng.choice([20, 200, 2000])),
+            }]}
+            yield entry
+
+        if rng.random() < 0.2:
+            yield {
+                "type": "file-history-snapshot",
+                "messageId": parent,
+                "timestamp": iso(ts),
+                "snapshot": {"trackedFileBackups": {f"src/{rng.choice(WORDS)}.py": {"version": 1}}},
+            }
+
+        ts += timedelta(seconds=rng.randint(1, 120))
+        entry = base("assistant")
+        entry["message"] = {
+            "role": "assistant",
+            "model": rng.choice(MODELS),
+            "content": [{"type": "text", "text": sentence(rng, rng.randint(10, 120))}],
+            "usage": {"input_tokens": rng.randint(10, 4000), "output_tokens": rng.randint(10, 2000)},
+        }
+        yield entry
+
+
+def generate(out: Path, size: int, seed: int, projects: int, days: int) -> dict:
+    rng = random.Random(seed)
+    projects_dir = out / ".claude" / "projects"
+    end = datetime(2025, 12, 31, tzinfo=timezone.utc)
+    written = {"files": 0, "bytes": 0, "lines": 0}
+
+    while written["bytes"] < size:
+        cwd = f"/home/dev/code/project-{rng.randrange(projects)}"
+        session_dir = projects_dir / cwd.replace("/", "-")
+        session_dir.mkdir(parents=True, exist_ok=True)
+        session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        start = end - timedelta(days=rng.uniform(0, days))
+
+        # Session sizes are long-tailed: most are small, a few are huge
+        target = min(int(rng.paretovariate(1.2) * 20_000), size - written["bytes"], 200 * 1024 ** 2)
+        file_bytes = 0
+        with open(session_dir / f"{session_id}.jsonl", "w") as f:
+            for entry in session_entries(rng, session_id, cwd, start):
+                line = json.dumps(entry, separators=(",", ":")) + "\n"
+                f.write(line)
+                file_bytes += len(line)
+                written["lines"] += 1
+                if file_bytes >= target:
+                    break
+
+        written["files"] += 1
+        written["bytes"] += file_bytes
+
+    return {"out": str(out), "seed": seed, **written}
+
+
+def main():
+    out = None
+    size = parse_size("100MB")
+    seed = 0
+    projects = 12
+    days = 365
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--out" and i + 1 < len(args):
+            out = Path(args[i + 1])
+            i += 2
+        elif args[i] == "--size" and i + 1 < len(args):
+            size = parse_size(args[i + 1])
+            i += 2
+        elif args[i] == "--seed" and i + 1 < len(args):
+            seed = int(args[i + 1])
+            i += 2
+        elif args[i] == "--projects" and i + 1 < len(args):
+            projects = int(args[i + 1])
+            i += 2
+        elif args[i] == "--days" and i + 1 < len(args):
+            days = int(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    if out is None:
+        print(json.dumps({"error": "Missing --out"}))
+        sys.exit(1)
+
+    print(json.dumps(generate(out, size, seed, projects, days), indent=2))
+
+
+if __name__ == "__main__":
+    main()
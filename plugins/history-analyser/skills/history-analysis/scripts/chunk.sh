@@ -1,9 +1,16 @@
 #!/bin/bash
 # Fast chunk manifest using find + jq
 # Usage: chunk.sh [days]
+#
+# Archived sessions (.jsonl.gz / .jsonl.zst, see history_archive.py) are
+# sized by their uncompressed bytes, the work a chunk will actually parse.
+#
+# HISTORY_PROFILE=1 adds a "stats" block with the wall and CPU seconds of
+# file discovery (find + stat) and of chunking (jq).
 
 set -uo pipefail
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 CLAUDE_DIR="$HOME/.claude"
 PROJECTS_DIR="$CLAUDE_DIR/projects"
 MAX_FILES=5
@@ -11,12 +18,19 @@ MAX_BYTES=200000  # ~50k tokens at 4 chars/token
 
 days="${1:-7}"
 
-# Collect files with sizes (compatible with GNU and BSD stat)
-find "$PROJECTS_DIR" -name "*.jsonl" -type f -mtime -"$days" 2>/dev/null | \
-    while IFS= read -r f; do
-        size=$(stat -c %s "$f" 2>/dev/null || stat -f %z "$f" 2>/dev/null || echo 0)
-        printf '{"path":"%s","size":%s}\n' "$f" "$size"
-    done | \
+# Collect files with sizes (compatible with GNU and BSD stat); archive
+# sizes come from their frame tables in one Python call
+collect_files() {
+    find "$PROJECTS_DIR" -name "*.jsonl" -type f -mtime -"$days" 2>/dev/null | \
+        while IFS= read -r f; do
+            size=$(stat -c %s "$f" 2>/dev/null || stat -f %z "$f" 2>/dev/null || echo 0)
+            printf '{"path":"%s","size":%s}\n' "$f" "$size"
+        done
+    find "$PROJECTS_DIR" \( -name "*.jsonl.gz" -o -name "*.jsonl.zst" \) -type f -mtime -"$days" 2>/dev/null | \
+        python3 "$SCRIPT_DIR/history_archive.py" sizes
+}
+
+build_manifest() {
     jq -s --argjson max_files "$MAX_FILES" --argjson max_bytes "$MAX_BYTES" '
         def chunk_files:
             reduce .[] as $f (
@@ -41,3 +55,28 @@ find "$PROJECTS_DIR" -name "*.jsonl" -type f -mtime -"$days" 2>/dev/null | \
             chunks: chunk_files
         }
     '
+}
+
+if [[ -z "${HISTORY_PROFILE:-}" ]]; then
+    collect_files | build_manifest
+    exit
+fi
+
+# Time each stage with bash's time builtin ("REAL USER SYS", children included)
+tmp=$(mktemp -d)
+trap 'rm -rf "$tmp"' EXIT
+TIMEFORMAT="%R %U %S"
+{ time collect_files > "$tmp/files"; } 2> "$tmp/discover"
+{ time build_manifest < "$tmp/files" > "$tmp/manifest"; } 2> "$tmp/chunk"
+
+jq --arg discover "$(tail -n 1 "$tmp/discover")" --arg chunk "$(tail -n 1 "$tmp/chunk")" '
+    def seconds: . * 1000000 | round / 1000000;
+    def stage: split(" ") | map(tonumber) | {wall_s: .[0], cpu_s: (.[1] + .[2] | seconds), calls: 1};
+    ($discover | stage) as $d | ($chunk | stage) as $c |
+    . + {stats: {
+        wall_s: ($d.wall_s + $c.wall_s | seconds),
+        cpu_s: ($d.cpu_s + $c.cpu_s | seconds),
+        stages: {discover: $d, chunk: $c},
+        counters: {files: .total_files, bytes: .total_bytes}
+    }}
+' "$tmp/manifest"
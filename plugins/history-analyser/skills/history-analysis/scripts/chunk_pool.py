@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Run per-chunk work across a process pool.
+
+Shared by search_chunk.py and summarise_chunk.py for their --workers and
+--manifest options. The manifest is chunk.sh's JSON output; each chunk is
+one task, and results come back in manifest order so output matches a
+serial run.
+
+With stats (see profiling.py), func is called with stats=... and each
+worker's timings are merged into the caller's Stats.
+"""
+
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import process_time
+
+
+def load_manifest(source: str) -> list:
+    """Read a chunk.sh manifest from a path ('-' for stdin) into file lists."""
+    if source == "-":
+        manifest = json.load(sys.stdin)
+    else:
+        with open(source) as f:
+            manifest = json.load(f)
+    return [chunk["files"] for chunk in manifest.get("chunks", []) if chunk.get("files")]
+
+
+def split_files(files: list, workers: int) -> list:
+    """Chunk a flat file list when no manifest is given: one file per task."""
+    return [[f] for f in files] if workers > 1 else [files]
+
+
+def run_profiled(func, files: list, *args) -> tuple:
+    """Pool task: func(files, *args) with fresh stats, returned alongside the result."""
+    from profiling import Stats
+    stats = Stats()
+    result = func(files, *args, stats=stats)
+    stats.worker_cpu += process_time() - stats.cpu_start
+    return result, stats
+
+
+def imap_chunks(func, chunks: list, workers: int, *args, stats=None):
+    """Yield func(files, *args) for each chunk in chunk order as results arrive.
+
+    Closing the generator early cancels chunks that have not started.
+    """
+    if workers <= 1 or len(chunks) <= 1:
+        for files in chunks:
+            if stats is None:
+                yield func(files, *args)
+            else:
+                yield func(files, *args, stats=stats)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(chunks)))
+    try:
+        if stats is None:
+            futures = [pool.submit(func, files, *args) for files in chunks]
+        else:
+            futures = [pool.submit(run_profiled, func, files, *args) for files in chunks]
+        for future in futures:
+            if stats is None:
+                yield future.result()
+            else:
+                result, part = future.result()
+                stats.merge(part)
+                yield result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def map_chunks(func, chunks: list, workers: int, *args, stats=None) -> list:
+    """Apply func(files, *args) to each chunk and return results in chunk order."""
+    return list(imap_chunks(func, chunks, workers, *args, stats=stats))
@@ -0,0 +1,150 @@
+"""
+Field extraction shared by the scripts that read project JSONL entries.
+
+search_chunk.py, summarise_chunk.py, fast_engine.py, the index and the
+sidecar builders all take timestamps and text from here, so a given entry
+yields the same values whichever script reads it.
+"""
+
+from datetime import datetime
+from functools import cache
+
+# Batches below this size are parsed one by one; numpy's setup dominates
+BATCH_MIN = 256
+
+# Shape of a transcript timestamp, for the batch path: each byte of a value
+# minus the template's must be at most the limit (a digit, or the exact
+# separator). Values are held to 1900-2199, where microseconds since the
+# epoch fit a float exactly and numpy's arithmetic rounds as Python's does.
+_TEMPLATE = b"0000-00-00T00:00:00.000Z"
+_LIMIT = bytes(9 if c == ord("0") else 0 for c in _TEMPLATE)
+_MIN_US = -2208988800 * 10 ** 6
+_MAX_US = 7258118400 * 10 ** 6
+
+_fromisoformat = datetime.fromisoformat
+
+
+@cache
+def _numpy():
+    # Imported on the first large batch, not by every script reading entries
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _parse_iso(ts: str) -> int:
+    try:
+        dt = _fromisoformat(ts.replace("Z", "+00:00"))
+        return int(dt.timestamp() * 1000)
+    except ValueError:
+        return 0
+
+
+def parse_timestamp(ts) -> int:
+    """Convert various timestamp formats to Unix ms.
+
+    Strings go straight to datetime.fromisoformat, which reads a trailing
+    "Z" itself on Python 3.11+; older versions, and strings it rejects, are
+    retried with "Z" spelled "+00:00".
+    """
+    if isinstance(ts, str):
+        try:
+            return int(_fromisoformat(ts).timestamp() * 1000)
+        except ValueError:
+            return _parse_iso(ts)
+    if isinstance(ts, (int, float)):
+        return int(ts)
+    return 0
+
+
+def _parse_batch(np, values: list):
+    """numpy-parsed Unix ms for a list of transcript timestamps, or None.
+
+    None unless every value is a "YYYY-MM-DDTHH:MM:SS.mmmZ" string numpy
+    parses, so the result always equals parse_timestamp's.
+    """
+    width = len(_TEMPLATE)
+    try:
+        data = "".join(values).encode("ascii")
+    except (TypeError, UnicodeEncodeError):
+        return None
+    if len(data) != width * len(values):
+        return None
+    rows = np.frombuffer(data, dtype=np.uint8).reshape(-1, width)
+    template = np.frombuffer(_TEMPLATE, dtype=np.uint8)
+    if not ((rows - template) <= np.frombuffer(_LIMIT, dtype=np.uint8)).all():
+        return None
+    try:
+        # Without the "Z": numpy warns on timezone designators
+        stamps = np.ascontiguousarray(rows[:, :-1]).view(f"S{width - 1}").ravel()
+        micros = stamps.astype("datetime64[us]").astype(np.int64)
+    except ValueError:
+        return None
+    if micros.min() < _MIN_US or micros.max() >= _MAX_US:
+        return None
+    # The same arithmetic as datetime.timestamp() * 1000, truncated like int()
+    return (micros / 1e6 * 1000).astype(np.int64).tolist()
+
+
+def parse_timestamps(values) -> list:
+    """parse_timestamp over a sequence, for callers that collect a column first.
+
+    Large batches of transcript timestamps are parsed in one numpy call when
+    numpy is installed; anything else falls back to the per-value loop.
+    """
+    values = list(values)
+    if len(values) >= BATCH_MIN and (np := _numpy()) is not None:
+        parsed = _parse_batch(np, values)
+        if parsed is not None:
+            return parsed
+    parse = parse_timestamp
+    return [parse(ts) for ts in values]
+
+
+def extract_content(entry: dict) -> str:
+    """Extract all searchable text from an entry."""
+    texts = []
+
+    if "display" in entry:
+        texts.append(entry["display"])
+
+    message = entry.get("message", {})
+    content = message.get("content", [])
+
+    if isinstance(content, str):
+        texts.append(content)
+    elif isinstance(content, list):
+        for item in content:
+            if isinstance(item, dict):
+                if item.get("type") == "text":
+                    texts.append(item.get("text", ""))
+                elif item.get("type") == "tool_use":
+                    texts.append(f"[tool: {item.get('name', '')}]")
+                    if "input" in item:
+                        texts.append(str(item["input"]))
+                elif item.get("type") == "tool_result":
+                    result = item.get("content", "")
+                    if isinstance(result, str):
+                        texts.append(result[:500])
+
+    return "\n".join(texts)
+
+
+def extract_user_query(entry: dict) -> str:
+    """Extract user's query text."""
+    if "display" in entry:
+        return entry["display"]
+
+    message = entry.get("message", {})
+    content = message.get("content", [])
+
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        for item in content:
+            if isinstance(item, dict) and item.get("type") == "text":
+                return item.get("text", "")
+    return ""
+
@@ -1,65 +1,50 @@
 #!/bin/bash
-# Optimised search: rg for speed, jq for parsing
-# Usage: fast-search.sh "pattern" [limit]
+# Optimised search: rg for speed, fast_engine.py for parsing
+# Usage: fast-search.sh [--stream] "pattern" [limit]
+#
+# --stream prints each deduped match as an NDJSON line as soon as rg finds it
+# and stops after [limit] matches. Matches arrive in file order rather than
+# newest-first, and no total is reported.
+#
+# Near-duplicate matches (similar content, not just a shared prefix) are
+# dropped as they stream past (see near_dup.py); NEAR_DUP_THRESHOLD tunes it.
+#
+# rg -z also searches archived sessions (.jsonl.gz / .jsonl.zst).
+#
+# fast_engine.py turns rg's events into match records and keeps only the
+# newest [limit] in a bounded heap, so memory stays flat on any history.
+#
+# HISTORY_PROFILE=1 adds a "stats" block (a final line with --stream) timing
+# the wait on rg and each engine stage.
 
 set -uo pipefail
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 CLAUDE_DIR="$HOME/.claude"
 PROJECTS_DIR="$CLAUDE_DIR/projects"
 
+stream_flag=""
+if [[ "${1:-}" == "--stream" ]]; then
+    stream_flag="--stream"
+    shift
+fi
+
+profile_flag=""
+if [[ -n "${HISTORY_PROFILE:-}" ]]; then
+    profile_flag="--profile"
+fi
+
 query="${1:-}"
 limit="${2:-20}"
+threshold="${NEAR_DUP_THRESHOLD:-0.6}"
 
 if [[ -z "$query" ]]; then
-    echo '{"error": "Usage: fast-search.sh pattern [limit]"}'
+    echo '{"error": "Usage: fast-search.sh [--stream] pattern [limit]"}'
     exit 1
 fi
 
-# rg --json gives structured output we can parse
-rg -i --json "$query" "$PROJECTS_DIR" 2>/dev/null | \
-jq -s --arg q "$query" --argjson limit "$limit" '
-    # Filter to match lines only
-    [.[] | select(.type == "match")] |
-
-    # Parse the JSON content of each matching line
-    [.[] | .data | {
-        file: .path.text,
-        line_num: .line_number,
-        raw: .lines.text
-    }] |
-
-    # Parse the JSONL content and extract useful info
-    [.[] | . as $meta | try (
-        .raw | fromjson |
-        select(.type == "user" or .type == "assistant") |
-        {
-            file: $meta.file,
-            line: $meta.line_num,
-            type: .type,
-            timestamp: .timestamp,
-            project: (.cwd | split("/") | last),
-            session: .sessionId[0:8],
-            content: (
-                if .type == "user" then
-                    (.message.content | if type == "string" then .[0:200] else "" end) //
-                    .display[0:200] // ""
-                else
-                    # Assistant: extract text blocks
-                    [.message.content[]? | select(.type == "text") | .text[0:100]] | join(" ")[0:200]
-                end
-            )
-        } | select(.content != "" and (.content | length) > 10)
-    ) catch empty] |
-
-    # Dedupe by content similarity, keep first occurrence
-    unique_by(.content[0:50]) |
-
-    # Sort by timestamp desc
-    sort_by(.timestamp) | reverse |
-
-    {
-        query: $q,
-        total_matches: length,
-        matches: .[:$limit]
-    }
-'
+# rg --json gives structured output; the engine exits after [limit] matches
+# in stream mode, and rg then stops on SIGPIPE
+rg -i -z --json "$query" "$PROJECTS_DIR" 2>/dev/null | \
+    python3 "$SCRIPT_DIR/fast_engine.py" search --query "$query" --limit "$limit" \
+        --threshold "$threshold" $stream_flag $profile_flag
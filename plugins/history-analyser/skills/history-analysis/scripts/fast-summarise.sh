@@ -1,9 +1,16 @@
 #!/bin/bash
-# Fast summarisation using jq
+# Fast summarisation of recent sessions
 # Usage: fast-summarise.sh [days] [file_limit]
+#
+# fast_engine.py answers each file from its meta_cache.py columns, or
+# streams it entry by entry with flat memory when the columns cannot stand in.
+# Archived sessions (.jsonl.gz / .jsonl.zst) are decompressed on the fly.
+#
+# HISTORY_PROFILE=1 adds a "stats" block timing find and each engine stage.
 
 set -uo pipefail
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 CLAUDE_DIR="$HOME/.claude"
 PROJECTS_DIR="$CLAUDE_DIR/projects"
 
@@ -20,65 +27,28 @@ while [[ $# -gt 0 ]]; do
     esac
 done
 
-# Find recent files and aggregate with jq
-if [[ "$file_limit" -gt 0 ]]; then
-    files=$(find "$PROJECTS_DIR" -name "*.jsonl" -type f -mtime -"$days" 2>/dev/null | head -n "$file_limit")
+find_files() {
+    find "$PROJECTS_DIR" \( -name "*.jsonl" -o -name "*.jsonl.gz" -o -name "*.jsonl.zst" \) \
+        -type f -mtime -"$days" 2>/dev/null
+}
+
+list_files() {
+    if [[ "$file_limit" -gt 0 ]]; then
+        find_files | head -n "$file_limit"
+    else
+        find_files
+    fi
+}
+
+# Find recent files and aggregate them
+if [[ -n "${HISTORY_PROFILE:-}" ]]; then
+    timing=$(mktemp)
+    trap 'rm -f "$timing"' EXIT
+    TIMEFORMAT="%R %U %S"
+    { time files=$(list_files); } 2> "$timing"
+    echo "$files" | python3 "$SCRIPT_DIR/fast_engine.py" summarise --profile \
+        --stage discover "$(tail -n 1 "$timing")"
 else
-    files=$(find "$PROJECTS_DIR" -name "*.jsonl" -type f -mtime -"$days" 2>/dev/null)
+    files=$(list_files)
+    echo "$files" | python3 "$SCRIPT_DIR/fast_engine.py" summarise
 fi
-
-echo "$files" | \
-    xargs cat 2>/dev/null | \
-    jq -s '
-        # Filter to user/assistant messages
-        [.[] | select(.type == "user" or .type == "assistant")] |
-
-        {
-            message_count: length,
-            user_count: [.[] | select(.type == "user")] | length,
-            assistant_count: [.[] | select(.type == "assistant")] | length,
-
-            # Top projects by message count
-            projects: (
-                [.[] | .cwd // "" | split("/") | last | select(. != "")] |
-                group_by(.) |
-                map({project: .[0], count: length}) |
-                sort_by(-.count) |
-                .[0:10]
-            ),
-
-            # Top tools used
-            tools_used: (
-                [.[] | .message.content // [] | .[]? | select(.type == "tool_use") | .name] |
-                group_by(.) |
-                map({tool: .[0], count: length}) |
-                sort_by(-.count) |
-                .[0:10]
-            ),
-
-            # Recent user queries (filtered for real questions)
-            recent_queries: (
-                [.[] | select(.type == "user") | {
-                    query: (
-                        (.message.content | if type == "string" then .[0:150] else "" end) //
-                        .display[0:150] // ""
-                    ),
-                    timestamp: .timestamp,
-                    project: (.cwd // "" | split("/") | last)
-                }] |
-                # Filter out noise: system messages, commands, notifications
-                [.[] | select(
-                    .query != "" and
-                    (.query | length) > 15 and
-                    (.query | startswith("<") | not) and
-                    (.query | startswith("Caveat:") | not) and
-                    (.query | contains("<command-name>") | not) and
-                    (.query | contains("<local-command") | not) and
-                    (.query | contains("<bash-notification>") | not) and
-                    (.query | contains("<system-reminder>") | not)
-                )] |
-                sort_by(.timestamp) | reverse |
-                .[0:15]
-            )
-        }
-    '
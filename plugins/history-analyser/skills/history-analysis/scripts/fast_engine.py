@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Streaming engine behind fast-search.sh and fast-summarise.sh.
+
+Both scripts used to slurp every record into a single jq array (jq -s), so
+memory grew with the history. This engine folds records one at a time and
+keeps only what the output needs: counters for the grouped fields and
+bounded heaps for the newest queries and matches. Memory stays flat however
+many days are read.
+
+The output reproduces the jq schemas exactly, jq semantics included:
+- sort_by(...) | reverse ordering puts later records first on ties
+- null sorts before strings
+- a record jq would have failed on is dropped
+- "" is a value, not an absence, for the // operator
+- strings are sliced by code point
+That is why the field projections (jq_fields.py) are separate from
+entries.py, whose helpers feed search_chunk.py and summarise_chunk.py.
+
+Usage:
+    rg -i -z --json PATTERN DIR | fast_engine.py search --query PATTERN
+        [--limit 20] [--stream] [--threshold 0.6]
+    find ... -name '*.jsonl' | fast_engine.py summarise
+    ... [--profile [--stage NAME "REAL USER SYS"]...]
+
+search reads rg --json events on stdin and drops near-duplicate matches
+(see near_dup.py). --stream prints each match as compact NDJSON as it
+arrives and stops after --limit. summarise reads file paths on stdin, one
+per line, and decompresses archives transparently (see history_archive.py).
+It answers each file from its meta_cache.py columns where they reproduce
+the jq result, decoding only the lines of candidate recent queries, and
+folds the file's records otherwise.
+
+--profile adds a "stats" block (a final {"stats": ...} line with --stream)
+timing each stage (see profiling.py); waiting on rg or on the path list
+counts as the "rg" or "discover" stage. --stage records a stage the calling
+script timed itself with bash's time builtin (TIMEFORMAT="%R %U %S").
+fast-search.sh, fast-summarise.sh and chunk.sh pass these when
+HISTORY_PROFILE is set.
+
+Output: JSON in the fast-search.sh / fast-summarise.sh schemas
+"""
+
+import heapq
+import json
+import os
+import sys
+
+from history_archive import open_history
+from jq_fields import Skip, jq_get, jq_key, jq_slice, jq_values, last_component, user_query
+from json_backend import DECODE_ERRORS, loads
+from near_dup import DEFAULT_THRESHOLD, NearDuplicateFilter
+from profiling import Stats, stage
+
+RECENT_QUERIES = 15
+TOP_GROUPS = 10
+MATCH_WIDTH = 200
+BLOCK_WIDTH = 100
+MIN_MATCH_CHARS = 10
+
+
+def jq_dumps(value, pretty: bool = True) -> str:
+    # jq writes non-ASCII as is but escapes DEL
+    if pretty:
+        text = json.dumps(value, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return text.replace("\x7f", "\\u007f")
+
+
+class Newest:
+    """The n records with the greatest key, later records first on ties.
+
+    Equivalent to jq's sort_by(key) | reverse | .[0:n] without holding the
+    whole stream.
+    """
+
+    def __init__(self, n: int):
+        self.n = max(n, 0)
+        self.heap = []
+        self.seq = 0
+
+    def push(self, key, record):
+        self.seq += 1
+        item = (jq_key(key), self.seq, record)
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, item)
+        elif self.heap and item[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, item)
+
+    def records(self) -> list:
+        return [record for _, _, record in sorted(self.heap, key=lambda item: item[:2], reverse=True)]
+
+
+def top_groups(counts: dict, field: str, n: int = TOP_GROUPS) -> list:
+    """group_by(.) | map({field: .[0], count: length}) | sort_by(-.count) | .[0:n]"""
+    ordered = sorted(counts.items(), key=lambda kv: (-kv[1], jq_key(kv[0])))
+    return [{field: name, "count": count} for name, count in ordered[:n]]
+
+
+def to_match(event: dict) -> dict:
+    """One rg --json match event as a fast-search.sh match record, or None."""
+    data = event.get("data") or {}
+    try:
+        text = jq_get(data.get("lines"), "text")
+        if not isinstance(text, str):
+            return None
+        try:
+            entry = loads(text)
+        except DECODE_ERRORS:
+            return None
+        if not isinstance(entry, dict) or entry.get("type") not in ("user", "assistant"):
+            return None
+
+        message = entry.get("message")
+        if entry["type"] == "user":
+            content = jq_get(message, "content")
+            content = content[:MATCH_WIDTH] if isinstance(content, str) else ""
+        else:
+            texts = []
+            for block in jq_values(jq_get(message, "content")):
+                if jq_get(block, "type") == "text":
+                    texts.append(jq_slice(block.get("text"), BLOCK_WIDTH) or "")
+            content = " ".join(texts)[:MATCH_WIDTH]
+
+        record = {
+            "file": jq_get(data.get("path"), "text"),
+            "line": data.get("line_number"),
+            "type": entry["type"],
+            "timestamp": entry.get("timestamp"),
+            "project": last_component(entry.get("cwd")),
+            "session": jq_slice(entry.get("sessionId"), 8),
+            "content": content,
+        }
+    except Skip:
+        return None
+    if len(content) <= MIN_MATCH_CHARS:
+        return None
+    return record
+
+
+def iter_matches(stream, threshold: float, stats=None):
+    """Distinct match records from rg --json events.
+
+    With stats (see profiling.py), time spent waiting on rg is the "rg" stage.
+    """
+    dedupe = NearDuplicateFilter(threshold)
+    decode, match, is_duplicate = loads, to_match, dedupe.is_duplicate
+    if stats is not None:
+        stream = stats.reading(stream, name="rg")
+        decode = stats.timed("decode", decode, DECODE_ERRORS)
+        match = stats.timed("match", match)
+        is_duplicate = stats.timed("dedupe", is_duplicate)
+
+    for line in stream:
+        try:
+            event = decode(line)
+        except DECODE_ERRORS:
+            continue
+        if not isinstance(event, dict) or event.get("type") != "match":
+            continue
+        record = match(event)
+        if record is not None and not is_duplicate(record["content"]):
+            yield record
+
+
+def search(stream, query: str, limit: int, threshold: float, stats=None) -> dict:
+    newest = Newest(limit)
+    push = newest.push if stats is None else stats.timed("select", newest.push)
+    total = 0
+    for record in iter_matches(stream, threshold, stats):
+        total += 1
+        push(record["timestamp"], record)
+    return {"query": query, "total_matches": total, "matches": newest.records()}
+
+
+def search_stream(stream, limit: int, threshold: float, stats=None):
+    """Print matches as NDJSON; with stats, a final {"stats": ...} line follows."""
+    if limit > 0:
+        out = sys.stdout
+        write = out.write if stats is None else stats.timed("output", out.write)
+        for n, record in enumerate(iter_matches(stream, threshold, stats), 1):
+            write(jq_dumps(record, pretty=False) + "\n")
+            out.flush()
+            if n >= limit:
+                break
+    if stats is not None:
+        print(json.dumps({"stats": stats.report()}))
+
+
+def summarise(paths, stats=None) -> dict:
+    """The fast-summarise.sh summary; with stats, the wait for paths is "discover"."""
+    counts = {"user": 0, "assistant": 0}
+    projects = {}
+    tools = {}
+    recent = Newest(RECENT_QUERIES)
+
+    def fold(entry: dict):
+        if not isinstance(entry, dict) or entry.get("type") not in counts:
+            return
+        try:
+            cwd = entry.get("cwd") or ""
+            project = last_component(cwd if isinstance(cwd, str) else "")
+            names = [
+                jq_get(block, "name")
+                for block in jq_values(jq_get(entry.get("message"), "content") or [])
+                if jq_get(block, "type") == "tool_use"
+            ]
+            query = user_query(entry, project) if entry["type"] == "user" else None
+        except Skip:
+            return
+
+        counts[entry["type"]] += 1
+        if project != "":
+            projects[project] = projects.get(project, 0) + 1
+        for name in names:
+            tools[name] = tools.get(name, 0) + 1
+        if query is not None:
+            recent.push(query["timestamp"], query)
+
+    def fold_columns(path: str) -> bool:
+        """Count a file from its columns; False when it has to be folded record by record."""
+        from meta_cache import KINDS, RECENT, first_seen_counts, query_rows, read_entries, refresh_cache
+
+        try:
+            cache = refresh_cache(path)
+        except (OSError, ValueError):
+            return False
+        if cache["irregular"] or not cache["complete"]:
+            return False
+
+        for kind, n in first_seen_counts(cache["kind"]):
+            counts[KINDS[kind]] += n
+        names = [last_component(cwd) for cwd in cache["cwds"]]
+        for code, n in first_seen_counts(cache["cwd"]):
+            if names[code] != "":
+                projects[names[code]] = projects.get(names[code], 0) + n
+        for code, n in first_seen_counts(cache["tool"]):
+            tools[cache["tools"][code]] = tools.get(cache["tools"][code], 0) + n
+        # Only this file's newest candidates can reach the overall newest;
+        # they are pushed in file order, as the fold would push them
+        rows = query_rows(cache, RECENT, limit=RECENT_QUERIES, later=True)
+        for row, entry in sorted(read_entries(path, cache, rows).items()):
+            query = user_query(entry, names[cache["cwd"][row]])
+            recent.push(query["timestamp"], query)
+        return True
+
+    decode = loads
+    if stats is not None:
+        paths = stats.reading(paths, name="discover", count=False)
+        decode = stats.timed("decode", decode, DECODE_ERRORS)
+        fold = stats.timed("fold", fold)
+
+    for path in paths:
+        with stage(stats, "columns"):
+            cached = fold_columns(path)
+        if cached:
+            if stats is not None:
+                stats.count("files")
+            continue
+        try:
+            f = open_history(path)
+        except (OSError, ValueError):
+            continue
+        with f:
+            lines = f
+            if stats is not None:
+                stats.count("files")
+                lines = stats.reading(f)
+            for line in lines:
+                try:
+                    entry = decode(line)
+                except DECODE_ERRORS:
+                    continue
+                fold(entry)
+
+    return {
+        "message_count": counts["user"] + counts["assistant"],
+        "user_count": counts["user"],
+        "assistant_count": counts["assistant"],
+        "projects": top_groups(projects, "project"),
+        "tools_used": top_groups(tools, "tool"),
+        "recent_queries": recent.records(),
+    }
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    query = None
+    limit = 20
+    stream = False
+    threshold = DEFAULT_THRESHOLD
+    stats = None
+    shell_stages = []
+
+    args = sys.argv[2:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--query" and i + 1 < len(args):
+            query = args[i + 1]
+            i += 2
+        elif args[i] == "--limit" and i + 1 < len(args):
+            limit = int(args[i + 1])
+            i += 2
+        elif args[i] == "--threshold" and i + 1 < len(args):
+            threshold = float(args[i + 1])
+            i += 2
+        elif args[i] == "--stream":
+            stream = True
+            i += 1
+        elif args[i] == "--profile":
+            stats = Stats()
+            i += 1
+        elif args[i] == "--stage" and i + 2 < len(args):
+            shell_stages.append((args[i + 1], args[i + 2]))
+            i += 3
+        else:
+            i += 1
+
+    if stats is not None:
+        # Stages timed by the calling script with bash's time: "REAL USER SYS"
+        for name, times in shell_stages:
+            try:
+                wall, user, system = (float(t) for t in times.split())
+            except ValueError:
+                continue
+            stats.add(name, wall, user + system)
+
+    if command == "summarise":
+        paths = (line.rstrip("\n") for line in sys.stdin)
+        result = summarise((p for p in paths if p), stats)
+        if stats is not None:
+            with stats.stage("output"):
+                jq_dumps(result)
+            result["stats"] = stats.report()
+        print(jq_dumps(result))
+        return
+
+    if command != "search" or query is None:
+        print(json.dumps({"error": "Usage: fast_engine.py search --query PATTERN [...] | summarise"}))
+        sys.exit(1)
+
+    try:
+        if stream:
+            search_stream(sys.stdin.buffer, limit, threshold, stats)
+        else:
+            result = search(sys.stdin.buffer, query, limit, threshold, stats)
+            if stats is not None:
+                with stats.stage("output"):
+                    jq_dumps(result)
+                result["stats"] = stats.report()
+            print(jq_dumps(result))
+    except BrokenPipeError:
+        # The reader (e.g. head) has all it wants; silence the exit-time flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Transparent compressed archival of old project JSONL files.
+
+`archive` recompresses session files not modified for --days into gzip (or
+zstd when the zstandard module is installed) made of independent frames:
+each frame is a complete gzip member or zstd frame holding whole lines,
+about --frame-kb of them. The result is an ordinary .jsonl.gz / .jsonl.zst
+that zcat and zstdcat read whole, and it keeps the original's mtime. The
+archive is verified by decompressing it before the original is removed.
+
+A frame table sidecar records each frame's compressed offset together with
+the seek-sidecar block fields (uncompressed offset, first line number and
+min/max timestamp). Readers use it to decompress only the frames they need:
+
+- open_history() returns a plain file, or for an archive a reader with the
+  same seek / readline / line iteration over uncompressed offsets
+- history_stat() reports an archive's uncompressed size, so the append-only
+  watermarks of the index and sidecars apply unchanged
+- seek_index.iter_lines() treats frames as blocks, so --seek time windows
+  skip whole frames without decompressing them
+
+The table is written when archiving and rebuilt with one decompression pass
+if it is missing or stale.
+
+Usage:
+    history_archive.py archive [--days 30] [--format gzip|zstd] [--level N]
+                               [--frame-kb 256] [--files ...] [--dry-run]
+    history_archive.py sizes < paths
+    history_archive.py cat FILE...
+
+`sizes` prints {"path", "size"} NDJSON with uncompressed sizes for chunk.sh;
+`cat` writes files to stdout, decompressing archives.
+
+Output: JSON with the files archived and bytes before and after
+"""
+
+import hashlib
+import json
+import os
+import stat
+import sys
+import time
+import zlib
+from bisect import bisect_right
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_DIR = Path.home() / ".claude" / "history-analyser" / "frames"
+TABLE_VERSION = 1
+DEFAULT_DAYS = 30
+FRAME_BYTES = 256 * 1024
+READ_BYTES = 1024 * 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# Archive suffix -> format; archives are named <session>.jsonl<suffix>
+FORMATS = {".gz": "gzip", ".zst": "zstd"}
+SUFFIXES = {fmt: suffix for suffix, fmt in FORMATS.items()}
+HISTORY_GLOBS = ("*.jsonl", "*.jsonl.gz", "*.jsonl.zst")
+
+
+def is_history_file(name: str) -> bool:
+    return name.endswith(".jsonl") or archive_format(name) is not None
+
+
+def archive_format(filepath: str) -> str:
+    """"gzip" or "zstd" for an archived session file, else None."""
+    for suffix, fmt in FORMATS.items():
+        if filepath.endswith(".jsonl" + suffix):
+            return fmt
+    return None
+
+
+def is_archive(filepath: str) -> bool:
+    return archive_format(filepath) is not None
+
+
+def require_format(fmt: str):
+    if fmt == "zstd" and zstandard is None:
+        raise OSError("zstd archives need the zstandard module (pip install zstandard)")
+
+
+def compress_frame(data: bytes, fmt: str, level: int) -> bytes:
+    if fmt == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    c = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return c.compress(data) + c.flush()
+
+
+def decompress_frame(data: bytes, fmt: str) -> bytes:
+    if fmt == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return zlib.decompress(data, 31)
+
+
+def new_decompressor(fmt: str):
+    if fmt == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj(31)
+
+
+def iter_frames(f, fmt: str):
+    """Yield (compressed offset, uncompressed bytes) for each frame of an archive."""
+    require_format(fmt)
+    pos = 0
+    pending = b""
+    while True:
+        d = new_decompressor(fmt)
+        start = pos
+        out = []
+        while not d.eof:
+            chunk = pending or f.read(READ_BYTES)
+            pending = b""
+            if not chunk:
+                if out or pos > start:
+                    raise ValueError(f"Truncated {fmt} frame at byte {start}")
+                return
+            out.append(d.decompress(chunk))
+            pos += len(chunk)
+        pending = d.unused_data
+        pos -= len(pending)
+        yield start, b"".join(out)
+
+
+def table_path(filepath: str) -> Path:
+    digest = hashlib.sha1(os.path.abspath(filepath).encode()).hexdigest()
+    return Path(os.environ.get("HISTORY_FRAMES_DIR", DEFAULT_DIR)) / f"{digest}.json"
+
+
+def new_table(fmt: str) -> dict:
+    return {"version": TABLE_VERSION, "format": fmt, "offset": 0, "lines": 0, "blocks": [], "frames": []}
+
+
+def add_frame(table: dict, comp_offset: int, data: bytes):
+    """Record one frame: its compressed offset and the block fields of its lines."""
+    from json_backend import DECODE_ERRORS, loads
+    from entries import parse_timestamps
+
+    block = [table["offset"], table["lines"] + 1, None, None]
+    stamps = []
+    for line in data.splitlines(keepends=True):
+        if line.endswith(b"\n"):
+            table["lines"] += 1
+        try:
+            entry = loads(line)
+        except DECODE_ERRORS:
+            continue
+        if not isinstance(entry, dict):
+            continue
+        stamps.append(entry.get("timestamp", 0))
+    if stamps:
+        stamps = parse_timestamps(stamps)
+        block[2], block[3] = min(stamps), max(stamps)
+    table["offset"] += len(data)
+    table["blocks"].append(block)
+    table["frames"].append(comp_offset)
+
+
+def save_table(filepath: str, table: dict, st: os.stat_result):
+    table.update(inode=st.st_ino, size=st.st_size, mtime_ns=st.st_mtime_ns)
+    path = table_path(filepath)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(table, f)
+    os.replace(tmp, path)
+
+
+def build_table(filepath: str) -> dict:
+    """Scan an archive's frames into a fresh table."""
+    fmt = archive_format(filepath)
+    table = new_table(fmt)
+    with open(filepath, "rb") as f:
+        for comp_offset, data in iter_frames(f, fmt):
+            add_frame(table, comp_offset, data)
+    return table
+
+
+def frame_table(filepath: str, st: os.stat_result = None) -> dict:
+    """Return the archive's frame table, rebuilding it if missing or stale."""
+    st = st or os.stat(filepath)
+    try:
+        with open(table_path(filepath)) as f:
+            table = json.load(f)
+        if (table.get("version") == TABLE_VERSION and table["inode"] == st.st_ino
+                and table["size"] == st.st_size and table["mtime_ns"] == st.st_mtime_ns):
+            return table
+    except (OSError, ValueError, KeyError):
+        pass
+    table = build_table(filepath)
+    save_table(filepath, table, st)
+    return table
+
+
+def history_stat(filepath: str) -> os.stat_result:
+    """os.stat, with an archive's st_size replaced by its uncompressed size."""
+    st = os.stat(filepath)
+    if not is_archive(filepath):
+        return st
+    fields = list(st)
+    fields[stat.ST_SIZE] = frame_table(filepath, st)["offset"]
+    return os.stat_result(fields, {
+        "st_atime_ns": st.st_atime_ns,
+        "st_mtime_ns": st.st_mtime_ns,
+        "st_ctime_ns": st.st_ctime_ns,
+    })
+
+
+class ArchiveReader:
+    """Read-only binary file over an archive's uncompressed bytes.
+
+    Supports what the scanners use: seek/tell on uncompressed offsets,
+    readline and line iteration. One frame is held decompressed at a time.
+    """
+
+    def __init__(self, filepath: str):
+        self.fmt = archive_format(filepath)
+        require_format(self.fmt)
+        self.f = open(filepath, "rb")
+        try:
+            table = frame_table(filepath, os.fstat(self.f.fileno()))
+        except Exception:
+            self.f.close()
+            raise
+        self.starts = [block[0] for block in table["blocks"]]
+        self.frames = table["frames"] + [os.fstat(self.f.fileno()).st_size]
+        self.size = table["offset"]
+        self.pos = 0
+        self.frame = None
+        self.buf = b""
+        self.buf_start = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self.pos, os.SEEK_END: self.size}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def load(self) -> bool:
+        """Make the frame holding pos current; False at end of data."""
+        if self.frame is not None and self.buf_start <= self.pos < self.buf_start + len(self.buf):
+            return True
+        if self.pos >= self.size:
+            return False
+        i = bisect_right(self.starts, self.pos) - 1
+        self.f.seek(self.frames[i])
+        self.buf = decompress_frame(self.f.read(self.frames[i + 1] - self.frames[i]), self.fmt)
+        self.buf_start = self.starts[i]
+        self.frame = i
+        return True
+
+    def readline(self) -> bytes:
+        # Frames end on line boundaries, so a line never spans two
+        if not self.load():
+            return b""
+        rel = self.pos - self.buf_start
+        nl = self.buf.find(b"\n", rel)
+        end = len(self.buf) if nl == -1 else nl + 1
+        self.pos += end - rel
+        return self.buf[rel:end]
+
+    def read(self, size: int = -1) -> bytes:
+        out = []
+        while size != 0 and self.load():
+            rel = self.pos - self.buf_start
+            end = len(self.buf) if size < 0 else min(len(self.buf), rel + size)
+            out.append(self.buf[rel:end])
+            self.pos += end - rel
+            size = size - (end - rel) if size > 0 else size
+        return b"".join(out)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+
+def open_history(filepath: str):
+    """Open a session file for binary reading, decompressing archives transparently."""
+    if is_archive(filepath):
+        return ArchiveReader(filepath)
+    return open(filepath, "rb")
+
+
+def remove_quietly(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def archive_file(filepath: str, fmt: str = "gzip", level: int = None,
+                 frame_bytes: int = FRAME_BYTES) -> dict:
+    """Compress one plain session file into framed fmt, verify it, then remove the original."""
+    require_format(fmt)
+    level = level if level is not None else (ZSTD_LEVEL if fmt == "zstd" else GZIP_LEVEL)
+    target = filepath + SUFFIXES[fmt]
+    tmp = target + ".tmp"
+    st = os.stat(filepath)
+    digest = hashlib.sha1()
+    table = new_table(fmt)
+
+    def flush(frame: list):
+        data = b"".join(frame)
+        add_frame(table, out.tell(), data)
+        out.write(compress_frame(data, fmt, level))
+
+    try:
+        with open(filepath, "rb") as f, open(tmp, "wb") as out:
+            frame, frame_size = [], 0
+            for line in f:
+                digest.update(line)
+                frame.append(line)
+                frame_size += len(line)
+                if frame_size >= frame_bytes:
+                    flush(frame)
+                    frame, frame_size = [], 0
+            if frame:
+                flush(frame)
+            out.flush()
+            os.fsync(out.fileno())
+
+        check = hashlib.sha1()
+        with open(tmp, "rb") as f:
+            for _, data in iter_frames(f, fmt):
+                check.update(data)
+        if check.digest() != digest.digest():
+            raise ValueError(f"Verification failed for {target}")
+
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, target)
+    except BaseException:
+        remove_quietly(tmp)
+        raise
+
+    # The original may have grown while compressing; keep it if so
+    if os.stat(filepath).st_size != st.st_size:
+        remove_quietly(target)
+        raise ValueError(f"{filepath} changed while archiving")
+    os.unlink(filepath)
+    save_table(target, table, os.stat(target))
+    return {"file": filepath, "archive": target, "bytes_before": st.st_size,
+            "bytes_after": os.path.getsize(target), "frames": len(table["frames"])}
+
+
+def archive_candidates(files: list, days: float) -> list:
+    """Plain session files whose last modification is older than days."""
+    cutoff = time.time() - days * 86400
+    found = []
+    for filepath in files:
+        if is_archive(filepath) or not filepath.endswith(".jsonl"):
+            continue
+        try:
+            if os.stat(filepath).st_mtime < cutoff:
+                found.append(filepath)
+        except OSError:
+            continue
+    return found
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    files = []
+    days = DEFAULT_DAYS
+    fmt = "gzip"
+    level = None
+    frame_bytes = FRAME_BYTES
+    dry_run = False
+
+    args = sys.argv[2:]
+
+    if command == "cat":
+        out = sys.stdout.buffer
+        for filepath in args:
+            try:
+                with open_history(filepath) as f:
+                    while chunk := f.read(READ_BYTES):
+                        out.write(chunk)
+            except (OSError, ValueError) as e:
+                print(json.dumps({"error": f"Failed to read {filepath}: {e}"}), file=sys.stderr)
+        return
+
+    if command == "sizes":
+        for line in sys.stdin:
+            filepath = line.rstrip("\n")
+            if not filepath:
+                continue
+            try:
+                size = history_stat(filepath).st_size
+            except (OSError, ValueError):
+                size = 0
+            print(json.dumps({"path": filepath, "size": size}))
+        return
+
+    i = 0
+    while i < len(args):
+        if args[i] == "--files" and i + 1 < len(args):
+            files = [f.strip() for f in args[i + 1].split(",")]
+            i += 2
+        elif args[i] == "--days" and i + 1 < len(args):
+            days = float(args[i + 1])
+            i += 2
+        elif args[i] == "--format" and i + 1 < len(args):
+            fmt = args[i + 1]
+            i += 2
+        elif args[i] == "--level" and i + 1 < len(args):
+            level = int(args[i + 1])
+            i += 2
+        elif args[i] == "--frame-kb" and i + 1 < len(args):
+            frame_bytes = int(args[i + 1]) * 1024
+            i += 2
+        elif args[i] == "--dry-run":
+            dry_run = True
+            i += 1
+        else:
+            i += 1
+
+    if command != "archive":
+        print(json.dumps({"error": "Usage: history_archive.py archive|sizes|cat [...]"}))
+        sys.exit(1)
+
+    if fmt not in SUFFIXES:
+        print(json.dumps({"error": f"Invalid --format: {fmt} (use gzip or zstd)"}))
+        sys.exit(1)
+    try:
+        require_format(fmt)
+    except OSError as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+    if not files:
+        from history_index import discover_files
+        files = discover_files()
+    candidates = archive_candidates(files, days)
+
+    result = {"format": fmt, "days": days, "candidates": len(candidates)}
+    if dry_run:
+        result["files"] = candidates
+        result["bytes"] = sum(os.path.getsize(f) for f in candidates)
+        print(json.dumps(result, indent=2))
+        return
+
+    archived = []
+    errors = []
+    for filepath in candidates:
+        try:
+            archived.append(archive_file(filepath, fmt, level, frame_bytes))
+        except (OSError, ValueError) as e:
+            errors.append(f"Failed to archive {filepath}: {e}")
+
+    before = sum(a["bytes_before"] for a in archived)
+    after = sum(a["bytes_after"] for a in archived)
+    result.update(
+        archived=len(archived),
+        bytes_before=before,
+        bytes_after=after,
+        ratio=round(before / after, 2) if after else None,
+        files=archived,
+    )
+    if errors:
+        result["errors"] = errors
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
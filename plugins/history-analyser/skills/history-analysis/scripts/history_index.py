@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Persistent full-text index over project JSONL files.
+
+Indexes the same text that search_chunk.extract_content reads into a SQLite
+FTS5 table (trigram tokenizer, so substring matches behave like the regex
+scan). Project files are append-only, so each file carries a byte offset,
+inode and line-count watermark: a grown file has only its new lines indexed,
+while a replaced or truncated file is re-indexed from scratch.
+
+Both the index and the scan search every line, including a final line with
+no trailing newline yet (a transcript still being written). The watermark
+stays before such a line: its row is indexed but remembered as the file's
+tail, and is replaced when the file grows, so the indexed text is always
+the text the scan would read.
+
+Each file also records how many entries it indexed and their total content
+length, so corpus statistics for ranking (see ranking.py) need no scan.
+
+Usage:
+    history_index.py build [--files file1.jsonl,file2.jsonl] [--db PATH]
+    history_index.py status [--db PATH]
+
+Output: JSON with index statistics
+"""
+
+import heapq
+import json
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from history_archive import HISTORY_GLOBS, history_stat, open_history
+from json_backend import DECODE_ERRORS, loads
+from entries import extract_content, parse_timestamp
+from prefilter import required_literals
+
+PROJECTS_DIR = Path.home() / ".claude" / "projects"
+DEFAULT_DB = Path.home() / ".claude" / "history-analyser" / "index.db"
+
+# Trigram tokenizer cannot match terms shorter than this
+MIN_TERM_LEN = 3
+
+SCHEMA_VERSION = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    docs INTEGER NOT NULL DEFAULT 0,
+    chars INTEGER NOT NULL DEFAULT 0,
+    tail_rowid INTEGER NOT NULL DEFAULT 0,
+    tail_chars INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+    content,
+    file_id UNINDEXED,
+    line UNINDEXED,
+    type UNINDEXED,
+    timestamp UNINDEXED,
+    ts UNINDEXED,
+    project UNINDEXED,
+    session_id UNINDEXED,
+    tokenize = 'trigram'
+);
+"""
+
+
+def default_db_path() -> Path:
+    return Path(os.environ.get("HISTORY_INDEX_DB", DEFAULT_DB))
+
+
+def discover_files() -> list:
+    """All project JSONL files, archived ones included, in a stable order."""
+    return sorted(str(p) for pattern in HISTORY_GLOBS for p in PROJECTS_DIR.glob(f"*/{pattern}"))
+
+
+def open_index(db_path=None) -> sqlite3.Connection:
+    path = Path(db_path) if db_path else default_db_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS entries;")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def index_rows(filepath: str, file_id: int, offset: int, line_num: int, mark: dict):
+    """Yield one FTS row per searchable line, mirroring search_file's filters.
+
+    Reads from `offset`, numbering lines after `line_num`. `mark` receives
+    the offset and line count after the last complete line and adds the rows
+    and content characters yielded to its docs and chars. A final line with
+    no newline is yielded too, without moving the watermark past it; if it
+    yields a row, its content length is left in mark["tail_chars"].
+    """
+    with open_history(filepath) as f:
+        f.seek(offset)
+        for line in f:
+            line_num += 1
+            complete = line.endswith(b"\n")
+            if complete:
+                offset += len(line)
+                mark["offset"], mark["lines"] = offset, line_num
+            try:
+                entry = loads(line)
+            except DECODE_ERRORS:
+                continue
+
+            if entry.get("type") == "file-history-snapshot":
+                continue
+
+            content = extract_content(entry)
+            mark["docs"] += 1
+            mark["chars"] += len(content)
+            if not complete:
+                mark["tail_chars"] = len(content)
+            yield (
+                content,
+                file_id,
+                line_num,
+                entry.get("type", "unknown"),
+                entry.get("timestamp", ""),
+                parse_timestamp(entry.get("timestamp", 0)),
+                entry.get("cwd", ""),
+                entry.get("sessionId", ""),
+            )
+
+
+def prune(conn: sqlite3.Connection) -> int:
+    """Remove indexed files that no longer exist; returns how many."""
+    gone = [file_id for file_id, path in conn.execute("SELECT id, path FROM files")
+            if not os.path.exists(path)]
+    if gone:
+        # file_id is unindexed in FTS5, so delete them all in one table scan
+        marks = ",".join("?" * len(gone))
+        with conn:
+            conn.execute(f"DELETE FROM entries WHERE file_id IN ({marks})", gone)
+            conn.execute(f"DELETE FROM files WHERE id IN ({marks})", gone)
+    return len(gone)
+
+
+def refresh(conn: sqlite3.Connection, files: list) -> dict:
+    """Bring the index up to date for the given files. Returns path -> file id.
+
+    Files that no longer exist (deleted, or replaced by their archive) are
+    dropped first so they stop counting towards corpus statistics.
+    """
+    file_ids = {}
+    stats = {"indexed": 0, "appended": 0, "unchanged": 0, "missing": 0, "pruned": prune(conn)}
+
+    for filepath in files:
+        try:
+            st = history_stat(filepath)
+        except (OSError, ValueError):
+            stats["missing"] += 1
+            continue
+
+        row = conn.execute(
+            "SELECT id, inode, offset, lines, mtime_ns, size, docs, chars, tail_rowid, tail_chars"
+            " FROM files WHERE path = ?", (filepath,)
+        ).fetchone()
+        if row and row[1] == st.st_ino and row[5] == st.st_size and row[4] == st.st_mtime_ns:
+            file_ids[filepath] = row[0]
+            stats["unchanged"] += 1
+            continue
+
+        with conn:
+            if row and row[1] == st.st_ino and row[2] <= st.st_size:
+                file_id, offset, lines, docs, chars = row[0], row[2], row[3], row[6], row[7]
+                if row[8]:
+                    # The unterminated tail is read again from the watermark
+                    conn.execute("DELETE FROM entries WHERE rowid = ?", (row[8],))
+                    docs, chars = docs - 1, chars - row[9]
+                stats["appended"] += 1
+            else:
+                if row:
+                    conn.execute("DELETE FROM entries WHERE file_id = ?", (row[0],))
+                    conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+                cur = conn.execute(
+                    "INSERT INTO files (path, inode, offset, lines, mtime_ns) VALUES (?, ?, 0, 0, 0)",
+                    (filepath, st.st_ino),
+                )
+                file_id, offset, lines, docs, chars = cur.lastrowid, 0, 0, 0, 0
+                stats["indexed"] += 1
+
+            mark = {"offset": offset, "lines": lines, "docs": docs, "chars": chars, "tail_chars": None}
+            conn.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                index_rows(filepath, file_id, offset, lines, mark),
+            )
+            tail_rowid, tail_chars = 0, 0
+            if mark["tail_chars"] is not None:
+                # The tail is the last line read, so its row was inserted last
+                tail_rowid = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                tail_chars = mark["tail_chars"]
+            conn.execute(
+                "UPDATE files SET inode = ?, offset = ?, lines = ?, mtime_ns = ?, size = ?, docs = ?, chars = ?,"
+                " tail_rowid = ?, tail_chars = ? WHERE id = ?",
+                (st.st_ino, mark["offset"], mark["lines"], st.st_mtime_ns, st.st_size, mark["docs"], mark["chars"],
+                 tail_rowid, tail_chars, file_id),
+            )
+
+        file_ids[filepath] = file_id
+
+    return {"file_ids": file_ids, **stats}
+
+
+def fts_query(pattern: re.Pattern):
+    """Translate a pattern into an FTS5 MATCH expression, or None if unservable.
+
+    Every literal run the pattern requires becomes a quoted trigram phrase;
+    candidates are re-checked against the full pattern afterwards.
+    """
+    terms = [lit for lit in required_literals(pattern) if len(lit) >= MIN_TERM_LEN]
+    if not terms:
+        return None
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def corpus_stats(conn: sqlite3.Connection) -> tuple:
+    """Indexed entry count and mean content length, for BM25."""
+    docs, chars = conn.execute("SELECT COALESCE(SUM(docs), 0), COALESCE(SUM(chars), 0) FROM files").fetchone()
+    return docs, (chars / docs if docs else 0.0)
+
+
+def document_frequency(conn: sqlite3.Connection, term: str) -> int:
+    """Indexed entries containing the term (case-insensitive, MIN_TERM_LEN+ chars)."""
+    return conn.execute(
+        "SELECT COUNT(*) FROM entries WHERE entries MATCH ?", ('"' + term.replace('"', '""') + '"',)
+    ).fetchone()[0]
+
+
+def matching_rows(conn: sqlite3.Connection, pattern: re.Pattern, file_ids: dict,
+                  start_ts: int = None, end_ts: int = None):
+    """Index rows that match the pattern in the given files, or None if unservable.
+
+    Rows come in SQLite's order as (file order, line, type, timestamp, ts,
+    project, session_id, content), file order being the file's position in
+    file_ids.
+    """
+    match_expr = fts_query(pattern)
+    if match_expr is None:
+        return None
+
+    order = {file_id: i for i, file_id in enumerate(file_ids.values())}
+    sql = ("SELECT file_id, line, type, timestamp, ts, project, session_id, content "
+           "FROM entries WHERE entries MATCH ?")
+    params = [match_expr]
+    if start_ts:
+        sql += " AND ts >= ?"
+        params.append(start_ts)
+    if end_ts:
+        sql += " AND ts <= ?"
+        params.append(end_ts)
+
+    def rows():
+        for file_id, *row in conn.execute(sql, params):
+            if file_id in order and pattern.search(row[-1]):
+                yield (order[file_id], *row)
+
+    return rows()
+
+
+def to_match(paths: list, row: tuple) -> dict:
+    file_index, line, entry_type, timestamp, _, project, session_id, content = row
+    return {
+        "file": paths[file_index],
+        "line": line,
+        "type": entry_type,
+        "timestamp": timestamp,
+        "project": project,
+        "session_id": session_id,
+        "preview": content[:300],
+    }
+
+
+def search_index(conn: sqlite3.Connection, pattern: re.Pattern, file_ids: dict,
+                 start_ts: int = None, end_ts: int = None, ranker=None):
+    """Search indexed files in file order. Returns a match list, or None to request a scan.
+
+    file_ids is refresh()'s mapping for the files to search. With a ranker,
+    each match carries a "score" from ranker.score(content, ts).
+    """
+    rows = matching_rows(conn, pattern, file_ids, start_ts, end_ts)
+    if rows is None:
+        return None
+
+    paths = list(file_ids)
+    matches = []
+    for row in sorted(rows, key=lambda row: row[:2]):
+        match = to_match(paths, row)
+        if ranker is not None:
+            match["score"] = ranker.score(row[-1], row[4])
+        matches.append(match)
+    return matches
+
+
+def search_index_top(conn: sqlite3.Connection, pattern: re.Pattern, file_ids: dict, k: int, ranker,
+                     start_ts: int = None, end_ts: int = None):
+    """The k best-scoring matches and the number of matches, or None to request a scan.
+
+    Rows are scored as SQLite returns them and kept in a k-sized min-heap,
+    so neither the full match list nor a file-order sort is built; ties go
+    to the earlier file and line, as in ranking.top_k over a scan.
+    """
+    rows = matching_rows(conn, pattern, file_ids, start_ts, end_ts)
+    if rows is None:
+        return None
+
+    heap = []
+    total = 0
+    for row in rows:
+        total += 1
+        item = (ranker.score(row[-1], row[4]), -row[0], -row[1], row)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif heap and item[:3] > heap[0][:3]:
+            heapq.heapreplace(heap, item)
+
+    paths = list(file_ids)
+    ranked = []
+    for score, _, _, row in sorted(heap, key=lambda item: item[:3], reverse=True):
+        ranked.append({**to_match(paths, row), "score": round(score, 4)})
+    return ranked, total
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    files = []
+    db_path = None
+
+    args = sys.argv[2:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--files" and i + 1 < len(args):
+            files = [f.strip() for f in args[i + 1].split(",")]
+            i += 2
+        elif args[i] == "--db" and i + 1 < len(args):
+            db_path = args[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    if command not in ("build", "status"):
+        print(json.dumps({"error": "Usage: history_index.py build|status [--files ...] [--db PATH]"}))
+        sys.exit(1)
+
+    conn = open_index(db_path)
+
+    if command == "build":
+        stats = refresh(conn, files or discover_files())
+        stats.pop("file_ids")
+        result = {"db": str(db_path or default_db_path()), **stats}
+    else:
+        result = {
+            "db": str(db_path or default_db_path()),
+            "files": conn.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+            "entries": conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+        }
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
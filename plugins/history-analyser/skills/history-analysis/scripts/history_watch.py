@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Long-running watch mode that keeps the search index and summaries hot.
+
+`serve` tails ~/.claude/projects with inotify (polling when inotify is not
+available) and, as lines are appended, brings the FTS index (see
+history_index.py) and the per-file incremental summaries (see
+summarise_chunk.py --incremental) up to date. It answers queries over a
+local Unix socket, so interactive searches and summaries skip the cold
+directory walk and reparse:
+
+- search: search_chunk.py arguments, run in the daemon against the hot
+  index (--index is implied) and the watched file list
+- summarise: summarise_chunk.py arguments; whole-history summaries are
+  merged straight from the in-memory per-file partials, anything else
+  (time windows, --bucket, --stream, explicit files) runs in the daemon
+- status: watched files, watcher backend and counters
+
+search_chunk.py and summarise_chunk.py take --watch to send their
+arguments to a running daemon, falling back to a local run when none
+answers.
+
+The protocol is one JSON request line per connection,
+{"command": "search", "args": [...]}, answered by one JSON line holding
+the command's "output" text and "exit" status, or an "error".
+
+Usage:
+    history_watch.py serve [--socket PATH] [--poll SECONDS]
+    history_watch.py search|summarise ARGS...
+    history_watch.py status
+
+The socket defaults to ~/.claude/history-analyser/watch.sock (override with
+HISTORY_WATCH_SOCKET or --socket).
+
+Output: the forwarded command's output, or JSON status
+"""
+
+import contextlib
+import ctypes
+import ctypes.util
+import io
+import json
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import time
+from pathlib import Path
+
+from history_archive import is_history_file
+
+DEFAULT_SOCKET = Path.home() / ".claude" / "history-analyser" / "watch.sock"
+POLL_SECONDS = 2.0
+SAVE_SECONDS = 5.0
+CONNECT_TIMEOUT = 0.5
+
+# inotify(7) event masks
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+IN_Q_OVERFLOW = 0x4000
+DIR_MASK = IN_CREATE | IN_MOVED_TO
+FILE_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+EVENT = struct.Struct("iIII")
+
+# Arguments that take the whole-history summary off the hot path
+SUMMARY_COLD_ARGS = {"--files", "--manifest", "--start-ts", "--end-ts", "--bucket", "--stream", "--seek",
+                     "--profile"}
+
+
+def socket_path(override: str = None) -> Path:
+    return Path(override or os.environ.get("HISTORY_WATCH_SOCKET", DEFAULT_SOCKET))
+
+
+class InotifyWatcher:
+    """Reports changed .jsonl paths under the projects directory via inotify."""
+
+    name = "inotify"
+
+    def __init__(self, root: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self.dirs = {}
+        self.add_watch(root, DIR_MASK)
+        for sub in root.iterdir():
+            if sub.is_dir():
+                self.add_watch(sub, FILE_MASK)
+
+    def add_watch(self, path: Path, mask: int):
+        wd = self.libc.inotify_add_watch(self.fd, str(path).encode(), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.dirs[wd] = path
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def timeout(self):
+        return None
+
+    def changes(self) -> set:
+        """Drain pending events into the set of changed file paths.
+
+        A new project directory is watched and its existing files reported;
+        a queue overflow reports every file so nothing is missed.
+        """
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, pos)
+                name = data[pos + EVENT.size:pos + EVENT.size + length].rstrip(b"\0").decode(errors="replace")
+                pos += EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(str(p) for p in self.root.glob("*/*") if is_history_file(p.name))
+                    continue
+                parent = self.dirs.get(wd)
+                if parent is None:
+                    continue
+                path = parent / name
+                if mask & IN_ISDIR and parent == self.root:
+                    try:
+                        self.add_watch(path, FILE_MASK)
+                    except OSError:
+                        continue
+                    changed.update(str(p) for p in path.glob("*") if is_history_file(p.name))
+                elif is_history_file(name):
+                    changed.add(str(path))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollWatcher:
+    """Fallback watcher: stats every project file each interval."""
+
+    name = "poll"
+
+    def __init__(self, root: Path, interval: float = POLL_SECONDS):
+        self.root = root
+        self.interval = interval
+        self.seen = {}
+        self.due = 0.0
+        self.scan()
+
+    def scan(self) -> set:
+        changed = set()
+        current = {}
+        for path in self.root.glob("*/*"):
+            if not is_history_file(path.name):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            key = (st.st_ino, st.st_size, st.st_mtime_ns)
+            current[str(path)] = key
+            if self.seen.get(str(path)) != key:
+                changed.add(str(path))
+        changed.update(self.seen.keys() - current.keys())
+        self.seen = current
+        self.due = time.monotonic() + self.interval
+        return changed
+
+    def fileno(self):
+        return None
+
+    def timeout(self) -> float:
+        return max(0.0, self.due - time.monotonic())
+
+    def changes(self) -> set:
+        return self.scan() if time.monotonic() >= self.due else set()
+
+    def close(self):
+        pass
+
+
+def make_watcher(root: Path, poll: float = None):
+    if poll is None:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollWatcher(root, poll or POLL_SECONDS)
+
+
+def run_main(module, args: list) -> tuple:
+    """Run a script's main() in-process with argv; return (output, exit status)."""
+    out = io.StringIO()
+    status = 0
+    argv = sys.argv
+    sys.argv = [module.__file__, *args]
+    try:
+        with contextlib.redirect_stdout(out):
+            module.main()
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        sys.argv = argv
+    return out.getvalue(), status
+
+
+class Daemon:
+    def __init__(self, sock_path: Path, poll: float = None):
+        import history_index
+        import summarise_chunk
+
+        self.history_index = history_index
+        self.summarise_chunk = summarise_chunk
+        self.sock_path = sock_path
+        self.root = history_index.PROJECTS_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.watcher = make_watcher(self.root, poll)
+        self.conn = history_index.open_index()
+        self.state_path = summarise_chunk.DEFAULT_STATE
+        self.state = summarise_chunk.load_state(self.state_path)
+        self.summaries = {}
+        self.files = []
+        self.dirty = False
+        self.saved = time.monotonic()
+        self.counters = {"updates": 0, "files_updated": 0, "queries": 0}
+        self.started = time.time()
+
+    def update(self, paths):
+        """Bring the index and summary partials up to date for changed files.
+
+        Removed files drop out of the watched list and the summary state.
+        """
+        if not paths:
+            return
+        paths = sorted(p for p in paths if os.path.exists(p))
+        self.history_index.refresh(self.conn, paths)
+        for path in paths:
+            self.summaries[path] = self.summarise_chunk.summarise_file_incremental(path, self.state, usage=True)
+        self.files = self.history_index.discover_files()
+        for path in list(self.summaries):
+            if path not in self.files:
+                del self.summaries[path]
+                self.state.pop(path, None)
+        self.dirty = True
+        self.counters["updates"] += 1
+        self.counters["files_updated"] += len(paths)
+
+    def save(self, force: bool = False):
+        if self.dirty and (force or time.monotonic() - self.saved >= SAVE_SECONDS):
+            self.summarise_chunk.save_state(self.state_path, self.state)
+            self.dirty = False
+            self.saved = time.monotonic()
+
+    def handle(self, request: dict) -> dict:
+        command = request.get("command")
+        args = [str(a) for a in request.get("args", [])]
+        self.counters["queries"] += 1
+
+        if command == "status":
+            return {"output": json.dumps(self.status(), indent=2) + "\n", "exit": 0}
+        if command == "search":
+            import search_chunk
+            if "--files" not in args and "--manifest" not in args:
+                args += ["--files", ",".join(self.files)]
+            if "--index" not in args and "--index-db" not in args:
+                args.append("--index")
+            output, status = run_main(search_chunk, args)
+            return {"output": output, "exit": status}
+        if command == "summarise":
+            if SUMMARY_COLD_ARGS.isdisjoint(args):
+                return {"output": self.hot_summary("--usage" in args), "exit": 0}
+            if "--files" not in args and "--manifest" not in args:
+                args += ["--files", ",".join(self.files)]
+            output, status = run_main(self.summarise_chunk, args)
+            return {"output": output, "exit": status}
+        return {"error": f"Unknown command: {command}"}
+
+    def hot_summary(self, usage: bool) -> str:
+        """summarise_chunk.py's whole-history output from the in-memory partials."""
+        from json_backend import BACKEND
+
+        summaries = [self.summaries[f] for f in self.files if f in self.summaries]
+        if not usage:
+            summaries = [{k: v for k, v in s.items() if k != "usage"} for s in summaries]
+        result = self.summarise_chunk.merge_summaries(summaries)
+        result["json_backend"] = BACKEND
+        return json.dumps(result, indent=2, default=str) + "\n"
+
+    def status(self) -> dict:
+        return {
+            "socket": str(self.sock_path),
+            "watcher": self.watcher.name,
+            "files": len(self.files),
+            "uptime_s": round(time.time() - self.started, 1),
+            **self.counters,
+        }
+
+    def serve_client(self, client: socket.socket):
+        with client:
+            client.settimeout(5)
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+            try:
+                response = self.handle(json.loads(data))
+            except (ValueError, AttributeError) as e:
+                response = {"error": f"Bad request: {e}"}
+            client.sendall(json.dumps(response).encode() + b"\n")
+
+    def serve(self):
+        self.files = self.history_index.discover_files()
+        self.update(self.files)
+        self.save(force=True)
+
+        self.sock_path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            self.sock_path.unlink()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.sock_path))
+        os.chmod(self.sock_path, 0o600)
+        server.listen(16)
+
+        def stop(signum, frame):
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, stop)
+        print(json.dumps({"serving": str(self.sock_path), "watcher": self.watcher.name,
+                          "files": len(self.files)}), flush=True)
+        try:
+            while True:
+                readers = [server] + ([self.watcher] if self.watcher.fileno() is not None else [])
+                timeout = self.watcher.timeout()
+                if self.dirty:
+                    timeout = SAVE_SECONDS if timeout is None else min(timeout, SAVE_SECONDS)
+                ready, _, _ = select.select(readers, [], [], timeout)
+                # Apply file changes before answering, so replies see every line
+                self.update(self.watcher.changes())
+                if server in ready:
+                    client, _ = server.accept()
+                    try:
+                        self.serve_client(client)
+                    except OSError:
+                        pass
+                self.save()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.save(force=True)
+            server.close()
+            self.watcher.close()
+            with contextlib.suppress(FileNotFoundError):
+                self.sock_path.unlink()
+
+
+def request(command: str, args: list, sock_path: Path = None, timeout: float = 300):
+    """Send one request to a running daemon; returns the response, or None if none answers."""
+    path = sock_path or socket_path()
+    if not path.exists():
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(CONNECT_TIMEOUT)
+        client.connect(str(path))
+        client.settimeout(timeout)
+        client.sendall(json.dumps({"command": command, "args": args}).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = client.recv(1 << 20)
+            if not chunk:
+                break
+            data += chunk
+    except OSError:
+        return None
+    finally:
+        client.close()
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+def forward(command: str, args: list) -> bool:
+    """Answer a script invocation from the daemon if one is running.
+
+    Prints the daemon's output and exits with its status; returns False
+    (having printed nothing) when no daemon answers, so the caller runs locally.
+    """
+    response = request(command, [a for a in args if a != "--watch"])
+    if response is None or "error" in response:
+        return False
+    sys.stdout.write(response["output"])
+    sys.stdout.flush()
+    sys.exit(response.get("exit", 0))
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    args = sys.argv[2:]
+
+    sock = None
+    if "--socket" in args:
+        i = args.index("--socket")
+        if i + 1 < len(args):
+            sock = args[i + 1]
+            del args[i:i + 2]
+
+    if command == "serve":
+        poll = None
+        if "--poll" in args:
+            i = args.index("--poll")
+            poll = float(args[i + 1]) if i + 1 < len(args) else POLL_SECONDS
+        Daemon(socket_path(sock), poll).serve()
+        return
+
+    if command not in ("search", "summarise", "status"):
+        print(json.dumps({"error": "Usage: history_watch.py serve|search|summarise|status [ARGS...]"}))
+        sys.exit(1)
+
+    response = request(command, args, socket_path(sock))
+    if response is None:
+        print(json.dumps({"error": f"No watch daemon at {socket_path(sock)}"}))
+        sys.exit(1)
+    if "error" in response:
+        print(json.dumps(response))
+        sys.exit(1)
+    sys.stdout.write(response["output"])
+    sys.exit(response.get("exit", 0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+jq-semantics field projections shared by fast_engine.py and meta_cache.py.
+
+These read record fields the way the original jq filters did: a record jq
+would have failed on raises Skip, and user_query applies fast-summarise.sh's
+recent-query filter. meta_cache.py flags recent-query rows with the same
+test fast_engine.py uses to fold records, so the two always agree.
+"""
+
+QUERY_WIDTH = 150
+MIN_QUERY_CHARS = 15
+
+# User text that is tooling noise rather than a question
+NOISE_PREFIXES = ("<", "Caveat:")
+NOISE_MARKERS = ("<command-name>", "<local-command", "<bash-notification>", "<system-reminder>")
+
+
+class Skip(Exception):
+    """The record would raise a jq error, so jq's try/catch drops it."""
+
+
+def jq_key(value) -> tuple:
+    """Sort key following jq's ordering: null < false < true < numbers < strings < arrays < objects."""
+    if value is None:
+        return (0,)
+    if value is False:
+        return (1,)
+    if value is True:
+        return (2,)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, list):
+        return (5, [jq_key(v) for v in value])
+    return (6, sorted((k, jq_key(v)) for k, v in value.items()))
+
+
+def jq_slice(value, width: int):
+    """.[0:width] on a string or null."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:width]
+    raise Skip
+
+
+def jq_get(value, key: str):
+    """.key on an object or null."""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return value.get(key)
+    raise Skip
+
+
+def jq_values(value) -> list:
+    """.[]? on any value."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        return list(value.values())
+    return []
+
+
+def last_component(value):
+    """split("/") | last on a string: null for "", else the last segment."""
+    if not isinstance(value, str):
+        raise Skip
+    return value.rsplit("/", 1)[-1] if value else None
+
+
+def user_query(entry: dict, project) -> dict:
+    """The recent_queries record for a user entry, or None if it is noise."""
+    content = jq_get(entry.get("message"), "content")
+    query = content[:QUERY_WIDTH] if isinstance(content, str) else ""
+    if len(query) <= MIN_QUERY_CHARS or query.startswith(NOISE_PREFIXES):
+        return None
+    if any(marker in query for marker in NOISE_MARKERS):
+        return None
+    return {"query": query, "timestamp": entry.get("timestamp"), "project": project}
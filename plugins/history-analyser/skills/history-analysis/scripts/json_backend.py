@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Pluggable JSON decoder for the JSONL scanners.
+
+Uses orjson or pysimdjson when installed and falls back to the stdlib.
+All backends decode straight from bytes; orjson also accepts memoryview
+slices of an mmap, so lines can be parsed without copying them out.
+Set HISTORY_JSON_BACKEND=json|orjson|simdjson to force a backend.
+
+Usage:
+    json_backend.py
+
+Output: JSON naming the active backend
+"""
+
+import json
+import os
+import sys
+
+# JSONDecodeError, UnicodeDecodeError and simdjson's errors all subclass it
+DECODE_ERRORS = ValueError
+
+
+def _stdlib():
+    return "json", json.loads, False
+
+
+def _orjson():
+    import orjson
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    return "orjson", orjson.loads, True
+
+
+def _simdjson():
+    import simdjson
+    return "simdjson", simdjson.loads, False
+
+
+BACKENDS = {"orjson": _orjson, "simdjson": _simdjson, "json": _stdlib}
+
+
+def _select():
+    forced = os.environ.get("HISTORY_JSON_BACKEND")
+    order = [forced] if forced in BACKENDS else ["orjson", "simdjson", "json"]
+    for name in order:
+        try:
+            return BACKENDS[name]()
+        except ImportError:
+            continue
+    return _stdlib()
+
+
+# BACKEND: name reported in output; loads: bytes -> object;
+# ACCEPTS_BUFFER: whether loads takes a memoryview without a copy
+BACKEND, loads, ACCEPTS_BUFFER = _select()
+
+
+def main():
+    print(json.dumps({"backend": BACKEND, "zero_copy": ACCEPTS_BUFFER}))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+Columnar cache of message metadata for aggregate queries without JSON parsing.
+
+Each file gets a sidecar with one row per user/assistant entry, stored as
+fixed-width array columns: timestamp (ms), kind, cwd, session, byte offset
+and query flags. Tool calls live in a second pair of columns mapping each
+tool_use to its row. Strings are dictionary-encoded: the columns hold
+indexes into per-file cwd, session and tool lists kept in the sidecar
+header, so each consumer derives project names by its own rule once per
+distinct cwd rather than once per row.
+
+Aggregations reduce the columns directly, with numpy when it is installed
+(np.bincount over a time mask) and the C-level Counter otherwise, so a
+summary of the whole history reads a few bytes per message instead of
+decoding every line. bucket_counts bins rows by (ts - origin) // width the
+same way, for summarise_chunk.py --bucket. Query flags mark the user rows
+that summarise_chunk.py and fast_engine.py would report as queries; those
+few lines are read back through their offsets.
+
+A file with an entry the columns cannot reproduce exactly (a non-string
+cwd, tool name or display, a timestamp that is not in the usual
+millisecond Z form, a message or content block of an unexpected shape) is
+flagged irregular, and summarise_chunk.py and fast_engine.py parse it
+instead of using its columns.
+
+Sidecars follow the same append-only watermark as the seek sidecars: a grown
+file has only its new bytes scanned, a replaced or truncated one is rebuilt.
+Columns are written in native byte order; the cache is per machine.
+
+Usage:
+    meta_cache.py [--files file1.jsonl,file2.jsonl | --manifest manifest.json]
+    meta_cache.py --files ... --start-ts MS --end-ts MS
+
+Without --files or --manifest, every project file is aggregated.
+
+Output: JSON with message counts, time range, projects, tools and sessions
+"""
+
+import hashlib
+import json
+import os
+import sys
+from array import array
+from collections import Counter
+from itertools import compress
+from pathlib import Path
+
+from history_archive import history_stat, open_history
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_DIR = Path.home() / ".claude" / "history-analyser" / "columns"
+CACHE_VERSION = 2
+KINDS = ("user", "assistant")
+
+# Fixed-width columns, in the order they are written after the header
+ROW_COLUMNS = (("ts", "q"), ("kind", "B"), ("cwd", "I"), ("session", "I"), ("offsets", "Q"), ("flags", "B"))
+TOOL_COLUMNS = (("tool_row", "I"), ("tool", "I"))
+DICTIONARIES = ("cwds", "sessions", "tools")
+
+# Bits of the flags column: the user entry is a summarise_chunk.py query
+# (extract_user_query longer than 10 characters), or jq_fields.user_query keeps
+# it as a recent query
+QUERY = 1
+RECENT = 2
+
+# Length of a timestamp in the usual "2025-01-01T00:00:00.000Z" form
+TIMESTAMP_WIDTH = 24
+
+
+def cache_path(filepath: str) -> Path:
+    digest = hashlib.sha1(os.path.abspath(filepath).encode()).hexdigest()
+    return Path(os.environ.get("HISTORY_COLUMNS_DIR", DEFAULT_DIR)) / f"{digest}.bin"
+
+
+def new_cache(st: os.stat_result) -> dict:
+    cache = {"version": CACHE_VERSION, "inode": st.st_ino, "offset": 0, "lines": 0, "irregular": False}
+    for name in DICTIONARIES:
+        cache[name] = []
+    for name, code in ROW_COLUMNS + TOOL_COLUMNS:
+        cache[name] = array(code)
+    return cache
+
+
+def load_cache(filepath: str, st: os.stat_result) -> dict:
+    """Load a sidecar if it still describes a prefix of the file."""
+    try:
+        with open(cache_path(filepath), "rb") as f:
+            header = json.loads(f.readline())
+            if (header.get("version") != CACHE_VERSION
+                    or header["inode"] != st.st_ino
+                    or header["offset"] > st.st_size):
+                return None
+            sizes = {"rows": header.pop("rows"), "tool_rows": header.pop("tool_rows")}
+            cache = dict(header)
+            for columns, size in ((ROW_COLUMNS, "rows"), (TOOL_COLUMNS, "tool_rows")):
+                for name, code in columns:
+                    column = array(code)
+                    column.frombytes(f.read(sizes[size] * column.itemsize))
+                    if len(column) != sizes[size]:
+                        return None
+                    cache[name] = column
+    except (OSError, ValueError, KeyError):
+        return None
+    return cache
+
+
+def save_cache(filepath: str, cache: dict):
+    path = cache_path(filepath)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = {k: cache[k] for k in ("version", "inode", "offset", "lines", "mtime_ns", "irregular") + DICTIONARIES}
+    header["rows"] = len(cache["ts"])
+    header["tool_rows"] = len(cache["tool_row"])
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        for name, _ in ROW_COLUMNS + TOOL_COLUMNS:
+            cache[name].tofile(f)
+    os.replace(tmp, path)
+
+
+def encoder(values: list):
+    """Return a function mapping a string to its index in values, appending new ones."""
+    index = {value: i for i, value in enumerate(values)}
+
+    def encode(value: str) -> int:
+        if value not in index:
+            index[value] = len(values)
+            values.append(value)
+        return index[value]
+
+    return encode
+
+
+def irregular(entry: dict) -> bool:
+    """Whether a user/assistant entry has a field the columns cannot stand in for."""
+    cwd = entry.get("cwd")
+    if cwd and not isinstance(cwd, str):
+        return True
+    if "display" in entry and not isinstance(entry["display"], str):
+        return True
+    ts = entry.get("timestamp")
+    if ts is not None and not (isinstance(ts, str) and len(ts) == TIMESTAMP_WIDTH and ts.endswith("Z")):
+        return True
+    if "message" not in entry:
+        return False
+    message = entry["message"]
+    if not isinstance(message, dict):
+        return True
+    content = message.get("content")
+    if isinstance(content, dict):
+        return True
+    if isinstance(content, list):
+        for item in content:
+            if item is None:
+                continue
+            if not isinstance(item, dict):
+                return True
+            if item.get("type") == "tool_use" and not isinstance(item.get("name", ""), str):
+                return True
+            if item.get("type") == "text" and not isinstance(item.get("text", ""), str):
+                return True
+    return False
+
+
+def extend_cache(filepath: str, cache: dict):
+    """Scan complete lines past the cache's offset into new rows."""
+    from json_backend import DECODE_ERRORS, loads
+    from entries import extract_user_query, parse_timestamps
+    from jq_fields import user_query
+
+    cwd_id = encoder(cache["cwds"])
+    session_id = encoder(cache["sessions"])
+    tool_id = encoder(cache["tools"])
+    offset, line_num = cache["offset"], cache["lines"]
+    # Raw timestamps of the new rows, parsed as one batch at the end
+    stamps = []
+    first_row = len(cache["ts"])
+
+    with open_history(filepath) as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            start = offset
+            offset += len(line)
+            line_num += 1
+            try:
+                entry = loads(line)
+            except DECODE_ERRORS:
+                continue
+            if not isinstance(entry, dict):
+                cache["irregular"] = True
+                continue
+            if entry.get("type") not in KINDS:
+                continue
+            odd = irregular(entry)
+            cache["irregular"] = cache["irregular"] or odd
+
+            row = first_row + len(stamps)
+            flags = 0
+            if entry["type"] == "user" and not odd:
+                if len(extract_user_query(entry)) > 10:
+                    flags |= QUERY
+                if user_query(entry, None) is not None:
+                    flags |= RECENT
+
+            cwd = entry.get("cwd")
+            stamps.append(entry.get("timestamp", 0))
+            cache["kind"].append(KINDS.index(entry["type"]))
+            cache["cwd"].append(cwd_id(cwd if isinstance(cwd, str) else ""))
+            cache["session"].append(session_id(str(entry.get("sessionId", ""))))
+            cache["offsets"].append(start)
+            cache["flags"].append(flags)
+
+            message = entry.get("message")
+            content = message.get("content") if isinstance(message, dict) else None
+            if isinstance(content, list):
+                for item in content:
+                    if isinstance(item, dict) and item.get("type") == "tool_use":
+                        # None stands for a tool_use without a name
+                        name = item.get("name")
+                        cache["tool_row"].append(row)
+                        cache["tool"].append(tool_id(name if name is None or isinstance(name, str) else str(name)))
+
+    timestamps = parse_timestamps(stamps)
+    if 0 in timestamps and any(ts == 0 and stamp for ts, stamp in zip(timestamps, stamps)):
+        cache["irregular"] = True
+    cache["ts"].extend(timestamps)
+    cache["offset"], cache["lines"] = offset, line_num
+
+
+def refresh_cache(filepath: str) -> dict:
+    """Return an up-to-date cache, scanning only appended bytes.
+
+    "complete" is set when the columns cover the whole file, i.e. it does not
+    end in a line still being written.
+    """
+    st = history_stat(filepath)
+    cache = load_cache(filepath, st)
+    if cache and cache["offset"] == st.st_size and cache["mtime_ns"] == st.st_mtime_ns:
+        cache["complete"] = True
+        return cache
+
+    if cache is None:
+        cache = new_cache(st)
+    extend_cache(filepath, cache)
+    cache["mtime_ns"] = st.st_mtime_ns
+    save_cache(filepath, cache)
+    cache["complete"] = cache["offset"] == st.st_size
+    return cache
+
+
+def column(values: array):
+    """A numpy view of an array column."""
+    return np.frombuffer(values, dtype=values.typecode)
+
+
+def count_codes(codes: array, mask, size: int) -> list:
+    """Occurrences of each code 0..size-1, counting only rows where mask is set."""
+    if np is not None:
+        values = column(codes)
+        if mask is not None:
+            values = values[mask]
+        return np.bincount(values, minlength=size).tolist()
+    counts = Counter(codes if mask is None else compress(codes, mask))
+    return [counts.get(code, 0) for code in range(size)]
+
+
+def first_seen_counts(codes: array, mask=None) -> list:
+    """(code, count) for each code in the masked rows, in order of first occurrence."""
+    if np is not None:
+        values = column(codes)
+        if mask is not None:
+            values = values[mask]
+        present, first = np.unique(values, return_index=True)
+        counts = np.bincount(values)[present]
+        order = np.argsort(first, kind="stable")
+        return list(zip(present[order].tolist(), counts[order].tolist()))
+    # Counter keeps keys in insertion order, i.e. first occurrence
+    return list(Counter(codes if mask is None else compress(codes, mask)).items())
+
+
+def named_counts(pairs: list, names: list) -> dict:
+    """Sum (code, count) pairs by name, skipping codes whose name is None."""
+    result = {}
+    for code, n in pairs:
+        name = names[code]
+        if name is not None:
+            result[name] = result.get(name, 0) + n
+    return result
+
+
+def project_names(cache: dict) -> list:
+    """Project name per cwd code, as summarise_chunk.py names them; None for no project."""
+    return [Path(cwd).name or None if cwd else None for cwd in cache["cwds"]]
+
+
+def tool_names(cache: dict) -> list:
+    """Tool name per tool code, as summarise_chunk.py names them."""
+    return ["unknown" if name is None else name for name in cache["tools"]]
+
+
+def row_mask(cache: dict, start_ts: int = None, end_ts: int = None):
+    """Rows inside the window (numpy bool array or list), or None for all rows."""
+    if not start_ts and not end_ts:
+        return None
+    lo = start_ts or float("-inf")
+    hi = end_ts or float("inf")
+    if np is not None:
+        ts = column(cache["ts"])
+        return (ts >= lo) & (ts <= hi)
+    return [lo <= ts <= hi for ts in cache["ts"]]
+
+
+def tool_mask(cache: dict, mask=None, kinds: tuple = KINDS):
+    """Tool rows whose entry is in the row mask and of one of the given kinds, or None for all."""
+    wanted = [KINDS.index(kind) for kind in kinds]
+    if mask is None and len(wanted) == len(KINDS):
+        return None
+    if np is not None:
+        rows = column(cache["tool_row"])
+        selected = np.isin(column(cache["kind"])[rows], wanted)
+        return selected if mask is None else selected & mask[rows]
+    kind = cache["kind"]
+    return [kind[row] in wanted and (mask is None or mask[row]) for row in cache["tool_row"]]
+
+
+def time_range(cache: dict, mask=None, zeros: bool = False) -> tuple:
+    """(earliest, latest) timestamp of the masked rows; rows without one count only with zeros."""
+    if np is not None:
+        ts = column(cache["ts"])
+        if mask is not None:
+            ts = ts[mask]
+        if not zeros:
+            ts = ts[ts != 0]
+        return (int(ts.min()), int(ts.max())) if len(ts) else (None, None)
+    times = cache["ts"] if mask is None else list(compress(cache["ts"], mask))
+    if not zeros:
+        times = [ts for ts in times if ts]
+    return (min(times), max(times)) if times else (None, None)
+
+
+def query_rows(cache: dict, flag: int, mask=None, limit: int = None, later: bool = False) -> list:
+    """Rows with a query flag set, newest timestamp first.
+
+    Earlier rows come first on ties, or later ones with later=True. With a
+    limit only the first `limit` of that order are returned.
+    """
+    if np is not None:
+        flagged = (column(cache["flags"]) & flag) != 0
+        if mask is not None:
+            flagged &= mask
+        rows = np.flatnonzero(flagged)
+        rows = rows[np.lexsort((-rows if later else rows, -column(cache["ts"])[rows]))]
+        return rows[:limit].tolist()
+    flagged = [flags & flag for flags in cache["flags"]]
+    if mask is not None:
+        flagged = [f and m for f, m in zip(flagged, mask)]
+    ts = cache["ts"]
+    rows = sorted(compress(range(len(flagged)), flagged),
+                  key=lambda row: (-ts[row], -row if later else row))
+    return rows[:limit]
+
+
+def read_entries(filepath: str, cache: dict, rows: list) -> dict:
+    """Decode the lines of the given rows, reading forward through the file."""
+    from json_backend import loads
+
+    entries = {}
+    with open_history(filepath) as f:
+        for row in sorted(rows, key=lambda r: cache["offsets"][r]):
+            f.seek(cache["offsets"][row])
+            entries[row] = loads(f.readline())
+    return entries
+
+
+def bucket_counts(cache: dict, origin: int, width: int, mask=None, tools_mask=None, span: int = None,
+                  projects: list = None, tools: list = None) -> dict:
+    """Message, project and tool counts per bucket of (ts - origin) // width.
+
+    Only masked rows with a timestamp are counted. projects and tools name
+    each code (None leaves it out); codes sharing a name share a row, and
+    rows are keyed by name in order of first occurrence, as a fold over the
+    same entries would add them. Buckets cover 0..span-1 when span is given,
+    else the first to the last bucket used; "first" is the bucket the lists
+    start at (None when nothing was counted).
+    """
+    projects = projects or [None] * len(cache["cwds"])
+    tools = tools or [None] * len(cache["tools"])
+    if np is None:
+        return _bucket_counts_python(cache, origin, width, mask, tools_mask, span, projects, tools)
+
+    ts = column(cache["ts"])
+    keep = ts > 0
+    if mask is not None:
+        keep &= mask
+    slots = (ts - origin) // width
+    if span is None:
+        if not keep.any():
+            return {"first": None, "messages": [], "projects": {}, "tools": {}}
+        first = int(slots[keep].min())
+        span = int(slots[keep].max()) - first + 1
+        slots = slots - first
+    else:
+        first = 0
+
+    def table(codes, code_slots, names: list) -> dict:
+        present, first_index = np.unique(codes, return_index=True)
+        lookup = np.full(len(names), -1, dtype=np.int64)
+        index = {}
+        for code in present[np.argsort(first_index, kind="stable")].tolist():
+            if names[code] is not None:
+                lookup[code] = index.setdefault(names[code], len(index))
+        ids = lookup[codes]
+        counted = ids >= 0
+        flat = np.bincount(ids[counted] * span + code_slots[counted], minlength=len(index) * span)
+        grid = flat.reshape(len(index), span)
+        return {name: grid[i].tolist() for name, i in index.items()}
+
+    rows = column(cache["tool_row"])
+    tool_keep = keep[rows]
+    if tools_mask is not None:
+        tool_keep &= tools_mask
+    return {
+        "first": first,
+        "messages": np.bincount(slots[keep], minlength=span).tolist(),
+        "projects": table(column(cache["cwd"])[keep], slots[keep], projects),
+        "tools": table(column(cache["tool"])[tool_keep], slots[rows][tool_keep], tools),
+    }
+
+
+def _bucket_counts_python(cache: dict, origin: int, width: int, mask, tools_mask, span: int,
+                          projects: list, tools: list) -> dict:
+    ts = cache["ts"]
+    kept = [row for row in range(len(ts)) if ts[row] > 0 and (mask is None or mask[row])]
+    slots = {row: (ts[row] - origin) // width for row in kept}
+    if span is None:
+        if not kept:
+            return {"first": None, "messages": [], "projects": {}, "tools": {}}
+        first = min(slots.values())
+        span = max(slots.values()) - first + 1
+    else:
+        first = 0
+
+    messages = [0] * span
+    result = {"first": first, "messages": messages, "projects": {}, "tools": {}}
+    for row in kept:
+        messages[slots[row] - first] += 1
+        name = projects[cache["cwd"][row]]
+        if name is not None:
+            result["projects"].setdefault(name, [0] * span)[slots[row] - first] += 1
+    for i, row in enumerate(cache["tool_row"]):
+        if row in slots and (tools_mask is None or tools_mask[i]):
+            name = tools[cache["tool"][i]]
+            if name is not None:
+                result["tools"].setdefault(name, [0] * span)[slots[row] - first] += 1
+    return result
+
+
+def aggregate_file(cache: dict, start_ts: int = None, end_ts: int = None) -> dict:
+    """Reduce one file's columns to counts keyed by decoded strings."""
+    mask = row_mask(cache, start_ts, end_ts)
+    kinds = count_codes(cache["kind"], mask, len(KINDS))
+    earliest, latest = time_range(cache, mask)
+    # Tool calls of assistant messages, without empty names
+    tools = [name or None for name in tool_names(cache)]
+
+    def decode(names: list, counts: list) -> dict:
+        return {name: n for name, n in zip(names, counts) if n and name}
+
+    return {
+        "message_count": sum(kinds),
+        "user_count": kinds[0],
+        "assistant_count": kinds[1],
+        "earliest_ts": earliest,
+        "latest_ts": latest,
+        "projects": named_counts(first_seen_counts(cache["cwd"], mask), project_names(cache)),
+        "tools_used": named_counts(first_seen_counts(cache["tool"], tool_mask(cache, mask, ("assistant",))), tools),
+        "sessions": decode(cache["sessions"], count_codes(cache["session"], mask, len(cache["sessions"]))),
+    }
+
+
+def aggregate(files: list, start_ts: int = None, end_ts: int = None, top: int = 15) -> dict:
+    """Aggregate metadata across files, refreshing each file's cache first."""
+    result = {
+        "message_count": 0,
+        "user_count": 0,
+        "assistant_count": 0,
+        "earliest_ts": None,
+        "latest_ts": None,
+        "files_processed": 0,
+    }
+    projects, tools, sessions = Counter(), Counter(), Counter()
+    errors = []
+
+    for filepath in files:
+        try:
+            part = aggregate_file(refresh_cache(filepath), start_ts, end_ts)
+        except OSError as e:
+            errors.append(f"Failed to read {filepath}: {e}")
+            continue
+
+        result["files_processed"] += 1
+        for key in ("message_count", "user_count", "assistant_count"):
+            result[key] += part[key]
+        if part["earliest_ts"] is not None and (result["earliest_ts"] is None or part["earliest_ts"] < result["earliest_ts"]):
+            result["earliest_ts"] = part["earliest_ts"]
+        if part["latest_ts"] is not None and (result["latest_ts"] is None or part["latest_ts"] > result["latest_ts"]):
+            result["latest_ts"] = part["latest_ts"]
+        projects.update(part["projects"])
+        tools.update(part["tools_used"])
+        sessions.update(part["sessions"])
+
+    result["projects"] = dict(projects.most_common(top))
+    result["tools_used"] = dict(tools.most_common(top))
+    result["session_count"] = len(sessions)
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def main():
+    files = []
+    manifest = None
+    start_ts = None
+    end_ts = None
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--files" and i + 1 < len(args):
+            files = [f.strip() for f in args[i + 1].split(",")]
+            i += 2
+        elif args[i] == "--manifest" and i + 1 < len(args):
+            manifest = args[i + 1]
+            i += 2
+        elif args[i] == "--start-ts" and i + 1 < len(args):
+            start_ts = int(args[i + 1])
+            i += 2
+        elif args[i] == "--end-ts" and i + 1 < len(args):
+            end_ts = int(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    if manifest:
+        from chunk_pool import load_manifest
+        files = [f.strip() for chunk in load_manifest(manifest) for f in chunk]
+    elif not files:
+        from history_index import discover_files
+        files = discover_files()
+
+    if not files:
+        print(json.dumps({"error": "No files to aggregate"}))
+        sys.exit(1)
+
+    result = aggregate(files, start_ts, end_ts)
+    result["backend"] = "numpy" if np is not None else "array"
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
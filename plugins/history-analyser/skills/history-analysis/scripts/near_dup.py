@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Streaming near-duplicate filter for search results, using shingled MinHash.
+
+Each text is cut into overlapping word 3-grams and summarised by a MinHash
+signature. The signature uses one-permutation hashing: every shingle is
+hashed once, binned by its top bits and the minimum kept per bin, with
+empty bins filled from their right neighbour (rotation densification).
+Signatures are split into LSH bands; a new text whose band
+collides with a kept one is compared by signature agreement, an estimate
+of Jaccard similarity, and dropped when it reaches the threshold. The LSH
+table holds at most `capacity` signatures, evicting the oldest first, and
+each band bucket remembers only its BUCKET_LIMIT newest members, so memory
+and the work per text stay bounded however many results stream through.
+
+Usage:
+    near_dup.py [--field preview] [--threshold 0.6] [--capacity 10000] [--unbuffered] < matches.ndjson
+
+Reads NDJSON on stdin and writes each line whose field is not a near
+duplicate of an earlier one. --unbuffered flushes after every line so the
+filter can sit in a streaming pipe.
+
+Output: the distinct NDJSON lines
+"""
+
+import os
+import re
+import sys
+import zlib
+from collections import OrderedDict, deque
+from operator import eq
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_CAPACITY = 10_000
+BUCKET_LIMIT = 4
+
+# Multiplicative mixing spreads crc32 shingle hashes over 64 bits; the top
+# BIN_BITS pick the bin
+MIX = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+BIN_BITS = NUM_PERM.bit_length() - 1
+EMPTY = 1 << 64
+
+WORD = re.compile(r"\w+")
+
+
+def shingles(text: str) -> set:
+    """Hashed word 3-grams of the lowercased text (the whole text if shorter)."""
+    words = WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {zlib.crc32(" ".join(words).encode())}
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode())
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def signature(text: str) -> tuple:
+    sig = [EMPTY] * NUM_PERM
+    for h in shingles(text):
+        h = (h * MIX) & MASK64
+        b = h >> (64 - BIN_BITS)
+        if h < sig[b]:
+            sig[b] = h
+
+    # An empty bin borrows the next filled bin's value, tagged with the
+    # distance; walking the ring backwards twice finds it in one pass
+    dense = list(sig)
+    nearest = None
+    for i in range(2 * NUM_PERM - 1, -1, -1):
+        value = sig[i % NUM_PERM]
+        if value < EMPTY:
+            nearest = (value, i)
+        elif i < NUM_PERM and nearest is not None:
+            dense[i] = nearest[0] + ((nearest[1] - i) << 64)
+    return tuple(dense)
+
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """Estimated Jaccard similarity: the fraction of agreeing positions."""
+    return sum(map(eq, sig_a, sig_b)) / NUM_PERM
+
+
+class NearDuplicateFilter:
+    """Remembers recent signatures and reports whether a text repeats one."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, capacity: int = DEFAULT_CAPACITY):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.kept = OrderedDict()
+        self.bands = [{} for _ in range(BANDS)]
+        self.next_id = 0
+        self.duplicates = 0
+
+    def band_keys(self, sig: tuple) -> list:
+        return [sig[i * ROWS:(i + 1) * ROWS] for i in range(BANDS)]
+
+    def is_duplicate(self, text: str) -> bool:
+        """True if text is near an earlier kept text; otherwise remember it."""
+        sig = signature(text)
+        keys = self.band_keys(sig)
+        checked = set()
+        for band, key in zip(self.bands, keys):
+            for other in reversed(band.get(key, ())):
+                if other in checked:
+                    continue
+                checked.add(other)
+                if similarity(sig, self.kept[other]) >= self.threshold:
+                    self.duplicates += 1
+                    return True
+
+        sig_id = self.next_id
+        self.next_id += 1
+        self.kept[sig_id] = sig
+        for band, key in zip(self.bands, keys):
+            if key not in band:
+                band[key] = deque(maxlen=BUCKET_LIMIT)
+            band[key].append(sig_id)
+        if len(self.kept) > self.capacity:
+            self.evict()
+        return False
+
+    def evict(self):
+        old_id, old_sig = self.kept.popitem(last=False)
+        for band, key in zip(self.bands, self.band_keys(old_sig)):
+            ids = band.get(key)
+            if ids is None or old_id not in ids:
+                continue
+            ids.remove(old_id)
+            if not ids:
+                del band[key]
+
+    def unique(self, items, field: str):
+        """Yield items whose `field` is not a near duplicate of an earlier one.
+
+        Items without the field (such as error records) always pass.
+        """
+        for item in items:
+            text = item.get(field)
+            if isinstance(text, str) and self.is_duplicate(text):
+                continue
+            yield item
+
+
+def main():
+    field = "preview"
+    threshold = DEFAULT_THRESHOLD
+    capacity = DEFAULT_CAPACITY
+    unbuffered = False
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--field" and i + 1 < len(args):
+            field = args[i + 1]
+            i += 2
+        elif args[i] == "--threshold" and i + 1 < len(args):
+            threshold = float(args[i + 1])
+            i += 2
+        elif args[i] == "--capacity" and i + 1 < len(args):
+            capacity = int(args[i + 1])
+            i += 2
+        elif args[i] == "--unbuffered":
+            unbuffered = True
+            i += 1
+        else:
+            i += 1
+
+    from json_backend import DECODE_ERRORS, loads
+
+    dedupe = NearDuplicateFilter(threshold, capacity)
+    out = sys.stdout.buffer
+    try:
+        for line in sys.stdin.buffer:
+            try:
+                item = loads(line)
+            except DECODE_ERRORS:
+                continue
+            text = item.get(field) if isinstance(item, dict) else None
+            if isinstance(text, str) and dedupe.is_duplicate(text):
+                continue
+            out.write(line)
+            if unbuffered:
+                out.flush()
+    except BrokenPipeError:
+        # The reader (e.g. head) has all it wants; silence the exit-time flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Raw-line prefilters shared by the scanners, the index and the query language.
+
+A regex or boolean query is reduced to literal runs every match must
+contain; literal_prefilter turns them into a check on the undecoded JSONL
+line, so lines that cannot match are skipped before JSON decoding. The
+checks are conservative: they only reject lines that provably cannot match.
+"""
+
+import re
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Characters that appear verbatim in both raw JSON and decoded text
+LITERAL_SAFE = frozenset(range(0x20, 0x7f)) - {ord('"'), ord("\\")}
+
+# Literals that cannot be synthesised by extract_content's "[tool: name]"
+# label or str(input): no repr punctuation, not a bare number, not in "None"
+REPR_SAFE = re.compile(r"[a-z0-9_./-]+")
+REPR_NUMBER = re.compile(r"[0-9.e+-]+")
+
+# Escapes whose decoded text differs from the raw bytes
+ESCAPE_MARKERS = re.compile(rb"\\[u/]")
+
+
+def required_literals(pattern: re.Pattern) -> list:
+    """Lowercased literal runs that every match of the pattern must contain."""
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except (re.error, RecursionError):
+        return []
+
+    literals = []
+
+    def walk(items):
+        run = []
+        for op, value in items:
+            if op is sre_constants.LITERAL and value in LITERAL_SAFE:
+                run.append(chr(value))
+                continue
+            if run:
+                literals.append("".join(run))
+                run = []
+            if op is sre_constants.SUBPATTERN:
+                walk(value[-1])
+            elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and value[0] >= 1:
+                walk(value[2])
+        if run:
+            literals.append("".join(run))
+
+    walk(parsed)
+    return [lit.lower() for lit in literals if len(lit) >= 2]
+
+
+def byte_prefilter(pattern: re.Pattern):
+    """Build a raw-line check that rejects lines the pattern cannot match."""
+    return literal_prefilter(required_literals(pattern))
+
+
+def literal_prefilter(literals: list, exact: list = ()):
+    """Build a raw-line check that rejects lines missing any required literal.
+
+    Returns None when there are no literals. The check is conservative:
+    non-ASCII lines and lines with \\u or \\/ escapes always pass, and
+    tool_use lines are only tested against literals that str(input) could
+    not have produced. `exact` literals come from raw JSON string values
+    and are checked on tool_use lines too.
+    """
+    if not literals and not exact:
+        return None
+
+    repr_literals = [
+        lit.encode() for lit in literals
+        if REPR_SAFE.fullmatch(lit) and not REPR_NUMBER.fullmatch(lit) and lit not in "none"
+    ] + [lit.encode() for lit in exact]
+    literals = [lit.encode() for lit in [*literals, *exact]]
+
+    def candidate(line: bytes) -> bool:
+        lowered = line.lower()
+        for lit in literals:
+            if lit not in lowered:
+                break
+        else:
+            return True
+
+        if not line.isascii() or ESCAPE_MARKERS.search(line):
+            return True
+        if b'"tool_use"' in line:
+            return all(lit in lowered for lit in repr_literals)
+        return False
+
+    return candidate
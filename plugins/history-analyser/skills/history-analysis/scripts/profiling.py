@@ -0,0 +1,225 @@
+"""
+Per-stage timing for the --profile options of the chunk scripts.
+
+A Stats collects wall and CPU seconds per named stage plus counters (lines,
+bytes, decode failures, ...). Hot loops wrap their per-line callables with
+Stats.timed and their line source with Stats.reading once, before the loop,
+so a run without --profile executes exactly the same loop body. Pool
+workers return their own Stats, which chunk_pool merges into the caller's.
+
+Stage wall times from workers overlap, so their sum can exceed the run's
+wall_s; cpu_s covers the whole run, workers included.
+
+run() adds --profile-dump PATH [--profiler cprofile|pyinstrument] to a
+script's main() for a full call profile of the calling process.
+"""
+
+import json
+import sys
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from time import perf_counter, process_time
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class Stats:
+    """Wall/CPU seconds per stage and named counters for one run or chunk."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = Counter()
+        self.wall_start = perf_counter()
+        self.cpu_start = process_time()
+        # CPU seconds spent in pool workers on this run's behalf
+        self.worker_cpu = 0.0
+
+    def _stage(self, name: str) -> list:
+        # [wall, cpu, calls], mutated in place by the timers
+        return self.stages.setdefault(name, [0.0, 0.0, 0])
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block as one call of `name`."""
+        totals = self._stage(name)
+        wall, cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            totals[0] += perf_counter() - wall
+            totals[1] += process_time() - cpu
+            totals[2] += 1
+
+    def timed(self, name: str, func, errors: tuple = ()):
+        """Wrap func so each call is timed as `name`.
+
+        Exceptions of the `errors` types are counted as `<name>_failures`
+        before being re-raised.
+        """
+        totals = self._stage(name)
+        counters = self.counters
+        failures = f"{name}_failures"
+        if errors:
+            counters[failures] += 0
+
+        def call(*args, **kwargs):
+            wall, cpu = perf_counter(), process_time()
+            try:
+                return func(*args, **kwargs)
+            except errors:
+                counters[failures] += 1
+                raise
+            finally:
+                totals[0] += perf_counter() - wall
+                totals[1] += process_time() - cpu
+                totals[2] += 1
+
+        return call
+
+    def reading(self, items, line=None, name: str = "read", count: bool = True):
+        """Iterate items, timing each fetch as `name` and counting lines and bytes.
+
+        `line` picks the raw line out of an item, e.g. from a (line_num, line)
+        pair; by default the item is the line. count=False only times.
+        """
+        return self._reading(iter(items), line, self._stage(name), count)
+
+    def _reading(self, items, line, totals: list, count: bool):
+        counters = self.counters
+        try:
+            while True:
+                wall, cpu = perf_counter(), process_time()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                finally:
+                    totals[0] += perf_counter() - wall
+                    totals[1] += process_time() - cpu
+                    totals[2] += 1
+                if count:
+                    counters["lines"] += 1
+                    counters["bytes"] += len(item if line is None else line(item))
+                yield item
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    def add(self, name: str, wall: float, cpu: float, calls: int = 1):
+        """Record a stage timed elsewhere, e.g. by the calling shell script."""
+        totals = self._stage(name)
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] += calls
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def merge(self, other: "Stats"):
+        """Fold a worker's stages and counters into these."""
+        for name, (wall, cpu, calls) in other.stages.items():
+            self.add(name, wall, cpu, calls)
+        self.counters.update(other.counters)
+        self.worker_cpu += other.worker_cpu
+
+    def report(self) -> dict:
+        """The "stats" block: totals, per-stage timings and counters."""
+        return {
+            "wall_s": round(perf_counter() - self.wall_start, 6),
+            "cpu_s": round(process_time() - self.cpu_start + self.worker_cpu, 6),
+            "stages": {
+                name: {"wall_s": round(wall, 6), "cpu_s": round(cpu, 6), "calls": calls}
+                for name, (wall, cpu, calls) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+
+def stage(stats: Stats, name: str):
+    """stats.stage(name), or a no-op when profiling is off."""
+    return nullcontext() if stats is None else stats.stage(name)
+
+
+def dumps(result: dict, stats: Stats = None, **kwargs) -> str:
+    """json.dumps(result), with a "stats" block when profiling.
+
+    Serialisation is timed as the "output" stage on a first pass, so the
+    block can report it; the second pass writes the block itself.
+    """
+    if stats is None:
+        return json.dumps(result, **kwargs)
+    with stats.stage("output"):
+        json.dumps(result, **kwargs)
+    return json.dumps({**result, "stats": stats.report()}, **kwargs)
+
+
+def _dump_args(argv: list) -> tuple:
+    """Strip --profile-dump PATH and --profiler NAME from argv."""
+    path = None
+    profiler = "cprofile"
+    rest = []
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--profile-dump" and i + 1 < len(argv):
+            path = argv[i + 1]
+            i += 2
+        elif argv[i] == "--profiler" and i + 1 < len(argv):
+            profiler = argv[i + 1]
+            i += 2
+        else:
+            rest.append(argv[i])
+            i += 1
+    return path, profiler, rest
+
+
+def _start(profiler: str, path: str):
+    """Start a profiler; returns a function that stops it and writes PATH."""
+    if profiler == "pyinstrument":
+        from pyinstrument import Profiler
+        prof = Profiler()
+        prof.start()
+
+        def finish():
+            prof.stop()
+            with open(path, "w") as f:
+                f.write(prof.output_html() if path.endswith(".html") else prof.output_text())
+
+        return finish
+
+    import cProfile
+    prof = cProfile.Profile()
+    prof.enable()
+
+    def finish():
+        prof.disable()
+        prof.dump_stats(path)
+
+    return finish
+
+
+def run(main):
+    """Call main(), under a profiler when --profile-dump PATH is given.
+
+    cProfile writes pstats data (python -m pstats PATH); pyinstrument writes
+    HTML when PATH ends in .html, text otherwise. Only this process is
+    profiled, so use --workers 1 to see the scan itself.
+    """
+    path, profiler, argv = _dump_args(sys.argv[1:])
+    if path is None:
+        main()
+        return
+    if profiler not in PROFILERS:
+        print(json.dumps({"error": f"Invalid --profiler: {profiler} (use cprofile or pyinstrument)"}))
+        sys.exit(1)
+    try:
+        finish = _start(profiler, path)
+    except ImportError:
+        print(json.dumps({"error": "pyinstrument is not installed (pip install pyinstrument)"}))
+        sys.exit(1)
+
+    sys.argv[1:] = argv
+    try:
+        main()
+    finally:
+        finish()
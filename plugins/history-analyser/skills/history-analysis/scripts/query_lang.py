@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Boolean query language for history search.
+
+Terms are case-insensitive substrings. Juxtaposed terms are ANDed; OR, NOT
+(or a leading -) and parentheses combine them, and "double quotes" make a
+phrase. A field scope restricts a term to one part of an entry:
+
+    user:TEXT        user message text (string content, text blocks, display)
+    assistant:TEXT   assistant text blocks
+    tool:NAME        a tool_use block with exactly this tool name
+    project:TEXT     the project directory name (last part of cwd)
+    session:PREFIX   the session id
+    TEXT             anything extract_content returns, as the regex search sees it
+
+Example: user:"rate limit" (tool:Bash OR tool:Edit) -project:scratch
+
+The planner orders each AND/OR so the cheapest predicates run first:
+metadata fields, then tool names, then scoped text, then the full content
+blob. Within a cost class longer (more selective) terms go first. Scoped
+text is extracted only from the blocks the scope names, and the full blob
+is built only if an unscoped term is reached. Literals every match must
+contain also feed the raw-line byte prefilter used by the regex search;
+scoped literals come from raw string values, so they reject tool_use lines
+that the regex prefilter has to let through.
+
+Usage:
+    query_lang.py "query"
+
+Output: JSON with the parsed plan and its required literals
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+
+from entries import extract_content
+from prefilter import LITERAL_SAFE, literal_prefilter
+
+FIELDS = ("user", "assistant", "tool", "project", "session")
+
+# Relative cost of evaluating a term, by field (None is unscoped)
+COST = {"session": 0, "project": 0, "tool": 1, "user": 2, "assistant": 2, None: 3}
+
+TOKEN = re.compile(r'\s*(?:(\()|(\))|(-)?(?:(\w+):)?(?:"([^"]*)"|([^\s()"]+)))')
+
+
+class QueryError(ValueError):
+    pass
+
+
+class EntryView:
+    """Lazily extracted, lowercased parts of one entry."""
+
+    __slots__ = ("entry", "_blob", "_user", "_assistant", "_tools")
+
+    def __init__(self, entry: dict):
+        self.entry = entry
+        self._blob = self._user = self._assistant = self._tools = None
+
+    def blocks(self) -> list:
+        content = self.entry.get("message", {}).get("content", [])
+        return content if isinstance(content, list) else []
+
+    def blob(self) -> str:
+        if self._blob is None:
+            self._blob = extract_content(self.entry).lower()
+        return self._blob
+
+    def user_text(self) -> str:
+        if self._user is None:
+            texts = []
+            if self.entry.get("type") == "user":
+                if "display" in self.entry:
+                    texts.append(str(self.entry["display"]))
+                content = self.entry.get("message", {}).get("content")
+                if isinstance(content, str):
+                    texts.append(content)
+                texts.extend(str(b.get("text", "")) for b in self.blocks()
+                             if isinstance(b, dict) and b.get("type") == "text")
+            self._user = "\n".join(texts).lower()
+        return self._user
+
+    def assistant_text(self) -> str:
+        if self._assistant is None:
+            texts = []
+            if self.entry.get("type") == "assistant":
+                texts.extend(str(b.get("text", "")) for b in self.blocks()
+                             if isinstance(b, dict) and b.get("type") == "text")
+            self._assistant = "\n".join(texts).lower()
+        return self._assistant
+
+    def tools(self) -> set:
+        if self._tools is None:
+            self._tools = {str(b.get("name", "")).lower() for b in self.blocks()
+                           if isinstance(b, dict) and b.get("type") == "tool_use"}
+        return self._tools
+
+
+class Term:
+    def __init__(self, field: str, text: str):
+        self.field = field
+        self.text = text.lower()
+        self.cost = COST[field]
+
+    def evaluate(self, view: EntryView) -> bool:
+        field = self.field
+        if field is None:
+            return self.text in view.blob()
+        if field == "session":
+            return str(view.entry.get("sessionId", "")).lower().startswith(self.text)
+        if field == "project":
+            cwd = view.entry.get("cwd", "")
+            return bool(cwd) and self.text in Path(cwd).name.lower()
+        if field == "tool":
+            return self.text in view.tools()
+        if field == "user":
+            return self.text in view.user_text()
+        return self.text in view.assistant_text()
+
+    def required(self) -> list:
+        return [self]
+
+    def describe(self):
+        return f"{self.field}:{self.text}" if self.field else self.text
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+        self.cost = child.cost
+
+    def evaluate(self, view: EntryView) -> bool:
+        return not self.child.evaluate(view)
+
+    def required(self) -> list:
+        return []
+
+    def describe(self):
+        return {"not": self.child.describe()}
+
+
+class And:
+    def __init__(self, children: list):
+        self.children = plan(children)
+        self.cost = max(child.cost for child in self.children)
+
+    def evaluate(self, view: EntryView) -> bool:
+        return all(child.evaluate(view) for child in self.children)
+
+    def required(self) -> list:
+        return [term for child in self.children for term in child.required()]
+
+    def describe(self):
+        return {"and": [child.describe() for child in self.children]}
+
+
+class Or:
+    def __init__(self, children: list):
+        self.children = plan(children)
+        self.cost = max(child.cost for child in self.children)
+
+    def evaluate(self, view: EntryView) -> bool:
+        return any(child.evaluate(view) for child in self.children)
+
+    def required(self) -> list:
+        return []
+
+    def describe(self):
+        return {"or": [child.describe() for child in self.children]}
+
+
+def plan(children: list) -> list:
+    """Order siblings cheapest first, longer literals first within a cost."""
+    return sorted(children, key=lambda c: (c.cost, -len(getattr(c, "text", ""))))
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise QueryError(f"Unexpected character at {pos}: {text[pos:pos + 10]!r}")
+        pos = m.end()
+        lparen, rparen, negate, field, phrase, word = m.groups()
+        if lparen:
+            tokens.append(("(",))
+        elif rparen:
+            tokens.append((")",))
+        elif phrase is None and field is None and not negate and word in ("AND", "OR", "NOT"):
+            tokens.append((word,))
+        else:
+            if field is not None and field.lower() not in FIELDS:
+                # Not a scope (e.g. a URL scheme): keep the colon as text
+                word = f"{field}:{word if phrase is None else phrase}"
+                field, phrase = None, None
+            tokens.append(("term", bool(negate), field and field.lower(), phrase if phrase is not None else word))
+    return tokens
+
+
+class Parser:
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError(f"Unexpected {self.peek()!r}")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_unary()]
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+            children.append(self.parse_unary())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_unary(self):
+        kind = self.peek()
+        if kind == "NOT":
+            self.take()
+            return Not(self.parse_unary())
+        if kind == "(":
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise QueryError("Missing )")
+            self.take()
+            return node
+        if kind == "term":
+            _, negate, field, text = self.take()
+            if not text:
+                raise QueryError("Empty term")
+            term = Term(field, text)
+            return Not(term) if negate else term
+        raise QueryError(f"Expected a term, got {kind or 'end of query'}")
+
+
+class Query:
+    """A parsed boolean query; picklable so it can cross the worker pool."""
+
+    def __init__(self, text: str):
+        tokens = tokenize(text)
+        if not tokens:
+            raise QueryError("Empty query")
+        self.text = text
+        self.root = Parser(tokens).parse()
+
+    def matches(self, entry: dict) -> bool:
+        return self.root.evaluate(EntryView(entry))
+
+    def positive_terms(self) -> list:
+        """Texts of every term not under a NOT, for relevance scoring."""
+        found = []
+
+        def walk(node):
+            if isinstance(node, Term):
+                found.append(node.text)
+            elif isinstance(node, (And, Or)):
+                for child in node.children:
+                    walk(child)
+
+        walk(self.root)
+        return found
+
+    def required_terms(self) -> list:
+        """Terms every match must satisfy whose text is usable as a raw literal."""
+        return [
+            term for term in self.root.required()
+            if len(term.text) >= 2 and all(ord(c) in LITERAL_SAFE for c in term.text)
+        ]
+
+    def required_literals(self) -> list:
+        return [term.text for term in self.required_terms()]
+
+    def prefilter(self):
+        # Scoped terms match raw string values; unscoped ones may match text
+        # extract_content synthesised from a tool input
+        terms = self.required_terms()
+        return literal_prefilter(
+            [term.text for term in terms if term.field is None],
+            [term.text for term in terms if term.field is not None],
+        )
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(json.dumps({"error": "Usage: query_lang.py \"query\""}))
+        sys.exit(1)
+    try:
+        query = Query(sys.argv[1])
+    except QueryError as e:
+        print(json.dumps({"error": f"Invalid query: {e}"}))
+        sys.exit(1)
+    print(json.dumps({"query": query.text, "plan": query.root.describe(),
+                      "required_literals": query.required_literals()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+BM25 relevance scoring with recency decay for search results.
+
+Corpus statistics come from the persistent index (see history_index.py):
+the number of indexed entries, their mean content length and each query
+term's document frequency. Term frequency and document length are taken
+from the matched entry's extract_content text, so scan and index results
+score identically.
+
+    bm25  = sum over terms of idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len))
+    decay = 0.5 ** (age_days / half_life_days)
+    score = bm25 * ((1 - recency_weight) + recency_weight * decay)
+
+recency_weight 0 ranks by relevance alone; 1 scales relevance by the full
+decay. A query with no usable terms scores by recency alone.
+
+Usage:
+    ranking.py --query "pattern" [--index-db PATH]
+
+Output: JSON with the corpus statistics and per-term idf for the query
+"""
+
+import heapq
+import json
+import math
+import re
+import sys
+import time
+
+K1 = 1.2
+B = 0.75
+DEFAULT_HALF_LIFE_DAYS = 30.0
+DEFAULT_RECENCY_WEIGHT = 0.3
+DAY_MS = 86_400_000
+
+
+class Ranker:
+    """Scores matched content; plain data so it can cross the worker pool."""
+
+    def __init__(self, terms: list, docs: int, avg_len: float, doc_freqs: dict,
+                 half_life_days: float = DEFAULT_HALF_LIFE_DAYS,
+                 recency_weight: float = DEFAULT_RECENCY_WEIGHT, now_ms: int = None):
+        self.terms = terms
+        self.docs = docs
+        self.avg_len = avg_len or 1.0
+        self.idf = {
+            term: math.log((docs - doc_freqs.get(term, 0) + 0.5) / (doc_freqs.get(term, 0) + 0.5) + 1)
+            for term in terms
+        }
+        self.half_life_days = half_life_days
+        self.recency_weight = recency_weight
+        self.now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+
+    def bm25(self, content: str) -> float:
+        if not self.terms:
+            return 1.0
+        text = content.lower()
+        norm = K1 * (1 - B + B * len(text) / self.avg_len)
+        score = 0.0
+        for term in self.terms:
+            tf = text.count(term)
+            if tf:
+                score += self.idf[term] * tf * (K1 + 1) / (tf + norm)
+        return score
+
+    def decay(self, ts: int) -> float:
+        if not ts or ts <= 0:
+            return 0.0
+        age_days = max(0, self.now_ms - ts) / DAY_MS
+        return 0.5 ** (age_days / self.half_life_days) if self.half_life_days > 0 else 1.0
+
+    def score(self, content: str, ts: int) -> float:
+        weight = self.recency_weight
+        return self.bm25(content) * ((1 - weight) + weight * self.decay(ts))
+
+    def describe(self) -> dict:
+        return {
+            "terms": {term: round(self.idf[term], 4) for term in self.terms},
+            "indexed_entries": self.docs,
+            "avg_length": round(self.avg_len, 1),
+            "half_life_days": self.half_life_days,
+            "recency_weight": self.recency_weight,
+        }
+
+
+def query_terms(pattern) -> list:
+    """Distinct lowercased terms to score: a regex's required literals or a
+    boolean query's positive terms, kept only if the trigram index can count them."""
+    from history_index import MIN_TERM_LEN
+    from prefilter import required_literals
+
+    if isinstance(pattern, re.Pattern):
+        terms = required_literals(pattern)
+    else:
+        terms = pattern.positive_terms()
+    return list(dict.fromkeys(t for t in terms if len(t) >= MIN_TERM_LEN))
+
+
+def build_ranker(pattern, conn, **options) -> Ranker:
+    """Read the statistics the query needs from an index the caller has refreshed."""
+    from history_index import corpus_stats, document_frequency
+
+    docs, avg_len = corpus_stats(conn)
+    terms = query_terms(pattern)
+    doc_freqs = {term: document_frequency(conn, term) for term in terms}
+    return Ranker(terms, docs, avg_len, doc_freqs, **options)
+
+
+def top_k(matches, k: int) -> tuple:
+    """Best k matches by score (earlier wins ties) and the number seen.
+
+    Keeps a k-sized min-heap, so the full match stream is never held.
+    Records without a score (errors) follow the ranked matches.
+    """
+    heap = []
+    errors = []
+    seen = 0
+    for seq, match in enumerate(matches):
+        if "score" not in match:
+            errors.append(match)
+            continue
+        seen += 1
+        item = (match["score"], -seq, match)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif heap and item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+    ranked = [match for _, _, match in sorted(heap, key=lambda item: item[:2], reverse=True)]
+    for match in ranked:
+        match["score"] = round(match["score"], 4)
+    return ranked + errors, seen
+
+
+def main():
+    query = None
+    index_db = None
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--query" and i + 1 < len(args):
+            query = args[i + 1]
+            i += 2
+        elif args[i] == "--index-db" and i + 1 < len(args):
+            index_db = args[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    if not query:
+        print(json.dumps({"error": "Missing --query"}))
+        sys.exit(1)
+
+    try:
+        pattern = re.compile(query, re.IGNORECASE)
+    except re.error as e:
+        print(json.dumps({"error": f"Invalid regex: {e}"}))
+        sys.exit(1)
+
+    from history_index import discover_files, open_index, refresh
+    conn = open_index(index_db)
+    refresh(conn, discover_files())
+    ranker = build_ranker(pattern, conn)
+    print(json.dumps({"query": query, **ranker.describe()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
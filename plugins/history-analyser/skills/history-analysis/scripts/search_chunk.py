@@ -4,7 +4,70 @@ Search within JSONL files for a pattern.
 
 Usage:
     search_chunk.py --query "pattern" --files file1.jsonl,file2.jsonl
-    search_chunk.py --query "pattern" --files file1.jsonl --start-ts MS --end-ts MS
+    search_chunk.py --query "pattern" --files file1.jsonl --start-ts MS --end-ts MS [--seek]
+    search_chunk.py --query "pattern" --index [--index-db PATH] [--files ...]
+    search_chunk.py --query "pattern" --manifest manifest.json --workers N
+    search_chunk.py --query "pattern" --files ... --stream [--limit N] [--totals]
+    search_chunk.py --query "pattern" --files ... --context N
+    search_chunk.py --query "pattern" --files ... --dedupe [--dedupe-threshold 0.6]
+    search_chunk.py --query 'user:"rate limit" (tool:Bash OR tool:Edit)' --bool --files ...
+    search_chunk.py --query "pattern" --files ... --rank [--half-life DAYS] [--recency-weight W]
+    search_chunk.py --query "pattern" --watch [...]
+    search_chunk.py --query "pattern" --files ... --profile [--profile-dump PATH]
+
+With --index, queries are answered from the persistent FTS index (see
+history_index.py), refreshing it for changed files first. Patterns with no
+required literal of 3+ chars fall back to the regex scan. Without --files, --index
+searches every project file.
+
+--manifest takes chunk.sh output (path or '-' for stdin) in place of --files.
+--workers N scans chunks in a process pool; output matches a serial run.
+
+The scan checks raw line bytes for the literals a pattern requires before
+decoding JSON, so most non-matching lines are never parsed.
+
+--seek reads only the byte blocks whose timestamps overlap --start-ts/--end-ts,
+using per-file sidecars maintained by seek_index.py.
+
+--limit caps the matches returned (default 100). --stream prints each match
+as an NDJSON line as soon as it is found and stops scanning at --limit,
+unless --totals asks for the full count. The last line is a trailer with
+the query, files_searched and either total_matches or "truncated": true.
+
+--context N attaches the N entries before and after each returned match in
+its conversation thread (following uuid/parentUuid), read by direct seeks
+using per-file graph sidecars maintained by session_graph.py.
+
+--bool reads --query as a boolean query with AND/OR/NOT, phrases and the
+field scopes user:, assistant:, tool:, project: and session: (see
+query_lang.py). Predicates run cheapest first and content is extracted only
+where a term needs it. Boolean queries always scan; --index is ignored.
+
+--rank returns the --limit best matches by BM25 relevance blended with a
+recency decay (half-life 30 days, weight 0.3 by default; see ranking.py),
+highest score first, each with a "score". Term statistics come from the
+persistent index, which is refreshed for the searched files first. Matches
+stream through a bounded heap, so the full match set is never held;
+--stream is ignored.
+
+--dedupe drops matches whose preview is a near duplicate of an earlier one
+(estimated Jaccard similarity of word 3-grams at or above the threshold,
+see near_dup.py). It runs as matches are produced, so --limit and
+total_matches count distinct hits; the output reports how many were
+dropped as "duplicates".
+
+--watch sends the search to a running history_watch.py daemon, which
+answers from its hot index over the watched files unless --files or
+--manifest is given. Without a daemon the search runs here as usual.
+
+--profile adds a "stats" block (the trailer line with --stream) with wall and
+CPU seconds per stage (discover, read, prefilter, decode, timestamp,
+extract, match, rank, dedupe, index, context, output), lines, bytes and
+decode_failures; see profiling.py. --profile-dump PATH writes a cProfile
+dump of the run, or a pyinstrument report with --profiler pyinstrument.
+
+JSON is decoded with orjson or pysimdjson when installed (see
+json_backend.py); the output's json_backend field names the one used.
 
 Output: JSON with matching messages and context
 """
@@ -12,100 +75,210 @@ Output: JSON with matching messages and context
 import json
 import re
 import sys
+from operator import itemgetter
 from pathlib import Path
-from datetime import datetime
-
-
-def extract_content(entry: dict) -> str:
-    """Extract all searchable text from an entry."""
-    texts = []
-
-    if "display" in entry:
-        texts.append(entry["display"])
-
-    message = entry.get("message", {})
-    content = message.get("content", [])
-
-    if isinstance(content, str):
-        texts.append(content)
-    elif isinstance(content, list):
-        for item in content:
-            if isinstance(item, dict):
-                if item.get("type") == "text":
-                    texts.append(item.get("text", ""))
-                elif item.get("type") == "tool_use":
-                    texts.append(f"[tool: {item.get('name', '')}]")
-                    if "input" in item:
-                        texts.append(str(item["input"]))
-                elif item.get("type") == "tool_result":
-                    result = item.get("content", "")
-                    if isinstance(result, str):
-                        texts.append(result[:500])
-
-    return "\n".join(texts)
-
-
-def parse_timestamp(ts) -> int:
-    """Convert various timestamp formats to Unix ms."""
-    if isinstance(ts, (int, float)):
-        return int(ts)
-    if isinstance(ts, str):
+
+from chunk_pool import imap_chunks, load_manifest, map_chunks, split_files
+from entries import extract_content, parse_timestamp
+from json_backend import BACKEND, DECODE_ERRORS, loads
+from near_dup import NearDuplicateFilter
+from prefilter import byte_prefilter
+from profiling import Stats, dumps, run, stage
+from ranking import DEFAULT_HALF_LIFE_DAYS, DEFAULT_RECENCY_WEIGHT
+from seek_index import iter_lines
+from session_graph import refresh_graph, thread_context
+
+
+def iter_matches(filepath: str, pattern, start_ts: int = None, end_ts: int = None,
+                 seek: bool = False, ranker=None, stats=None):
+    """Yield matches from a single JSONL file as they are found.
+
+    `pattern` is a compiled regex searched against extract_content, or a
+    query_lang.Query evaluated against the decoded entry. With a ranker
+    (see ranking.py), each match carries a "score". With stats (see
+    profiling.py), each stage of the loop is timed.
+    """
+    is_regex = isinstance(pattern, re.Pattern)
+    candidate = byte_prefilter(pattern) if is_regex else pattern.prefilter()
+
+    lines = iter_lines(filepath, start_ts, end_ts, seek)
+    decode, timestamp, extract = loads, parse_timestamp, extract_content
+    match_entry = pattern.search if is_regex else pattern.matches
+    score = ranker.score if ranker is not None else None
+    # Timestamps are only parsed for a time window or the ranker
+    need_ts = bool(start_ts or end_ts or score)
+    if stats is not None:
+        stats.count("files")
+        lines = stats.reading(lines, line=itemgetter(1))
+        if candidate:
+            candidate = stats.timed("prefilter", candidate)
+        decode = stats.timed("decode", decode, DECODE_ERRORS)
+        timestamp = stats.timed("timestamp", timestamp)
+        extract = stats.timed("extract", extract)
+        match_entry = stats.timed("match", match_entry)
+        if score is not None:
+            score = stats.timed("rank", score)
+
+    for line_num, line in lines:
+        if candidate and not candidate(line):
+            continue
         try:
-            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-            return int(dt.timestamp() * 1000)
-        except ValueError:
-            return 0
-    return 0
+            entry = decode(line)
+        except DECODE_ERRORS:
+            continue
 
+        if entry.get("type") not in ("user", "assistant", None):
+            if entry.get("type") == "file-history-snapshot":
+                continue
 
-def search_file(filepath: str, pattern: re.Pattern, start_ts: int = None, end_ts: int = None) -> list:
-    """Search a single JSONL file for the pattern."""
-    matches = []
+        if need_ts:
+            ts = timestamp(entry.get("timestamp", 0))
+            if start_ts and ts < start_ts:
+                continue
+            if end_ts and ts > end_ts:
+                continue
 
+        if is_regex:
+            content = extract(entry)
+            if not match_entry(content):
+                continue
+        else:
+            if not match_entry(entry):
+                continue
+            content = extract(entry)
+
+        match = {
+            "file": filepath,
+            "line": line_num,
+            "type": entry.get("type", "unknown"),
+            "timestamp": entry.get("timestamp", ""),
+            "project": entry.get("cwd", ""),
+            "session_id": entry.get("sessionId", ""),
+            "preview": content[:300],
+        }
+        if score is not None:
+            match["score"] = score(content, ts)
+        yield match
+
+
+def search_file(filepath: str, pattern: re.Pattern, start_ts: int = None, end_ts: int = None,
+                seek: bool = False, ranker=None, stats=None) -> list:
+    """Search a single JSONL file for the pattern."""
     try:
-        with open(filepath) as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    entry = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                if entry.get("type") not in ("user", "assistant", None):
-                    if entry.get("type") == "file-history-snapshot":
-                        continue
-
-                ts = parse_timestamp(entry.get("timestamp", 0))
-                if start_ts and ts < start_ts:
-                    continue
-                if end_ts and ts > end_ts:
-                    continue
-
-                content = extract_content(entry)
-                if not pattern.search(content):
-                    continue
-
-                matches.append({
-                    "file": filepath,
-                    "line": line_num,
-                    "type": entry.get("type", "unknown"),
-                    "timestamp": entry.get("timestamp", ""),
-                    "project": entry.get("cwd", ""),
-                    "session_id": entry.get("sessionId", ""),
-                    "preview": content[:300],
-                })
+        return list(iter_matches(filepath, pattern, start_ts, end_ts, seek, ranker, stats))
     except Exception as e:
         return [{"error": f"Failed to read {filepath}: {e}"}]
 
+
+def search_files(files: list, pattern: re.Pattern, start_ts: int = None, end_ts: int = None,
+                 seek: bool = False, ranker=None, stats=None) -> list:
+    """Search a chunk of files in order."""
+    matches = []
+    for filepath in files:
+        matches.extend(search_file(filepath, pattern, start_ts, end_ts, seek, ranker, stats))
     return matches
 
 
+def stream_matches(chunks: list, workers: int, pattern: re.Pattern, start_ts: int = None,
+                   end_ts: int = None, seek: bool = False, ranker=None, stats=None):
+    """Yield matches in serial-scan order, line by line when running serially."""
+    if workers > 1 and len(chunks) > 1:
+        results = imap_chunks(search_files, chunks, workers, pattern, start_ts, end_ts, seek, ranker,
+                              stats=stats)
+        try:
+            for matches in results:
+                yield from matches
+        finally:
+            results.close()
+        return
+
+    for filepath in (f for chunk in chunks for f in chunk):
+        try:
+            yield from iter_matches(filepath, pattern, start_ts, end_ts, seek, ranker, stats)
+        except Exception as e:
+            yield {"error": f"Failed to read {filepath}: {e}"}
+
+
+def with_context(found, context: int, limit: int = None):
+    """Yield matches with their thread context attached, one graph load per file.
+
+    Only the first `limit` matches get context; the rest pass through untouched.
+    """
+    graphs = {}
+    for n, match in enumerate(found):
+        filepath = match.get("file")
+        if filepath is not None and (limit is None or n < limit):
+            try:
+                if filepath not in graphs:
+                    graphs[filepath] = refresh_graph(filepath)
+                thread = thread_context(filepath, [match["line"]], context, graphs[filepath])
+                match["context"] = thread[match["line"]]
+            except OSError as e:
+                match["context"] = {"error": f"Failed to read {filepath}: {e}"}
+        yield match
+
+
+def emit_stream(found, header: dict, limit: int, totals: bool, dedupe: NearDuplicateFilter = None,
+                stats=None):
+    """Print matches as NDJSON as they arrive, then a trailer line.
+
+    Scanning stops after `limit` matches unless `totals` asks for a full count.
+    When `found` is filtered by `dedupe`, the trailer reports its drop count.
+    With stats, printing is timed and the trailer carries the "stats" block.
+    """
+    emit = print
+    if stats is not None:
+        emit = stats.timed("output", print)
+    emitted = 0
+    total = 0
+    stopped = False
+    for match in found:
+        if emitted < limit:
+            emit(json.dumps(match), flush=True)
+            emitted += 1
+        elif not totals:
+            stopped = True
+            break
+        total += 1
+
+    trailer = {**header, "emitted": emitted}
+    if dedupe is not None:
+        trailer["duplicates"] = dedupe.duplicates
+    if not stopped:
+        trailer["total_matches"] = total
+    else:
+        trailer["truncated"] = True
+    if stats is not None:
+        trailer["stats"] = stats.report()
+    print(json.dumps(trailer), flush=True)
+
+
 def main():
     query = None
     files = []
     start_ts = None
     end_ts = None
+    use_index = False
+    index_db = None
+    manifest = None
+    workers = 1
+    seek = False
+    limit = 100
+    stream = False
+    totals = False
+    context = 0
+    dedupe = None
+    boolean = False
+    rank = False
+    half_life = DEFAULT_HALF_LIFE_DAYS
+    recency_weight = DEFAULT_RECENCY_WEIGHT
+    stats = None
 
     args = sys.argv[1:]
+    if "--watch" in args:
+        from history_watch import forward
+        forward("search", args)
+
     i = 0
     while i < len(args):
         if args[i] == "--query" and i + 1 < len(args):
@@ -120,6 +293,57 @@ def main():
         elif args[i] == "--end-ts" and i + 1 < len(args):
             end_ts = int(args[i + 1])
             i += 2
+        elif args[i] == "--index":
+            use_index = True
+            i += 1
+        elif args[i] == "--index-db" and i + 1 < len(args):
+            index_db = args[i + 1]
+            use_index = True
+            i += 2
+        elif args[i] == "--seek":
+            seek = True
+            i += 1
+        elif args[i] == "--limit" and i + 1 < len(args):
+            limit = int(args[i + 1])
+            i += 2
+        elif args[i] == "--stream":
+            stream = True
+            i += 1
+        elif args[i] == "--totals":
+            totals = True
+            i += 1
+        elif args[i] == "--rank":
+            rank = True
+            i += 1
+        elif args[i] == "--half-life" and i + 1 < len(args):
+            half_life = float(args[i + 1])
+            rank = True
+            i += 2
+        elif args[i] == "--recency-weight" and i + 1 < len(args):
+            recency_weight = float(args[i + 1])
+            rank = True
+            i += 2
+        elif args[i] == "--bool":
+            boolean = True
+            i += 1
+        elif args[i] == "--dedupe":
+            dedupe = dedupe or NearDuplicateFilter()
+            i += 1
+        elif args[i] == "--dedupe-threshold" and i + 1 < len(args):
+            dedupe = NearDuplicateFilter(float(args[i + 1]))
+            i += 2
+        elif args[i] == "--context" and i + 1 < len(args):
+            context = int(args[i + 1])
+            i += 2
+        elif args[i] == "--manifest" and i + 1 < len(args):
+            manifest = args[i + 1]
+            i += 2
+        elif args[i] == "--workers" and i + 1 < len(args):
+            workers = int(args[i + 1])
+            i += 2
+        elif args[i] == "--profile":
+            stats = Stats()
+            i += 1
         else:
             i += 1
 
@@ -127,30 +351,144 @@ def main():
         print(json.dumps({"error": "Missing --query"}))
         sys.exit(1)
 
+    if limit < 0:
+        print(json.dumps({"error": "--limit must be 0 or more"}))
+        sys.exit(1)
+
+    chunks = None
+    with stage(stats, "discover"):
+        if manifest:
+            chunks = [[f.strip() for f in chunk] for chunk in load_manifest(manifest)]
+            files = [f for chunk in chunks for f in chunk]
+
+        if use_index and not files:
+            from history_index import discover_files
+            files = discover_files()
+
     if not files:
         print(json.dumps({"error": "Missing --files"}))
         sys.exit(1)
 
-    try:
-        pattern = re.compile(query, re.IGNORECASE)
-    except re.error as e:
-        print(json.dumps({"error": f"Invalid regex: {e}"}))
-        sys.exit(1)
+    if boolean:
+        from query_lang import Query, QueryError
+        try:
+            pattern = Query(query)
+        except QueryError as e:
+            print(json.dumps({"error": f"Invalid query: {e}"}))
+            sys.exit(1)
+        use_index = False
+    else:
+        try:
+            pattern = re.compile(query, re.IGNORECASE)
+        except re.error as e:
+            print(json.dumps({"error": f"Invalid regex: {e}"}))
+            sys.exit(1)
 
-    all_matches = []
-    for filepath in files:
-        matches = search_file(filepath.strip(), pattern, start_ts, end_ts)
-        all_matches.extend(matches)
+    files = [f.strip() for f in files]
+    all_matches = None
+    mode = "scan"
+
+    # One index refresh serves both the ranker's statistics and the index search
+    conn = file_ids = None
+    if rank or use_index:
+        from history_index import fts_query, open_index, refresh
+        if rank or fts_query(pattern) is not None:
+            conn = open_index(index_db)
+            with stage(stats, "refresh"):
+                file_ids = refresh(conn, files)["file_ids"]
+
+    ranker = None
+    if rank:
+        from ranking import build_ranker
+        with stage(stats, "ranker"):
+            ranker = build_ranker(pattern, conn, half_life_days=half_life, recency_weight=recency_weight)
+
+    ranked = None
+    if use_index and file_ids is not None:
+        from history_index import search_index, search_index_top
+        with stage(stats, "index"):
+            # Near-duplicates are dropped in file order, so they need every match
+            if rank and dedupe is None:
+                ranked = search_index_top(conn, pattern, file_ids, limit, ranker, start_ts, end_ts)
+            else:
+                all_matches = search_index(conn, pattern, file_ids, start_ts, end_ts, ranker)
+        if ranked is not None or all_matches is not None:
+            mode = "index"
+
+    if chunks is None:
+        chunks = split_files(files, workers)
+
+    if stats is not None and dedupe is not None:
+        dedupe.is_duplicate = stats.timed("dedupe", dedupe.is_duplicate)
+
+    if rank:
+        from ranking import top_k
+        if ranked is not None:
+            shown, total = ranked
+        else:
+            if all_matches is None:
+                found = stream_matches(chunks, workers, pattern, start_ts, end_ts, seek, ranker, stats)
+            else:
+                found = iter(all_matches)
+            if dedupe is not None:
+                found = dedupe.unique(found, "preview")
+            shown, total = top_k(found, limit)
+        if context > 0:
+            with stage(stats, "context"):
+                shown = list(with_context(shown, context))
+        result = {
+            "query": query,
+            "mode": mode,
+            "json_backend": BACKEND,
+            "files_searched": len(files),
+            "total_matches": total,
+            "ranking": ranker.describe(),
+            "matches": shown,
+        }
+        if dedupe is not None:
+            result["duplicates"] = dedupe.duplicates
+        print(dumps(result, stats, indent=2))
+        return
+
+    if stream:
+        if all_matches is None:
+            found = stream_matches(chunks, workers, pattern, start_ts, end_ts, seek, stats=stats)
+        else:
+            found = iter(all_matches)
+        if dedupe is not None:
+            found = dedupe.unique(found, "preview")
+        if context > 0:
+            found = with_context(found, context, limit)
+        emit_stream(found, {"query": query, "mode": mode, "json_backend": BACKEND, "files_searched": len(files)}, limit, totals, dedupe, stats)
+        return
+
+    if all_matches is None:
+        all_matches = []
+        for matches in map_chunks(search_files, chunks, workers, pattern, start_ts, end_ts, seek,
+                                  stats=stats):
+            all_matches.extend(matches)
+
+    if dedupe is not None:
+        all_matches = list(dedupe.unique(all_matches, "preview"))
+
+    shown = all_matches[:limit]
+    if context > 0:
+        with stage(stats, "context"):
+            shown = list(with_context(shown, context))
 
     result = {
         "query": query,
+        "mode": mode,
+        "json_backend": BACKEND,
         "files_searched": len(files),
         "total_matches": len(all_matches),
-        "matches": all_matches[:100],
+        "matches": shown,
     }
+    if dedupe is not None:
+        result["duplicates"] = dedupe.duplicates
 
-    print(json.dumps(result, indent=2))
+    print(dumps(result, stats, indent=2))
 
 
 if __name__ == "__main__":
-    main()
+    run(main)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Sparse timestamp sidecars for seeking into project JSONL files.
+
+Each file gets a sidecar listing fixed-size byte blocks with their first
+line number and the min/max timestamp of the lines inside. A time-window
+query then reads only the blocks whose range overlaps the window. Blocks
+carry exact bounds, so out-of-order entries are never missed; files that
+are roughly chronological simply yield one short contiguous run.
+
+Sidecars follow the same append-only watermark as the index: a grown file
+has only its new bytes scanned, a replaced or truncated one is rebuilt.
+Compressed archives (see history_archive.py) need no sidecar: their frame
+table carries the same blocks, one per independently decompressed frame.
+
+Usage:
+    seek_index.py --files file1.jsonl,file2.jsonl --start-ts MS --end-ts MS
+
+Output: JSON with the byte ranges each file would read
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+
+from history_archive import frame_table, history_stat, is_archive, open_history
+
+DEFAULT_DIR = Path.home() / ".claude" / "history-analyser" / "seek"
+SIDECAR_VERSION = 1
+BLOCK_BYTES = 64 * 1024
+
+
+def sidecar_path(filepath: str) -> Path:
+    digest = hashlib.sha1(os.path.abspath(filepath).encode()).hexdigest()
+    return Path(os.environ.get("HISTORY_SEEK_DIR", DEFAULT_DIR)) / f"{digest}.json"
+
+
+def load_sidecar(filepath: str, st: os.stat_result) -> dict:
+    """Load a sidecar if it still describes a prefix of the file."""
+    try:
+        with open(sidecar_path(filepath)) as f:
+            sidecar = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if (sidecar.get("version") != SIDECAR_VERSION
+            or sidecar["inode"] != st.st_ino
+            or sidecar["offset"] > st.st_size):
+        return None
+    return sidecar
+
+
+def save_sidecar(filepath: str, sidecar: dict):
+    path = sidecar_path(filepath)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(sidecar, f)
+    os.replace(tmp, path)
+
+
+def extend_sidecar(filepath: str, sidecar: dict):
+    """Scan complete lines past the sidecar's offset into new blocks."""
+    from json_backend import DECODE_ERRORS, loads
+    from entries import parse_timestamp
+
+    blocks = sidecar["blocks"]
+    offset, line_num = sidecar["offset"], sidecar["lines"]
+    block = None
+
+    with open(filepath, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            if block is None or offset - block[0] >= BLOCK_BYTES:
+                block = [offset, line_num + 1, None, None]
+                blocks.append(block)
+            offset += len(line)
+            line_num += 1
+            try:
+                entry = loads(line)
+            except DECODE_ERRORS:
+                continue
+            ts = parse_timestamp(entry.get("timestamp", 0))
+            if block[2] is None or ts < block[2]:
+                block[2] = ts
+            if block[3] is None or ts > block[3]:
+                block[3] = ts
+
+    sidecar["offset"], sidecar["lines"] = offset, line_num
+
+
+def refresh_sidecar(filepath: str) -> dict:
+    """Return an up-to-date sidecar, scanning only appended bytes."""
+    st = os.stat(filepath)
+    sidecar = load_sidecar(filepath, st)
+    if sidecar and sidecar["offset"] == st.st_size and sidecar["mtime_ns"] == st.st_mtime_ns:
+        return sidecar
+
+    if sidecar is None:
+        sidecar = {"version": SIDECAR_VERSION, "inode": st.st_ino, "offset": 0, "lines": 0, "blocks": []}
+    extend_sidecar(filepath, sidecar)
+    sidecar["mtime_ns"] = st.st_mtime_ns
+    save_sidecar(filepath, sidecar)
+    return sidecar
+
+
+def time_slices(filepath: str, start_ts: int = None, end_ts: int = None) -> list:
+    """Byte ranges (start, end, first_line) that may hold entries in the window.
+
+    Ranges are merged where adjacent. The unindexed tail (an incomplete last
+    line) is always included so its content is treated like a full scan would.
+    """
+    sidecar = frame_table(filepath) if is_archive(filepath) else refresh_sidecar(filepath)
+    blocks = sidecar["blocks"]
+    slices = []
+
+    for i, (offset, first_line, lo, hi) in enumerate(blocks):
+        if lo is None:
+            continue
+        if start_ts and hi < start_ts:
+            continue
+        if end_ts and lo > end_ts:
+            continue
+        end = blocks[i + 1][0] if i + 1 < len(blocks) else sidecar["offset"]
+        if slices and slices[-1][1] == offset:
+            slices[-1][1] = end
+        else:
+            slices.append([offset, end, first_line])
+
+    tail_line = sidecar["lines"] + 1
+    if slices and slices[-1][1] == sidecar["offset"]:
+        slices[-1][1] = None
+    else:
+        slices.append([sidecar["offset"], None, tail_line])
+    return slices
+
+
+def iter_lines(filepath: str, start_ts: int = None, end_ts: int = None, seek: bool = False,
+               zero_copy: bool = False):
+    """Yield (line_num, raw line) pairs, skipping blocks outside the window when seeking.
+
+    With zero_copy, lines are memoryview slices of an mmap, valid only until
+    the next line is requested; otherwise they are bytes. Archives are
+    decompressed frame by frame and always yield bytes.
+    """
+    if seek and (start_ts or end_ts):
+        slices = time_slices(filepath, start_ts, end_ts)
+    else:
+        slices = [[0, None, 1]]
+
+    if zero_copy and not is_archive(filepath):
+        yield from iter_mmap_lines(filepath, slices)
+        return
+
+    with open_history(filepath) as f:
+        for start, end, line_num in slices:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            for line in f:
+                yield line_num, line
+                line_num += 1
+                if remaining is not None:
+                    remaining -= len(line)
+                    if remaining <= 0:
+                        break
+
+
+def iter_mmap_lines(filepath: str, slices: list):
+    """Yield (line_num, memoryview) pairs for the given byte slices of an mmap."""
+    with open(filepath, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buf = memoryview(mm)
+            try:
+                for start, end, line_num in slices:
+                    pos = start
+                    stop = size if end is None else min(end, size)
+                    while pos < stop:
+                        nl = mm.find(b"\n", pos)
+                        nxt = size if nl == -1 else nl + 1
+                        line = buf[pos:nxt]
+                        try:
+                            yield line_num, line
+                        finally:
+                            line.release()
+                        line_num += 1
+                        pos = nxt
+            finally:
+                buf.release()
+
+
+def main():
+    files = []
+    start_ts = None
+    end_ts = None
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--files" and i + 1 < len(args):
+            files = [f.strip() for f in args[i + 1].split(",")]
+            i += 2
+        elif args[i] == "--start-ts" and i + 1 < len(args):
+            start_ts = int(args[i + 1])
+            i += 2
+        elif args[i] == "--end-ts" and i + 1 < len(args):
+            end_ts = int(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    if not files:
+        print(json.dumps({"error": "Missing --files"}))
+        sys.exit(1)
+
+    result = {}
+    for filepath in files:
+        try:
+            slices = time_slices(filepath, start_ts, end_ts)
+        except OSError as e:
+            result[filepath] = {"error": f"Failed to read {filepath}: {e}"}
+            continue
+        size = history_stat(filepath).st_size
+        read = sum((end if end is not None else size) - start for start, end, _ in slices)
+        result[filepath] = {"size": size, "bytes_to_read": read, "slices": slices}
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
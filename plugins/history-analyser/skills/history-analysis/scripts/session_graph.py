@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Per-file session graph over uuid/parentUuid for walking conversation threads.
+
+Each file gets a sidecar holding one row per entry that has a uuid, stored
+as array-backed columns rather than dicts: the packed 16-byte uuid, byte
+offset, line number, parent row (-1 when the parent is absent or not in
+this file), first child row in file order (-1 when there is none) and
+session (an index into the file's session id list). Context around a line
+is found by bisecting the line column, following the parent column up and
+the first-child column down, and seeking straight to each row's offset.
+
+Sidecars follow the same append-only watermark as the seek sidecars: a grown
+file has only its new bytes scanned, a replaced or truncated one is rebuilt.
+Columns are written in native byte order; the cache is per machine.
+
+Usage:
+    session_graph.py --file file.jsonl --line N [--context 3]
+
+Output: JSON with the entries before and after the given line in its thread
+"""
+
+import hashlib
+import json
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from history_archive import history_stat, open_history
+
+DEFAULT_DIR = Path.home() / ".claude" / "history-analyser" / "graph"
+GRAPH_VERSION = 2
+UUID_BYTES = 16
+NO_PARENT = -1
+NO_CHILD = -1
+
+# Fixed-width columns, in the order they are written after the header
+COLUMNS = (("offsets", "Q"), ("line_nums", "I"), ("parents", "i"), ("children", "i"), ("session_ids", "H"))
+
+
+def graph_path(filepath: str) -> Path:
+    digest = hashlib.sha1(os.path.abspath(filepath).encode()).hexdigest()
+    return Path(os.environ.get("HISTORY_GRAPH_DIR", DEFAULT_DIR)) / f"{digest}.bin"
+
+
+def pack_uuid(value: str) -> bytes:
+    """16 raw bytes for a uuid string; other ids are hashed to the same width."""
+    try:
+        packed = bytes.fromhex(value.replace("-", ""))
+    except ValueError:
+        packed = b""
+    if len(packed) != UUID_BYTES:
+        packed = hashlib.md5(value.encode()).digest()
+    return packed
+
+
+def new_graph(st: os.stat_result) -> dict:
+    graph = {"version": GRAPH_VERSION, "inode": st.st_ino, "offset": 0, "lines": 0, "sessions": []}
+    graph["uuids"] = bytearray()
+    for name, code in COLUMNS:
+        graph[name] = array(code)
+    return graph
+
+
+def load_graph(filepath: str, st: os.stat_result) -> dict:
+    """Load a sidecar if it still describes a prefix of the file."""
+    try:
+        with open(graph_path(filepath), "rb") as f:
+            header = json.loads(f.readline())
+            if (header.get("version") != GRAPH_VERSION
+                    or header["inode"] != st.st_ino
+                    or header["offset"] > st.st_size):
+                return None
+            rows = header.pop("rows")
+            graph = {**header, "uuids": bytearray(f.read(rows * UUID_BYTES))}
+            for name, code in COLUMNS:
+                column = array(code)
+                column.frombytes(f.read(rows * column.itemsize))
+                graph[name] = column
+    except (OSError, ValueError, KeyError):
+        return None
+    if len(graph["uuids"]) != rows * UUID_BYTES or any(len(graph[name]) != rows for name, _ in COLUMNS):
+        return None
+    return graph
+
+
+def save_graph(filepath: str, graph: dict):
+    path = graph_path(filepath)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = {k: graph[k] for k in ("version", "inode", "offset", "lines", "mtime_ns", "sessions")}
+    header["rows"] = len(graph["offsets"])
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        f.write(graph["uuids"])
+        for name, _ in COLUMNS:
+            graph[name].tofile(f)
+    os.replace(tmp, path)
+
+
+def extend_graph(filepath: str, graph: dict):
+    """Scan complete lines past the graph's offset into new rows."""
+    from json_backend import DECODE_ERRORS, loads
+
+    uuids = graph["uuids"]
+    sessions = graph["sessions"]
+    # Lookups only live for the scan; the stored form is the columns
+    rows = {bytes(uuids[i:i + UUID_BYTES]): i // UUID_BYTES for i in range(0, len(uuids), UUID_BYTES)}
+    session_rows = {sid: i for i, sid in enumerate(sessions)}
+    offset, line_num = graph["offset"], graph["lines"]
+
+    with open_history(filepath) as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            start = offset
+            offset += len(line)
+            line_num += 1
+            if b'"uuid"' not in line:
+                continue
+            try:
+                entry = loads(line)
+            except DECODE_ERRORS:
+                continue
+            if not isinstance(entry, dict) or not isinstance(entry.get("uuid"), str):
+                continue
+
+            packed = pack_uuid(entry["uuid"])
+            parent = entry.get("parentUuid")
+            parent_row = rows.get(pack_uuid(parent), NO_PARENT) if isinstance(parent, str) else NO_PARENT
+            session = entry.get("sessionId") or ""
+            if session not in session_rows:
+                session_rows[session] = len(sessions)
+                sessions.append(session)
+
+            row = len(graph["offsets"])
+            rows.setdefault(packed, row)
+            uuids += packed
+            graph["offsets"].append(start)
+            graph["line_nums"].append(line_num)
+            graph["parents"].append(parent_row)
+            graph["children"].append(NO_CHILD)
+            # Parents always precede their children, so the first row to
+            # name a parent is its first child in file order
+            if parent_row != NO_PARENT and graph["children"][parent_row] == NO_CHILD:
+                graph["children"][parent_row] = row
+            graph["session_ids"].append(session_rows[session])
+
+    graph["offset"], graph["lines"] = offset, line_num
+
+
+def refresh_graph(filepath: str) -> dict:
+    """Return an up-to-date graph, scanning only appended bytes."""
+    st = history_stat(filepath)
+    graph = load_graph(filepath, st)
+    if graph and graph["offset"] == st.st_size and graph["mtime_ns"] == st.st_mtime_ns:
+        return graph
+
+    if graph is None:
+        graph = new_graph(st)
+    extend_graph(filepath, graph)
+    graph["mtime_ns"] = st.st_mtime_ns
+    save_graph(filepath, graph)
+    return graph
+
+
+def row_for_line(graph: dict, line_num: int) -> int:
+    """Row index for a line number, or None if that line has no uuid."""
+    line_nums = graph["line_nums"]
+    row = bisect_left(line_nums, line_num)
+    if row < len(line_nums) and line_nums[row] == line_num:
+        return row
+    return None
+
+
+def first_child(graph: dict, row: int) -> int:
+    """The first later row whose parent is row, or None."""
+    child = graph["children"][row]
+    return None if child == NO_CHILD else child
+
+
+def thread_rows(graph: dict, row: int, context: int) -> tuple:
+    """Up to `context` ancestor rows (oldest first) and descendant rows around row."""
+    before = []
+    parent = graph["parents"][row]
+    while parent != NO_PARENT and len(before) < context:
+        before.append(parent)
+        parent = graph["parents"][parent]
+    before.reverse()
+
+    after = []
+    child = first_child(graph, row)
+    while child is not None and len(after) < context:
+        after.append(child)
+        child = first_child(graph, child)
+    return before, after
+
+
+def read_row(f, graph: dict, row: int) -> dict:
+    """Seek to a row's line and decode it into a context entry."""
+    from json_backend import DECODE_ERRORS, loads
+    from entries import extract_content
+
+    f.seek(graph["offsets"][row])
+    try:
+        entry = loads(f.readline())
+    except DECODE_ERRORS:
+        entry = {}
+    return {
+        "line": graph["line_nums"][row],
+        "type": entry.get("type", "unknown"),
+        "timestamp": entry.get("timestamp", ""),
+        "uuid": entry.get("uuid", ""),
+        "preview": extract_content(entry)[:300],
+    }
+
+
+def thread_context(filepath: str, line_nums: list, context: int, graph: dict = None) -> dict:
+    """Map each line number to its {"before": [...], "after": [...]} thread context.
+
+    Lines without a uuid (or beyond the indexed prefix) map to empty lists.
+    Pass an already refreshed graph to skip reloading the sidecar.
+    """
+    if graph is None:
+        graph = refresh_graph(filepath)
+    result = {}
+    with open_history(filepath) as f:
+        for line_num in line_nums:
+            row = row_for_line(graph, line_num)
+            if row is None:
+                result[line_num] = {"before": [], "after": []}
+                continue
+            before, after = thread_rows(graph, row, context)
+            result[line_num] = {
+                "before": [read_row(f, graph, r) for r in before],
+                "after": [read_row(f, graph, r) for r in after],
+            }
+    return result
+
+
+def main():
+    filepath = None
+    line_num = None
+    context = 3
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "--file" and i + 1 < len(args):
+            filepath = args[i + 1]
+            i += 2
+        elif args[i] == "--line" and i + 1 < len(args):
+            line_num = int(args[i + 1])
+            i += 2
+        elif args[i] == "--context" and i + 1 < len(args):
+            context = int(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    if not filepath or line_num is None:
+        print(json.dumps({"error": "Missing --file or --line"}))
+        sys.exit(1)
+
+    try:
+        thread = thread_context(filepath, [line_num], context)[line_num]
+    except OSError as e:
+        print(json.dumps({"error": f"Failed to read {filepath}: {e}"}))
+        sys.exit(1)
+
+    print(json.dumps({"file": filepath, "line": line_num, "context": context, **thread}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
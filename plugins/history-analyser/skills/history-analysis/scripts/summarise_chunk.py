@@ -4,119 +4,608 @@ Summarise JSONL files to extract insights.
 
 Usage:
     summarise_chunk.py --files file1.jsonl,file2.jsonl
-    summarise_chunk.py --files file1.jsonl --start-ts MS --end-ts MS
+    summarise_chunk.py --files file1.jsonl --start-ts MS --end-ts MS [--seek]
+    summarise_chunk.py --files file1.jsonl,file2.jsonl --incremental [--state PATH]
+    summarise_chunk.py --manifest manifest.json --workers N [--stream]
+    summarise_chunk.py --files ... --usage
+    summarise_chunk.py --files ... --bucket hour|day|week [--start-ts MS --end-ts MS]
+    summarise_chunk.py --watch [--usage]
+    summarise_chunk.py --files ... --profile [--profile-dump PATH]
+    summarise_chunk.py --files ... --no-columns
+
+Without --usage, each file is summarised from its meta_cache.py columns:
+counts, time range and --bucket histograms are reductions over the cached
+columns, and only the lines of the reported queries are decoded. A file
+whose entries the columns cannot reproduce exactly is parsed instead.
+--no-columns always parses.
+
+With --incremental, per-file partial summaries are cached alongside a byte
+offset, inode and mtime watermark. Later runs parse only appended bytes.
+The cache covers whole files, so it is ignored when --start-ts/--end-ts
+are given.
+
+--seek reads only the byte blocks whose timestamps overlap --start-ts/--end-ts,
+using per-file sidecars maintained by seek_index.py, when a file is parsed.
+
+--manifest takes chunk.sh output (path or '-' for stdin) in place of --files.
+--workers N summarises chunks in a process pool and reduces them with
+merge_summaries; output matches a serial run.
+
+--usage adds token analytics from assistant message.usage: input, output,
+cache read and cache creation tokens summed overall and per model, project,
+session and UTC day, in the same pass as the rest of the summary.
+
+--bucket adds a histogram of message, tool and project counts per UTC hour,
+day or week (weeks start on Monday), built in the same pass. Buckets are
+flat lists indexed by (ts - origin) // width, pre-allocated across
+--start-ts/--end-ts when both are given. Tools and projects are
+dictionary-encoded to integer codes, each owning one row of bucket counts.
+Per-file histograms merge by element-wise addition. The histogram reports the 10 busiest tools and
+projects. Like a time window, --bucket bypasses the --incremental cache.
+
+--watch sends the request to a running history_watch.py daemon. Without
+--files, a whole-history summary is merged from the daemon's in-memory
+per-file partials; windows, buckets and streams run in the daemon over the
+watched files. Without a daemon the summary runs here as usual.
+
+--stream prints each file's summary as an NDJSON line as soon as its chunk
+finishes, followed by the merged summary as the final line.
+
+--profile adds a "stats" block with wall and CPU seconds per stage
+(discover, state, columns, read, decode, fold, merge, output), lines,
+bytes and decode_failures; see profiling.py. --profile-dump PATH writes a cProfile
+dump of the run, or a pyinstrument report with --profiler pyinstrument.
+
+Project and tool counts are Space-Saving counters holding up to 1000 keys
+each, and merges fold partials by the same rule. Every summary carries
+count_bounds: for each reported project/tool, errors gives how far its count
+may be from the true count (omitted when exact), and unlisted is the most
+any unreported key can have occurred. Counts are exact while there are
+fewer distinct keys than the cap and merged partials list every key.
+
+JSON is decoded with orjson or pysimdjson when installed (see
+json_backend.py); with orjson, lines are parsed from mmap slices without
+copying. The output's json_backend field names the decoder used.
 
 Output: JSON with summary statistics
 """
 
+import heapq
 import json
+import os
 import sys
 from collections import Counter
-from datetime import datetime
+from datetime import datetime, timezone
+from operator import itemgetter
 from pathlib import Path
 
-
-def parse_timestamp(ts) -> int:
-    if isinstance(ts, (int, float)):
-        return int(ts)
-    if isinstance(ts, str):
-        try:
-            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-            return int(dt.timestamp() * 1000)
-        except ValueError:
-            return 0
-    return 0
-
-
-def extract_user_query(entry: dict) -> str:
-    """Extract user's query text."""
-    if "display" in entry:
-        return entry["display"]
-
-    message = entry.get("message", {})
-    content = message.get("content", [])
-
-    if isinstance(content, str):
-        return content
-    if isinstance(content, list):
-        for item in content:
-            if isinstance(item, dict) and item.get("type") == "text":
-                return item.get("text", "")
-    return ""
-
-
-def summarise_file(filepath: str, start_ts: int = None, end_ts: int = None) -> dict:
-    """Summarise a single JSONL file."""
+from chunk_pool import imap_chunks, load_manifest, split_files
+from entries import extract_user_query, parse_timestamp
+from history_archive import history_stat, open_history
+from json_backend import ACCEPTS_BUFFER, BACKEND, DECODE_ERRORS, loads
+from meta_cache import (KINDS, QUERY, bucket_counts, count_codes, first_seen_counts, named_counts,
+                        project_names, query_rows, read_entries, refresh_cache, row_mask, time_range,
+                        tool_mask, tool_names)
+from profiling import Stats, dumps, run, stage
+from seek_index import iter_lines
+
+DEFAULT_STATE = Path.home() / ".claude" / "history-analyser" / "summary-state.json"
+STATE_VERSION = 4
+
+# Most recent user queries kept per partial and in the merged result. Each
+# partial keeps as many as the merge reports, so merging stays exact.
+QUERY_LIMIT = 30
+
+# Distinct keys a Space-Saving counter monitors. Counts are exact while a
+# corpus has fewer distinct projects/tools than this.
+COUNTER_CAP = 1000
+COUNTED = ("projects", "tools_used")
+
+# message.usage fields summed by --usage
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+)
+USAGE_GROUPS = ("by_model", "by_project", "by_session", "by_day")
+
+# --bucket widths in ms. Bucket numbers count from Monday 1970-01-05 UTC,
+# which is also a midnight, so hour and day buckets align the same way.
+BUCKET_WIDTHS = {"hour": 3_600_000, "day": 86_400_000, "week": 7 * 86_400_000}
+BUCKET_ORIGIN = 4 * 86_400_000
+BUCKET_LABELS = {"hour": "%Y-%m-%dT%H:00Z", "day": "%Y-%m-%d", "week": "%Y-%m-%d"}
+HISTOGRAM_TOP = 10
+
+
+def new_summary(usage: bool = False, bucket: str = None, start_ts: int = None,
+                end_ts: int = None) -> dict:
     summary = {
         "projects": Counter(),
         "tools_used": Counter(),
+        "count_bounds": new_bounds(),
         "user_queries": [],
+        "query_seq": 0,
         "message_count": 0,
         "user_count": 0,
         "assistant_count": 0,
         "earliest_ts": None,
         "latest_ts": None,
     }
+    if usage:
+        summary["usage"] = new_usage()
+        summary["usage_last_id"] = None
+    if bucket:
+        summary["histogram"] = new_histogram(bucket, start_ts, end_ts)
+    return summary
+
+
+def new_usage() -> dict:
+    return {"totals": {}, **{group: {} for group in USAGE_GROUPS}}
+
+
+def add_usage(bucket: dict, counts: dict):
+    for field, n in counts.items():
+        bucket[field] = bucket.get(field, 0) + n
+
+
+def fold_usage(summary: dict, entry: dict, project: str):
+    """Add an assistant entry's message.usage to the totals and each grouping.
+
+    Claude Code writes one line per content block of a response, repeating
+    the same message id and usage; consecutive repeats are counted once.
+    """
+    message = entry.get("message", {})
+    usage = message.get("usage")
+    if not isinstance(usage, dict):
+        return
+
+    message_id = message.get("id")
+    if message_id is not None:
+        if message_id == summary["usage_last_id"]:
+            return
+        summary["usage_last_id"] = message_id
+
+    counts = {"messages": 1}
+    for field in USAGE_FIELDS:
+        value = usage.get(field)
+        if isinstance(value, (int, float)):
+            counts[field] = int(value)
+
+    groups = summary["usage"]
+    add_usage(groups["totals"], counts)
+    keys = (
+        message.get("model", "unknown"),
+        project or "unknown",
+        entry.get("sessionId", "unknown"),
+        str(entry.get("timestamp", ""))[:10] or "unknown",
+    )
+    for group, key in zip(USAGE_GROUPS, keys):
+        add_usage(groups[group].setdefault(key, {}), counts)
+
+
+def merge_usage(into: dict, other: dict):
+    add_usage(into["totals"], other.get("totals", {}))
+    for group in USAGE_GROUPS:
+        for key, counts in other.get(group, {}).items():
+            add_usage(into[group].setdefault(key, {}), counts)
+
+
+def bucket_number(ts: int, bucket: str) -> int:
+    return (ts - BUCKET_ORIGIN) // BUCKET_WIDTHS[bucket]
+
+
+def new_histogram(bucket: str, start_ts: int = None, end_ts: int = None) -> dict:
+    """Empty histogram; pre-allocated over the window when both ends are known.
+
+    Tool and project names are dictionary-encoded: codes maps each name to
+    its row in the group's list of per-bucket count rows.
+    """
+    hist = {
+        "bucket": bucket,
+        "origin": None,
+        "messages": [],
+        "codes": {"tools": {}, "projects": {}},
+        "tools": [],
+        "projects": [],
+    }
+    if start_ts and end_ts:
+        hist["origin"] = bucket_number(start_ts, bucket)
+        hist["messages"] = [0] * (bucket_number(end_ts, bucket) - hist["origin"] + 1)
+    return hist
+
+
+def histogram_slot(hist: dict, number: int) -> int:
+    """List index for a bucket number, growing every row to cover it."""
+    origin = hist["origin"]
+    if origin is not None:
+        index = number - origin
+        if 0 <= index < len(hist["messages"]):
+            return index
+    return grow_histogram(hist, number)
+
+
+def grow_histogram(hist: dict, number: int) -> int:
+    if hist["origin"] is None:
+        hist["origin"] = number
+    index = number - hist["origin"]
+    rows = [hist["messages"], *hist["tools"], *hist["projects"]]
+    if index < 0:
+        for values in rows:
+            values[:0] = [0] * -index
+        hist["origin"] = number
+        index = 0
+    elif index >= len(hist["messages"]):
+        grow = index - len(hist["messages"]) + 1
+        for values in rows:
+            values.extend([0] * grow)
+    return index
+
+
+def histogram_row(hist: dict, group: str, key: str) -> list:
+    """The count row for a tool or project, adding a code for a new name."""
+    codes = hist["codes"][group]
+    code = codes.get(key)
+    if code is None:
+        code = codes[key] = len(codes)
+        hist[group].append([0] * len(hist["messages"]))
+    return hist[group][code]
+
+
+def merge_histogram(into: dict, other: dict):
+    """Add another histogram of the same bucket width into this one."""
+    if other["origin"] is None:
+        return
+    histogram_slot(into, other["origin"])
+    offset = histogram_slot(into, other["origin"] + len(other["messages"]) - 1) - len(other["messages"]) + 1
+    for i, n in enumerate(other["messages"]):
+        into["messages"][offset + i] += n
+    for group in ("tools", "projects"):
+        for key, code in other["codes"][group].items():
+            row = histogram_row(into, group, key)
+            for i, n in enumerate(other[group][code]):
+                row[offset + i] += n
+
+
+def report_histogram(hist: dict) -> dict:
+    """Labelled output form, keeping the busiest tools and projects."""
+    bucket = hist["bucket"]
+    width = BUCKET_WIDTHS[bucket]
+    labels = []
+    if hist["origin"] is not None:
+        for i in range(len(hist["messages"])):
+            start = BUCKET_ORIGIN + (hist["origin"] + i) * width
+            labels.append(datetime.fromtimestamp(start / 1000, timezone.utc).strftime(BUCKET_LABELS[bucket]))
+
+    def top(group: str) -> dict:
+        rows = hist[group]
+        ranked = sorted(hist["codes"][group].items(), key=lambda kv: -sum(rows[kv[1]]))
+        return {key: rows[code] for key, code in ranked[:HISTOGRAM_TOP]}
+
+    return {
+        "bucket": bucket,
+        "labels": labels,
+        "messages": hist["messages"],
+        "tools": top("tools"),
+        "projects": top("projects"),
+    }
+
+
+def new_bounds() -> dict:
+    return {group: {"errors": {}, "unlisted": 0} for group in COUNTED}
+
+
+def bounded_count(counter: Counter, bounds: dict, key, n: int = 1, error: int = 0):
+    """Space-Saving increment of a counter holding at most COUNTER_CAP keys.
+
+    A new key arriving at a full counter replaces the key with the smallest
+    count and starts from that count, which becomes its error bound; the
+    evicted key's bound raises the bound on unmonitored keys. `error` adds a
+    caller's own uncertainty (merges pass the partial's) to the key's bound.
+    """
+    if key in counter:
+        counter[key] += n
+    elif len(counter) < COUNTER_CAP:
+        counter[key] = n
+    else:
+        victim = min(counter, key=counter.__getitem__)
+        floor = counter.pop(victim)
+        bounds["unlisted"] = max(bounds["unlisted"], floor + bounds["errors"].pop(victim, 0))
+        counter[key] = floor + n
+        error += floor
+    if error:
+        bounds["errors"][key] = bounds["errors"].get(key, 0) + error
+
+
+def report_counts(counter: Counter, bounds: dict, top: int, spread: int = 0) -> tuple:
+    """The top keys of a counter and their count_bounds entry.
+
+    `spread` is a merge's total unlisted bound over its partials: a key
+    missing from a partial may still have occurred up to that partial's
+    unlisted count there.
+    """
+    ranked = counter.most_common()
+    errors = bounds["errors"]
+    unlisted = max([bounds["unlisted"], *(n + errors.get(key, 0) for key, n in ranked[top:])])
+    reported = {
+        key: errors.get(key, 0) + spread
+        for key, _ in ranked[:top]
+        if errors.get(key, 0) + spread
+    }
+    return dict(ranked[:top]), {"errors": reported, "unlisted": unlisted + spread}
+
+
+def push_query(summary: dict, query: str, timestamp: str):
+    """Keep the QUERY_LIMIT most recent queries in a min-heap.
+
+    Entries are [timestamp, -seq, query]; on equal timestamps the earlier
+    line wins, matching a stable newest-first sort.
+    """
+    summary["query_seq"] += 1
+    item = [timestamp, -summary["query_seq"], query]
+    heap = summary["user_queries"]
+    if len(heap) < QUERY_LIMIT:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def fold_entry(summary: dict, entry: dict, start_ts: int = None, end_ts: int = None):
+    """Fold one decoded JSONL entry into a running summary."""
+    entry_type = entry.get("type")
+    if entry_type not in ("user", "assistant"):
+        return
+
+    ts = parse_timestamp(entry.get("timestamp", 0))
+    if start_ts and ts < start_ts:
+        return
+    if end_ts and ts > end_ts:
+        return
+
+    summary["message_count"] += 1
+
+    hist = summary.get("histogram")
+    slot = None
+    if hist is not None and ts > 0:
+        slot = histogram_slot(hist, bucket_number(ts, hist["bucket"]))
+        hist["messages"][slot] += 1
+
+    if summary["earliest_ts"] is None or ts < summary["earliest_ts"]:
+        summary["earliest_ts"] = ts
+    if summary["latest_ts"] is None or ts > summary["latest_ts"]:
+        summary["latest_ts"] = ts
+
+    cwd = entry.get("cwd", "")
+    project = Path(cwd).name if cwd else ""
+    if project:
+        bounded_count(summary["projects"], summary["count_bounds"]["projects"], project)
+        if slot is not None:
+            histogram_row(hist, "projects", project)[slot] += 1
+
+    if entry_type == "user":
+        summary["user_count"] += 1
+        query = extract_user_query(entry)
+        if query and len(query) > 10:
+            push_query(summary, query[:200], entry.get("timestamp", ""))
+
+    elif entry_type == "assistant":
+        summary["assistant_count"] += 1
+        message = entry.get("message", {})
+        content = message.get("content", [])
+        if isinstance(content, list):
+            for item in content:
+                if isinstance(item, dict) and item.get("type") == "tool_use":
+                    bounded_count(summary["tools_used"], summary["count_bounds"]["tools_used"],
+                                  item.get("name", "unknown"))
+                    if slot is not None:
+                        histogram_row(hist, "tools", item.get("name", "unknown"))[slot] += 1
+        if "usage" in summary:
+            fold_usage(summary, entry, project)
+
+
+def finalise_summary(summary: dict) -> dict:
+    """Trim a running summary to its reported shape."""
+    result = {**summary, "count_bounds": {}}
+    for group in COUNTED:
+        result[group], result["count_bounds"][group] = report_counts(
+            Counter(summary[group]), summary["count_bounds"][group], 10)
+    result.update({
+        "user_queries": [
+            {"query": query, "timestamp": timestamp}
+            for timestamp, _, query in sorted(summary["user_queries"], reverse=True)
+        ],
+    })
+    del result["query_seq"]
+    result.pop("usage_last_id", None)
+    return result
+
+
+def summarise_columns(filepath: str, start_ts: int = None, end_ts: int = None,
+                      bucket: str = None) -> dict:
+    """Summarise a file from its meta_cache.py columns.
+
+    Returns the same summary as parsing the file, or None when the columns
+    cannot reproduce it (an irregular entry, or a last line still being
+    written) and the file has to be parsed.
+    """
+    cache = refresh_cache(filepath)
+    if cache["irregular"] or not cache["complete"]:
+        return None
+
+    summary = new_summary(False, bucket, start_ts, end_ts)
+    mask = row_mask(cache, start_ts, end_ts)
+    assistant_tools = tool_mask(cache, mask, ("assistant",))
+    projects, tools = project_names(cache), tool_names(cache)
+
+    kinds = count_codes(cache["kind"], mask, len(KINDS))
+    summary["message_count"] = sum(kinds)
+    summary["user_count"], summary["assistant_count"] = kinds
+    summary["earliest_ts"], summary["latest_ts"] = time_range(cache, mask, zeros=True)
+    summary["projects"] = Counter(named_counts(first_seen_counts(cache["cwd"], mask), projects))
+    summary["tools_used"] = Counter(named_counts(first_seen_counts(cache["tool"], assistant_tools), tools))
+
+    # Only the lines of the reported queries are decoded
+    rows = query_rows(cache, QUERY, mask, QUERY_LIMIT)
+    for row, entry in read_entries(filepath, cache, rows).items():
+        summary["user_queries"].append([entry.get("timestamp", ""), -row, extract_user_query(entry)[:200]])
+
+    hist = summary.get("histogram")
+    if hist is not None:
+        width = BUCKET_WIDTHS[bucket]
+        if hist["origin"] is None:
+            counts = bucket_counts(cache, BUCKET_ORIGIN, width, mask, assistant_tools, None, projects, tools)
+            hist["origin"] = counts["first"]
+        else:
+            counts = bucket_counts(cache, BUCKET_ORIGIN + hist["origin"] * width, width, mask,
+                                   assistant_tools, len(hist["messages"]), projects, tools)
+        hist["messages"] = counts["messages"]
+        for group in ("tools", "projects"):
+            hist["codes"][group] = {key: code for code, key in enumerate(counts[group])}
+            hist[group] = list(counts[group].values())
+
+    return finalise_summary(summary)
+
+
+def summarise_file(filepath: str, start_ts: int = None, end_ts: int = None, seek: bool = False,
+                   usage: bool = False, bucket: str = None, stats=None, columns: bool = True) -> dict:
+    """Summarise a single JSONL file, timing each stage when given stats.
+
+    Without usage the file is answered from its column cache when it can
+    be; otherwise its lines are parsed.
+    """
+    if columns and not usage:
+        try:
+            with stage(stats, "columns"):
+                result = summarise_columns(filepath, start_ts, end_ts, bucket)
+        except Exception as e:
+            return {"error": f"Failed to read {filepath}: {e}"}
+        if result is not None:
+            if stats is not None:
+                stats.count("files")
+            return result
+
+    summary = new_summary(usage, bucket, start_ts, end_ts)
 
     try:
-        with open(filepath) as f:
-            for line in f:
-                try:
-                    entry = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
+        lines = iter_lines(filepath, start_ts, end_ts, seek, zero_copy=ACCEPTS_BUFFER)
+        decode, fold = loads, fold_entry
+        if stats is not None:
+            stats.count("files")
+            lines = stats.reading(lines, line=itemgetter(1))
+            decode = stats.timed("decode", decode, DECODE_ERRORS)
+            fold = stats.timed("fold", fold)
+
+        for _, line in lines:
+            try:
+                entry = decode(line)
+            except DECODE_ERRORS:
+                continue
+            fold(summary, entry, start_ts, end_ts)
 
-                entry_type = entry.get("type")
-                if entry_type not in ("user", "assistant"):
-                    continue
+    except Exception as e:
+        return {"error": f"Failed to read {filepath}: {e}"}
+
+    return finalise_summary(summary)
 
-                ts = parse_timestamp(entry.get("timestamp", 0))
-                if start_ts and ts < start_ts:
-                    continue
-                if end_ts and ts > end_ts:
-                    continue
 
-                summary["message_count"] += 1
-
-                if summary["earliest_ts"] is None or ts < summary["earliest_ts"]:
-                    summary["earliest_ts"] = ts
-                if summary["latest_ts"] is None or ts > summary["latest_ts"]:
-                    summary["latest_ts"] = ts
-
-                cwd = entry.get("cwd", "")
-                if cwd:
-                    project = Path(cwd).name
-                    summary["projects"][project] += 1
-
-                if entry_type == "user":
-                    summary["user_count"] += 1
-                    query = extract_user_query(entry)
-                    if query and len(query) > 10:
-                        summary["user_queries"].append({
-                            "query": query[:200],
-                            "timestamp": entry.get("timestamp", ""),
-                        })
-
-                elif entry_type == "assistant":
-                    summary["assistant_count"] += 1
-                    message = entry.get("message", {})
-                    content = message.get("content", [])
-                    if isinstance(content, list):
-                        for item in content:
-                            if isinstance(item, dict) and item.get("type") == "tool_use":
-                                summary["tools_used"][item.get("name", "unknown")] += 1
+def summarise_file_incremental(filepath: str, state: dict, usage: bool = False, stats=None) -> dict:
+    """Summarise a file, parsing only bytes appended since its watermark.
+
+    `state` maps path -> {inode, offset, mtime_ns, partial} and is updated
+    in place. Only newline-terminated lines are consumed, so a line still
+    being written is picked up on the next run. Partials always carry usage
+    totals so toggling --usage never invalidates the cache.
+    """
+    try:
+        st = history_stat(filepath)
+    except OSError as e:
+        state.pop(filepath, None)
+        return {"error": f"Failed to read {filepath}: {e}"}
+
+    mark = state.get(filepath)
+    if mark and mark["inode"] == st.st_ino and mark["offset"] <= st.st_size:
+        if mark["mtime_ns"] == st.st_mtime_ns and mark["offset"] == st.st_size:
+            return without_usage(finalise_summary(mark["partial"]), usage)
+        offset = mark["offset"]
+        summary = mark["partial"]
+        summary["projects"] = Counter(summary["projects"])
+        summary["tools_used"] = Counter(summary["tools_used"])
+    else:
+        offset = 0
+        summary = new_summary(usage=True)
+
+    decode, fold = loads, fold_entry
+    if stats is not None:
+        stats.count("files")
+        decode = stats.timed("decode", decode, DECODE_ERRORS)
+        fold = stats.timed("fold", fold)
+
+    try:
+        with open_history(filepath) as f:
+            f.seek(offset)
+            lines = f if stats is None else stats.reading(f)
+            for line in lines:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    entry = decode(line)
+                except DECODE_ERRORS:
+                    continue
+                fold(summary, entry)
 
     except Exception as e:
+        state.pop(filepath, None)
         return {"error": f"Failed to read {filepath}: {e}"}
 
-    summary["projects"] = dict(summary["projects"].most_common(10))
-    summary["tools_used"] = dict(summary["tools_used"].most_common(10))
-    summary["user_queries"] = summary["user_queries"][:20]
+    state[filepath] = {
+        "inode": st.st_ino,
+        "offset": offset,
+        "mtime_ns": st.st_mtime_ns,
+        "partial": summary,
+    }
+    return without_usage(finalise_summary(summary), usage)
+
 
+def without_usage(summary: dict, usage: bool) -> dict:
+    if not usage:
+        summary.pop("usage", None)
     return summary
 
 
-def merge_summaries(summaries: list) -> dict:
+def summarise_files(files: list, start_ts: int = None, end_ts: int = None, seek: bool = False,
+                    usage: bool = False, bucket: str = None, columns: bool = True, stats=None) -> list:
+    """Summarise a chunk of files in order."""
+    return [summarise_file(f, start_ts, end_ts, seek, usage, bucket, stats, columns) for f in files]
+
+
+def summarise_files_incremental(task: tuple, usage: bool = False, stats=None) -> tuple:
+    """Summarise a (files, watermarks) chunk; returns summaries and new watermarks."""
+    files, chunk_state = task
+    return [summarise_file_incremental(f, chunk_state, usage, stats) for f in files], chunk_state
+
+
+def load_state(state_path: Path) -> dict:
+    try:
+        with open(state_path) as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if data.get("version") != STATE_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def save_state(state_path: Path, state: dict):
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = state_path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": STATE_VERSION, "files": state}, f)
+    os.replace(tmp, state_path)
+
+
+def merge_summaries(summaries: list, bucket: str = None, start_ts: int = None,
+                    end_ts: int = None) -> dict:
     """Merge multiple file summaries."""
     merged = {
         "projects": Counter(),
@@ -129,6 +618,9 @@ def merge_summaries(summaries: list) -> dict:
         "latest_ts": None,
         "files_processed": 0,
     }
+    bounds = new_bounds()
+    spread = dict.fromkeys(COUNTED, 0)
+    histogram = new_histogram(bucket, start_ts, end_ts) if bucket else None
 
     for s in summaries:
         if "error" in s:
@@ -139,9 +631,19 @@ def merge_summaries(summaries: list) -> dict:
         merged["user_count"] += s.get("user_count", 0)
         merged["assistant_count"] += s.get("assistant_count", 0)
 
-        merged["projects"].update(s.get("projects", {}))
-        merged["tools_used"].update(s.get("tools_used", {}))
-        merged["user_queries"].extend(s.get("user_queries", []))
+        # Each key's error is relative to the running spread: a partial that
+        # lists the key contributes its own error in place of its unlisted bound
+        for group in COUNTED:
+            partial = s.get("count_bounds", {}).get(group, {"errors": {}, "unlisted": 0})
+            unlisted = partial["unlisted"]
+            spread[group] += unlisted
+            for key, count in s.get(group, {}).items():
+                bounded_count(merged[group], bounds[group], key, count, partial["errors"].get(key, 0) - unlisted)
+        merged["user_queries"] = heapq.nlargest(
+            QUERY_LIMIT,
+            merged["user_queries"] + s.get("user_queries", []),
+            key=lambda x: x.get("timestamp", ""),
+        )
 
         earliest = s.get("earliest_ts")
         if earliest and (merged["earliest_ts"] is None or earliest < merged["earliest_ts"]):
@@ -151,23 +653,50 @@ def merge_summaries(summaries: list) -> dict:
         if latest and (merged["latest_ts"] is None or latest > merged["latest_ts"]):
             merged["latest_ts"] = latest
 
-    merged["projects"] = dict(merged["projects"].most_common(15))
-    merged["tools_used"] = dict(merged["tools_used"].most_common(15))
-    merged["user_queries"] = sorted(
-        merged["user_queries"],
-        key=lambda x: x.get("timestamp", ""),
-        reverse=True
-    )[:30]
+        if "usage" in s:
+            merge_usage(merged.setdefault("usage", new_usage()), s["usage"])
+
+        if "histogram" in s:
+            merge_histogram(histogram, s["histogram"])
+
+    merged["count_bounds"] = {}
+    for group in COUNTED:
+        merged[group], merged["count_bounds"][group] = report_counts(
+            merged[group], bounds[group], 15, spread[group])
+    if histogram is not None:
+        merged["histogram"] = report_histogram(histogram)
 
     return merged
 
 
+def emit_file_summaries(files: list, summaries: list):
+    """Print one NDJSON line per file summary as soon as its chunk finishes."""
+    for filepath, summary in zip(files, summaries):
+        if "histogram" in summary:
+            summary = {**summary, "histogram": report_histogram(summary["histogram"])}
+        print(json.dumps({"file": filepath, **summary}, default=str), flush=True)
+
+
 def main():
     files = []
     start_ts = None
     end_ts = None
+    incremental = False
+    state_path = DEFAULT_STATE
+    manifest = None
+    workers = 1
+    seek = False
+    stream = False
+    usage = False
+    bucket = None
+    columns = True
+    stats = None
 
     args = sys.argv[1:]
+    if "--watch" in args:
+        from history_watch import forward
+        forward("summarise", args)
+
     i = 0
     while i < len(args):
         if args[i] == "--files" and i + 1 < len(args):
@@ -179,21 +708,89 @@ def main():
         elif args[i] == "--end-ts" and i + 1 < len(args):
             end_ts = int(args[i + 1])
             i += 2
+        elif args[i] == "--incremental":
+            incremental = True
+            i += 1
+        elif args[i] == "--state" and i + 1 < len(args):
+            state_path = Path(args[i + 1])
+            incremental = True
+            i += 2
+        elif args[i] == "--usage":
+            usage = True
+            i += 1
+        elif args[i] == "--bucket" and i + 1 < len(args):
+            bucket = args[i + 1]
+            i += 2
+        elif args[i] == "--stream":
+            stream = True
+            i += 1
+        elif args[i] == "--seek":
+            seek = True
+            i += 1
+        elif args[i] == "--no-columns":
+            columns = False
+            i += 1
+        elif args[i] == "--manifest" and i + 1 < len(args):
+            manifest = args[i + 1]
+            i += 2
+        elif args[i] == "--workers" and i + 1 < len(args):
+            workers = int(args[i + 1])
+            i += 2
+        elif args[i] == "--profile":
+            stats = Stats()
+            i += 1
         else:
             i += 1
 
-    if not files:
+    with stage(stats, "discover"):
+        if manifest:
+            chunks = [[f.strip() for f in chunk] for chunk in load_manifest(manifest)]
+        else:
+            chunks = split_files([f.strip() for f in files], workers)
+
+    if not any(chunks):
         print(json.dumps({"error": "Missing --files"}))
         sys.exit(1)
 
-    summaries = []
-    for filepath in files:
-        summary = summarise_file(filepath.strip(), start_ts, end_ts)
-        summaries.append(summary)
+    if bucket and bucket not in BUCKET_WIDTHS:
+        print(json.dumps({"error": f"Invalid --bucket: {bucket} (use hour, day or week)"}))
+        sys.exit(1)
+
+    if incremental and (start_ts or end_ts or bucket):
+        incremental = False
 
-    result = merge_summaries(summaries)
-    print(json.dumps(result, indent=2, default=str))
+    with stage(stats, "state"):
+        state = load_state(state_path) if incremental else None
+
+    summaries = []
+    if incremental:
+        tasks = [(chunk, {f: state[f] for f in chunk if f in state}) for chunk in chunks]
+        results = imap_chunks(summarise_files_incremental, tasks, workers, usage, stats=stats)
+        for chunk, (chunk_summaries, chunk_state) in zip(chunks, results):
+            summaries.extend(chunk_summaries)
+            if stream:
+                emit_file_summaries(chunk, chunk_summaries)
+            for filepath in chunk:
+                state.pop(filepath, None)
+            state.update(chunk_state)
+        with stage(stats, "state"):
+            save_state(state_path, state)
+    else:
+        results = imap_chunks(summarise_files, chunks, workers, start_ts, end_ts, seek, usage, bucket,
+                              columns, stats=stats)
+        for chunk, chunk_summaries in zip(chunks, results):
+            summaries.extend(chunk_summaries)
+            if stream:
+                emit_file_summaries(chunk, chunk_summaries)
+
+    with stage(stats, "merge"):
+        result = merge_summaries(summaries, bucket, start_ts, end_ts)
+    result["json_backend"] = BACKEND
+    if stream:
+        print(dumps(result, stats, default=str), flush=True)
+    else:
+        print(dumps(result, stats, indent=2, default=str))
 
 
 if __name__ == "__main__":
-    main()
+    run(main)
@@ -4,24 +4,56 @@ Skill Validator - Checks skill structure and frontmatter
 
 Usage:
     validate_skill.py <skill-directory>
+    validate_skill.py <skill-directory> <skill-directory>... [--json]
+    validate_skill.py --all [--root <marketplace-dir>] [--workers N] [--no-cache]
 
 Examples:
     validate_skill.py plugins/consultant/skills/consulting-models
     validate_skill.py ./my-skill
+    validate_skill.py --all
+
+--all finds every skill through .claude-plugin/marketplace.json (searched
+upwards from the current directory, or at --root) and each plugin's
+plugin.json: the plugin's skills/ directory plus any extra "skills" paths
+it declares. Several directories or --all print one JSON report and exit 1
+if any skill is invalid.
+
+Results are cached by SKILL.md content hash in
+~/.claude/skill-utils/validate-cache.json (override with
+SKILL_VALIDATE_CACHE), so unchanged skills are not re-checked. Editing this
+script or installing/removing PyYAML invalidates the cache. Uncached skills
+are checked in a process pool once there are enough to repay its start-up.
 """
 
-import sys
+import hashlib
+import importlib.util
+import json
+import os
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
 from pathlib import Path
 
-try:
-    import yaml
-    HAS_YAML = True
-except ImportError:
-    HAS_YAML = False
-
 ALLOWED_FRONTMATTER = {"name", "description", "license", "allowed-tools", "metadata"}
 
+DEFAULT_CACHE = Path.home() / ".claude" / "skill-utils" / "validate-cache.json"
+MARKETPLACE = Path(".claude-plugin") / "marketplace.json"
+PLUGIN_MANIFEST = Path(".claude-plugin") / "plugin.json"
+
+# Uncached skills needed before a process pool beats checking in-process
+POOL_MIN = 32
+
+HAS_YAML = importlib.util.find_spec("yaml") is not None
+
+
+@cache
+def _yaml():
+    # Imported on first use: a fully cached run never pays for it
+    import yaml
+    return yaml
+
 
 def parse_frontmatter(content: str) -> tuple[dict | None, str]:
     if not content.startswith("---"):
@@ -34,6 +66,7 @@ def parse_frontmatter(content: str) -> tuple[dict | None, str]:
     frontmatter_text = match.group(1)
 
     if HAS_YAML:
+        yaml = _yaml()
         try:
             data = yaml.safe_load(frontmatter_text)
             if not isinstance(data, dict):
@@ -51,20 +84,15 @@ def parse_frontmatter(content: str) -> tuple[dict | None, str]:
     return data, ""
 
 
-def validate_skill(skill_path: str) -> tuple[bool, list[str]]:
-    path = Path(skill_path)
+def check_content(content: str) -> tuple[list[str], list[str]]:
+    """Errors and warnings for the text of a SKILL.md."""
     errors = []
     warnings = []
 
-    skill_md = path / "SKILL.md"
-    if not skill_md.exists():
-        return False, ["SKILL.md not found"]
-
-    content = skill_md.read_text()
     frontmatter, error = parse_frontmatter(content)
 
     if error:
-        return False, [error]
+        return [error], []
 
     # Check required fields
     if "name" not in frontmatter:
@@ -102,6 +130,16 @@ def validate_skill(skill_path: str) -> tuple[bool, list[str]]:
     if len(lines) > 500:
         warnings.append(f"SKILL.md has {len(lines)} lines (recommended max: 500)")
 
+    return errors, warnings
+
+
+def validate_skill(skill_path: str) -> tuple[bool, list[str]]:
+    skill_md = Path(skill_path) / "SKILL.md"
+    if not skill_md.exists():
+        return False, ["SKILL.md not found"]
+
+    errors, warnings = check_content(skill_md.read_text())
+
     if errors:
         return False, errors + warnings
 
@@ -111,18 +149,215 @@ def validate_skill(skill_path: str) -> tuple[bool, list[str]]:
     return True, messages
 
 
+def check_texts(contents: list[str]) -> list[tuple[list[str], list[str]]]:
+    """Pool task: check_content over a batch of SKILL.md texts."""
+    return [check_content(content) for content in contents]
+
+
+@cache
+def validator_key() -> str:
+    """Fingerprint of the rules in force: this script's source and the YAML parser."""
+    source = Path(__file__).read_bytes()
+    return hashlib.sha1(source + (b"yaml" if HAS_YAML else b"basic")).hexdigest()
+
+
+def load_cache(cache_path: Path) -> dict:
+    try:
+        with open(cache_path) as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if data.get("validator") != validator_key():
+        return {}
+    return data.get("results", {})
+
+
+def save_cache(cache_path: Path, results: dict):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"validator": validator_key(), "results": results}, f)
+    os.replace(tmp, cache_path)
+
+
+def find_marketplace(start: Path) -> Path | None:
+    """The nearest directory at or above start holding .claude-plugin/marketplace.json."""
+    for directory in [start, *start.parents]:
+        if (directory / MARKETPLACE).is_file():
+            return directory
+    return None
+
+
+def skill_dirs(path: Path) -> list[Path]:
+    """A skill directory itself, or the skill directories directly inside path."""
+    if (path / "SKILL.md").is_file():
+        return [path]
+    if not path.is_dir():
+        return []
+    return sorted(child for child in path.iterdir() if (child / "SKILL.md").is_file())
+
+
+def discover_skills(root: Path) -> list[tuple[str, Path]]:
+    """(plugin, skill directory) for every skill of every local marketplace plugin."""
+    with open(root / MARKETPLACE) as f:
+        marketplace = json.load(f)
+    plugin_root = marketplace.get("metadata", {}).get("pluginRoot", ".")
+
+    found = []
+    seen = set()
+    for plugin in marketplace.get("plugins", []):
+        source = plugin.get("source")
+        if not isinstance(source, str):
+            # Remote sources (github, git URL) have nothing to check locally
+            continue
+        if not source.startswith(("./", "../", "/")):
+            source = f"{plugin_root}/{source}"
+        plugin_dir = (root / source).resolve()
+
+        paths = [plugin_dir / "skills"]
+        try:
+            with open(plugin_dir / PLUGIN_MANIFEST) as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            manifest = {}
+        extra = manifest.get("skills", [])
+        if isinstance(extra, str):
+            extra = [extra]
+        paths += [plugin_dir / p for p in extra if isinstance(p, str)]
+
+        for path in paths:
+            for skill in skill_dirs(path.resolve()):
+                if skill not in seen:
+                    seen.add(skill)
+                    found.append((plugin.get("name", plugin_dir.name), skill))
+    return found
+
+
+def validate_many(skills: list[tuple[str | None, Path]], cache_path: Path | None,
+                  workers: int) -> list[dict]:
+    """Report entries for each (plugin, skill directory), checking only uncached content."""
+    results = load_cache(cache_path) if cache_path else {}
+    report = []
+    pending = {}
+
+    for plugin, skill in skills:
+        entry = {"path": str(skill), "plugin": plugin}
+        report.append(entry)
+        try:
+            content = (skill / "SKILL.md").read_text()
+        except OSError:
+            entry.update(valid=False, errors=["SKILL.md not found"], warnings=[], cached=False)
+            continue
+        digest = hashlib.sha1(content.encode()).hexdigest()
+        entry["sha1"] = digest
+        if digest in results:
+            entry["cached"] = True
+        else:
+            entry["cached"] = False
+            pending.setdefault(digest, content)
+
+    if pending:
+        digests = list(pending)
+        texts = [pending[d] for d in digests]
+        workers = min(workers, len(texts) // POOL_MIN)
+        if workers > 1:
+            batch = -(-len(texts) // workers)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                batches = pool.map(check_texts, [texts[i:i + batch] for i in range(0, len(texts), batch)])
+                checked = [result for part in batches for result in part]
+        else:
+            checked = check_texts(texts)
+        for digest, (errors, warnings) in zip(digests, checked):
+            results[digest] = {"errors": errors, "warnings": warnings}
+
+    for entry in report:
+        digest = entry.pop("sha1", None)
+        if digest is not None:
+            result = results[digest]
+            entry.update(valid=not result["errors"], errors=result["errors"], warnings=result["warnings"],
+                         cached=entry.pop("cached"))
+
+    if cache_path and pending:
+        try:
+            save_cache(cache_path, results)
+        except OSError:
+            pass
+    return report
+
+
 def main():
-    if len(sys.argv) != 2:
+    args = sys.argv[1:]
+    paths = []
+    use_all = False
+    as_json = False
+    root = None
+    workers = os.cpu_count() or 1
+    cache_path = Path(os.environ.get("SKILL_VALIDATE_CACHE", DEFAULT_CACHE))
+
+    i = 0
+    while i < len(args):
+        if args[i] == "--all":
+            use_all = True
+            i += 1
+        elif args[i] == "--json":
+            as_json = True
+            i += 1
+        elif args[i] == "--root" and i + 1 < len(args):
+            root = Path(args[i + 1])
+            i += 2
+        elif args[i] == "--workers" and i + 1 < len(args):
+            try:
+                workers = max(1, int(args[i + 1]))
+            except ValueError:
+                print(json.dumps({"error": f"Invalid --workers value: {args[i + 1]}"}))
+                sys.exit(1)
+            i += 2
+        elif args[i] == "--no-cache":
+            cache_path = None
+            i += 1
+        elif args[i].startswith("--"):
+            print(__doc__)
+            sys.exit(1)
+        else:
+            paths.append(args[i])
+            i += 1
+
+    if not use_all and len(paths) == 1 and not as_json:
+        valid, messages = validate_skill(paths[0])
+
+        for msg in messages:
+            prefix = "OK:" if valid and msg == "Skill is valid" else "Warning:" if "TODO" in msg or "lines" in msg else "Error:"
+            print(f"{prefix} {msg}")
+
+        sys.exit(0 if valid else 1)
+
+    if not use_all and not paths:
         print(__doc__)
         sys.exit(1)
 
-    valid, messages = validate_skill(sys.argv[1])
-
-    for msg in messages:
-        prefix = "OK:" if valid and msg == "Skill is valid" else "Warning:" if "TODO" in msg or "lines" in msg else "Error:"
-        print(f"{prefix} {msg}")
+    started = time.perf_counter()
+    skills = [(None, Path(p).resolve()) for p in paths]
+    if use_all:
+        marketplace_dir = find_marketplace((root or Path.cwd()).resolve())
+        if marketplace_dir is None:
+            print(json.dumps({"error": "No .claude-plugin/marketplace.json found (use --root)"}))
+            sys.exit(1)
+        skills += discover_skills(marketplace_dir)
 
-    sys.exit(0 if valid else 1)
+    report = validate_many(skills, cache_path, workers)
+    invalid = sum(1 for entry in report if not entry["valid"])
+    print(json.dumps({
+        "skills": report,
+        "summary": {
+            "total": len(report),
+            "valid": len(report) - invalid,
+            "invalid": invalid,
+            "warnings": sum(1 for entry in report if entry["warnings"]),
+            "cached": sum(1 for entry in report if entry["cached"]),
+        },
+        "elapsed_s": round(time.perf_counter() - started, 4),
+    }, indent=2))
+    sys.exit(1 if invalid else 0)
 
 
 if __name__ == "__main__":